@@ -0,0 +1,184 @@
+import os
+import time
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Container that holds each codec as-is, for passthrough output
+PASSTHROUGH_EXTS = {'opus': 'opus', 'vorbis': 'ogg', 'aac': 'm4a', 'mp4a': 'm4a', 'alac': 'm4a', 'mp3': 'mp3', 'flac': 'flac'}
+# Containers ffmpeg can attach a JPEG cover to as a video stream
+COVER_EXTS = ('mp3', 'm4a', 'flac')
+
+
+class TranscodeCancelled(Exception):
+    """Raised when a job is stopped while its encode is queued or running."""
+
+
+def passthrough_ext(acodec, source_ext):
+    """Output extension that keeps the downloaded audio stream without re-encoding."""
+    codec = (acodec or '').split('.')[0].lower()
+    return PASSTHROUGH_EXTS.get(codec) or ('m4a' if source_ext == 'mp4' else source_ext if source_ext != 'webm' else 'mka')
+
+
+def audio_metadata(info, title):
+    metadata = {'title': title}
+    artist = info.get('artist') or info.get('creator') or info.get('uploader')
+    if artist:
+        metadata['artist'] = artist
+    if info.get('album'):
+        metadata['album'] = info['album']
+    if info.get('upload_date'):
+        metadata['date'] = info['upload_date'][:4]
+    if info.get('webpage_url'):
+        metadata['comment'] = info['webpage_url']
+    return metadata
+
+
+def audio_command(ffmpeg_path, source, target, codec=None, bitrate=None, cover=False, metadata=None):
+    """One ffmpeg call that writes ``target`` from ``source``: audio copied (``codec=None``) or encoded,
+    tags set, and the cover read from stdin when ``cover`` is true."""
+    cmd = [ffmpeg_path, "-v", "error", "-i", source]
+    if cover:
+        cmd += ["-f", "image2pipe", "-i", "pipe:0"]
+    cmd += ["-map", "0:a:0"]
+    if cover:
+        cmd += ["-map", "1", "-c:v", "copy", "-disposition:v:0", "attached_pic",
+                "-metadata:s:v", "title=Cover", "-metadata:s:v", "comment=Cover (front)"]
+    cmd += ["-c:a", codec or "copy"]
+    if codec and bitrate:
+        cmd += ["-b:a", bitrate]
+    if target.endswith('.mp3'):
+        cmd += ["-id3v2_version", "3"]
+    for key, value in (metadata or {}).items():
+        cmd += ["-metadata", f"{key}={value}"]
+    cmd += ["-y", target]
+    return cmd
+
+
+class TranscodePool:
+    """Runs audio encodes on at most ``max_workers`` ffmpeg processes at a time.
+
+    Download threads hand their encode over and block until it is done, so a
+    batch of hundreds of tracks queues here instead of starting one encoder per
+    download. The workers are threads: the CPU work happens in the ffmpeg child
+    processes, each encoding on one core, and a thread waiting on a child costs
+    nothing. Throughput (seconds of audio encoded per second of wall time while
+    the pool was busy) is tracked in ``stats()`` and the metrics endpoint.
+    """
+
+    def __init__(self, max_workers=None, creationflags=0, metrics=METRICS):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.creationflags = creationflags
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcode")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.done = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.encode_seconds = 0.0  # sum over encodes, i.e. CPU-side work
+        self.busy_seconds = 0.0  # wall time with at least one encode running
+        self._busy_since = None
+
+    def _update_gauges(self):
+        if self.metrics:
+            self.metrics.transcodes.set(self.queued, state="queued")
+            self.metrics.transcodes.set(self.running, state="running")
+
+    def _encode(self, cmd, input, cancel_event):
+        with self._lock:
+            self.queued -= 1
+            if cancel_event is not None and cancel_event.is_set():
+                self._update_gauges()
+                raise TranscodeCancelled(cmd[-1])
+            self.running += 1
+            if self._busy_since is None:
+                self._busy_since = time.perf_counter()
+            self._update_gauges()
+        started = time.perf_counter()
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE if input else subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, creationflags=self.creationflags)
+            if input:
+                threading.Thread(target=self._feed, args=(proc, input), daemon=True).start()
+            while True:
+                try:
+                    proc.wait(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel_event is not None and cancel_event.is_set():
+                        proc.kill()
+                        proc.wait()
+                        raise TranscodeCancelled(cmd[-1])
+            stderr = proc.stderr.read().decode(errors='replace')
+            proc.stderr.close()
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+            return time.perf_counter() - started
+        finally:
+            with self._lock:
+                self.running -= 1
+                if self.running == 0 and self._busy_since is not None:
+                    self.busy_seconds += time.perf_counter() - self._busy_since
+                    self._busy_since = None
+                self._update_gauges()
+
+    @staticmethod
+    def _feed(proc, data):
+        try:
+            proc.stdin.write(data)
+            proc.stdin.close()
+        except OSError:
+            pass
+
+    def run(self, cmd, input=None, audio_seconds=None, codec="mp3", cancel_event=None):
+        """Queues ``cmd`` and waits for it; raises ``TranscodeCancelled`` or ``CalledProcessError``."""
+        with self._lock:
+            self.queued += 1
+            self._update_gauges()
+        future = self._executor.submit(self._encode, cmd, input, cancel_event)
+        try:
+            seconds = future.result()
+        except TranscodeCancelled:
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.done += 1
+            self.encode_seconds += seconds
+            self.audio_seconds += audio_seconds or 0
+        if self.metrics:
+            self.metrics.transcode_seconds.observe(seconds, codec=codec)
+            if audio_seconds:
+                self.metrics.transcoded_audio_seconds.inc(audio_seconds, codec=codec)
+        if audio_seconds:
+            logger.info(f"Encoded {audio_seconds:.0f}s of audio to {codec} in {seconds:.1f}s "
+                        f"({audio_seconds / max(seconds, 1e-6):.0f}x realtime)")
+        return seconds
+
+    def stats(self):
+        with self._lock:
+            busy = self.busy_seconds + (time.perf_counter() - self._busy_since if self._busy_since else 0)
+            return {
+                'workers': self.max_workers,
+                'queued': self.queued,
+                'running': self.running,
+                'done': self.done,
+                'failed': self.failed,
+                'audio_seconds': self.audio_seconds,
+                'encode_seconds': self.encode_seconds,
+                'busy_seconds': busy,
+                # Seconds of audio produced per second of wall time while encoding
+                'throughput': self.audio_seconds / busy if busy else None,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
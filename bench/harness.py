@@ -0,0 +1,323 @@
+import os
+import sys
+import time
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+# bench/ exposes yt_dlp_plugins (the extractor stand-in); the repo root exposes gui.py
+for path in (BENCH_DIR, ROOT_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import yt_dlp  # noqa: E402
+import gui  # noqa: E402
+from stream_cache import StreamCache  # noqa: E402
+from thumbnails import ThumbnailCache, thumbnail_url_of  # noqa: E402
+from audio_transcode import TranscodePool  # noqa: E402
+from disk_space import DiskSpaceManager  # noqa: E402
+from storage import StoragePolicy  # noqa: E402
+from download_windows import DownloadCalendar  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from concurrency import ConcurrencyController  # noqa: E402
+from retries import RETRY_POLICIES  # noqa: E402
+from info_refresh import InfoRefresher  # noqa: E402
+from tracing import TraceRecorder  # noqa: E402
+from ui_watchdog import StallWatchdog  # noqa: E402
+from ytdl_sessions import SESSIONS  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values):
+    return {
+        'mean': sum(values) / len(values) if values else None,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'max': max(values) if values else None,
+        'count': len(values),
+    }
+
+
+class TimedQueue(queue.Queue):
+    """ui_queue stand-in that remembers when each message was put."""
+
+    def _put(self, item):
+        super()._put((time.perf_counter(), item))
+
+
+class HeadlessEngine:
+    """Runs YTDownloaderApp's download engine without creating a Tk window.
+
+    The worker/hook methods are borrowed from the app class unchanged; a
+    consumer thread drains ``ui_queue`` with the same batch size and polling
+    cadence as ``_check_ui_queue`` so queue lag is representative.
+    """
+
+    download_worker = gui.YTDownloaderApp.download_worker
+    _disk_space_needs = gui.YTDownloaderApp._disk_space_needs
+    _wait_for_disk_space = gui.YTDownloaderApp._wait_for_disk_space
+    _schedule_retry = gui.YTDownloaderApp._schedule_retry
+    _extract_for_download = gui.YTDownloaderApp._extract_for_download
+
+    def __init__(self, cache_dir, fragments=1):
+        self.jobs = []
+        self.jobs_lock = threading.Lock()
+        self.ui_queue = TimedQueue()
+        self.ui_update_interval = 0.5
+        self.min_update_interval = 0.5
+        self.max_update_interval = 2.0
+        self.stream_cache = StreamCache(cache_dir, gui.STREAM_CACHE_MAX_BYTES)
+        self.thumbnail_cache = ThumbnailCache(gui.THUMBNAIL_CACHE_MAX_BYTES, gui.ffmpeg_path, gui.NO_WINDOW_FLAGS)
+        self.transcoder = TranscodePool(gui.TRANSCODE_WORKERS, gui.NO_WINDOW_FLAGS, metrics=None)
+        self.disk_space = DiskSpaceManager()
+        self.storage = StoragePolicy(self.disk_space)
+        self.calendar = DownloadCalendar()
+        # Every job is on the same local host, so there's no site to be polite to
+        self.info_refresher = InfoRefresher(host_interval=0)
+        # Fixed settings: the adaptive controller is only ticked by the app
+        self.concurrency = ConcurrencyController(Scheduler(gui.MAX_CONCURRENT_DOWNLOADS), metrics=None)
+        self.concurrency.fragments = fragments
+        self.tracer = TraceRecorder()
+        self.ui_lags = []
+        self.first_byte_at = {}
+        self.status_events = {}
+        self.watchdog = None
+        self._stop = threading.Event()
+        self._consumer = threading.Thread(target=self._consume_ui_queue, daemon=True)
+        self._consumer.start()
+        self.watchdog = StallWatchdog(stall_threshold=gui.UI_STALL_THRESHOLD, thread_ident=self._consumer.ident).start()
+
+    def save_queue(self):
+        pass
+
+    def ytdl_hook(self, d, job):
+        if d.get('status') == 'downloading' and d.get('downloaded_bytes') and job.tree_item_id not in self.first_byte_at:
+            self.first_byte_at[job.tree_item_id] = time.perf_counter()
+        return gui.YTDownloaderApp.ytdl_hook(self, d, job)
+
+    def _consume_ui_queue(self):
+        due = time.perf_counter()
+        while not self._stop.is_set() or not self.ui_queue.empty():
+            if self.watchdog:
+                self.watchdog.beat('_check_ui_queue', due)
+            for _ in range(gui.UI_QUEUE_MAX_PER_CYCLE):
+                try:
+                    put_at, (job_id, message_type, *args) = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.ui_lags.append(time.perf_counter() - put_at)
+                if message_type == 'status_update' and job_id is not None:
+                    self.status_events.setdefault(job_id, []).append((put_at, args[0]))
+            interval = gui.ui_queue_check_interval(self.ui_queue.qsize()) / 1000.0
+            due = time.perf_counter() + interval
+            time.sleep(interval)
+
+    def close(self):
+        self._stop.set()
+        self._consumer.join(timeout=10)
+        self.watchdog.stop()
+        self.transcoder.shutdown()
+        self.info_refresher.shutdown()
+
+
+SCENARIOS = {
+    # name: (choice, format picker, share one video id across all jobs)
+    'progressive': ('video', lambda fs: next(f for f in fs if f['format_id'] == 'combined-720p'), False),
+    'split_av': ('video', lambda fs: next(f for f in fs if f['format_id'] == 'video-720p'), False),
+    'hls': ('video', lambda fs: next(f for f in fs if f['format_id'].startswith('hls') and f.get('vcodec') != 'none'), False),
+    'dash': ('video', lambda fs: next(f for f in fs if f['format_id'].startswith('dash') and f.get('acodec') == 'none'), False),
+    'audio_mp3': ('audio', lambda fs: {"format_id": "bestaudio/best", "is_best_audio_option": True}, False),
+    'audio_passthrough': ('audio', lambda fs: {"format_id": "bestaudio/best", "is_best_audio_option": True,
+                                               "audio_passthrough": True}, False),
+    'shared_stream': ('video', lambda fs: next(f for f in fs if f['format_id'] == 'video-720p'), True),
+}
+
+
+def phase_summary(tracer):
+    durations = {}
+    for span in tracer.spans():
+        if span.end is not None:
+            durations.setdefault(span.phase, []).append(span.end - span.start)
+    return {phase: summarize(values) for phase, values in sorted(durations.items())}
+
+
+def run_scenario(server, name, concurrency, jobs_per_slot=2, trace_path=None, fragments=1, prefetch_info=False):
+    choice, pick_format, shared = SCENARIOS[name]
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    engine = HeadlessEngine(os.path.join(work_dir, 'cache'), fragments)
+    try:
+        probe_url = f"{server.base_url}/watch/{name}-probe"
+        extract_started = time.perf_counter()
+        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+            info = ydl.extract_info(probe_url, download=False)
+        extract_seconds = time.perf_counter() - extract_started
+        format_info = pick_format(info['formats'])
+
+        total_jobs = concurrency * jobs_per_slot
+        jobs = []
+        for n in range(total_jobs):
+            video_id = f"{name}-shared" if shared else f"{name}-{concurrency}-{n}"
+            job = gui.DownloadJob(f"{server.base_url}/watch/{video_id}", choice, dict(format_info), "None",
+                                  os.path.join(work_dir, 'out', str(n)), title=f"{name} {n}", video_id=video_id,
+                                  thumbnail_url=thumbnail_url_of(info))
+            job.tree_item_id = f"job{n}"
+            jobs.append(job)
+        engine.jobs.extend(jobs)
+
+        started_at = {}
+
+        def run_job(job):
+            started_at[job.tree_item_id] = time.perf_counter()
+            while True:
+                job.status = "Downloading"
+                engine.download_worker(job)
+                if job.status != "Retrying":
+                    break
+                # Same wait the app's dispatcher would observe, holding the slot meanwhile
+                time.sleep(max(job.retry_at - time.monotonic(), 0))
+
+        if prefetch_info:
+            # What the app does for jobs next in line: extraction happens before their slot opens
+            engine.info_refresher.refresh(jobs)
+            while engine.info_refresher.pending():
+                time.sleep(0.05)
+        SESSIONS.close_all()  # every scenario starts without warm sessions
+        sessions_before = dict(SESSIONS.stats)
+        server_before = dict(server.stats)
+        bytes_before = server.stats['bytes_sent']
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(run_job, jobs))
+        wall_seconds = time.perf_counter() - wall_started
+        bytes_sent = server.stats['bytes_sent'] - bytes_before
+        connections = server.stats['connections'] - server_before['connections']
+        requests = server.stats['requests'] - server_before['requests']
+        sessions = {event: SESSIONS.stats[event] - sessions_before[event] for event in SESSIONS.stats}
+        transcodes = engine.transcoder.stats()
+        disk = engine.disk_space.stats()
+        if trace_path:
+            engine.tracer.export_chrome_trace(trace_path)
+    finally:
+        engine.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    completed = [j for j in jobs if j.status == "Completed"]
+    ttfb = [engine.first_byte_at[j.tree_item_id] - started_at[j.tree_item_id]
+            for j in jobs if j.tree_item_id in engine.first_byte_at]
+    merge_times = []
+    for job in jobs:
+        events = engine.status_events.get(job.tree_item_id, [])
+        processing = next((t for t, status in events if status == "Processing"), None)
+        done = next((t for t, status in reversed(events) if status == "Completed"), None)
+        if processing is not None and done is not None:
+            merge_times.append(done - processing)
+
+    return {
+        'scenario': name,
+        'concurrency': concurrency,
+        'jobs': total_jobs,
+        'completed': len(completed),
+        'failed': total_jobs - len(completed),
+        'job_retries': {kind: sum(j.retries.get(kind, 0) for j in jobs) for kind in RETRY_POLICIES
+                        if any(kind in j.retries for j in jobs)},
+        'wall_seconds': wall_seconds,
+        'jobs_per_hour': len(completed) / wall_seconds * 3600 if wall_seconds else 0,
+        'bytes_per_s': bytes_sent / wall_seconds if wall_seconds else 0,
+        'bytes_sent': bytes_sent,
+        'connections': connections,
+        'requests': requests,
+        'sessions': sessions,
+        'disk': disk,
+        'info_refresh': dict(engine.info_refresher.stats),
+        'extract_seconds': extract_seconds,
+        'ttfb_seconds': summarize(ttfb),
+        'merge_seconds': summarize(merge_times),
+        'ui_queue_lag_seconds': summarize(engine.ui_lags),
+        'ui_tick_delay_seconds': summarize(list(engine.watchdog.delays)),
+        'ui_stalls': len(engine.watchdog.stalls),
+        'phase_seconds': phase_summary(engine.tracer),
+        'transcodes': transcodes,
+    }
+
+
+def run_policy_scenario(server, policy, slots, large_jobs=2, small_jobs=8):
+    """Mixed workload (progressive videos queued ahead of audio-only jobs) dispatched by one scheduling policy.
+
+    Completion time is measured from the start of the batch to the end of each job, so it includes the
+    time a job waited for a slot; that wait is what the policies trade off.
+    """
+    work_dir = tempfile.mkdtemp(prefix=f"bench_policy_{policy}_")
+    engine = HeadlessEngine(os.path.join(work_dir, 'cache'))
+    try:
+        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+            info = ydl.extract_info(f"{server.base_url}/watch/policy-probe", download=False)
+        large_format = next(f for f in info['formats'] if f['format_id'] == 'combined-720p')
+        small_format = {**next(f for f in info['formats'] if f['format_id'] == 'audio-aac'), 'audio_passthrough': True}
+        # Anything between the two sizes tells them apart
+        small_bytes = (large_format['filesize'] + small_format['filesize']) // 2
+        scheduler = Scheduler(slots, policy, small_slots=1, small_bytes=small_bytes)
+
+        jobs = []
+        for n in range(large_jobs + small_jobs):
+            large = n < large_jobs
+            video_id = f"policy-{policy}-{slots}-{n}"
+            job = gui.DownloadJob(f"{server.base_url}/watch/{video_id}", 'video' if large else 'audio',
+                                  dict(large_format if large else small_format), "None",
+                                  os.path.join(work_dir, 'out', str(n)), title=f"{policy} {n}", video_id=video_id,
+                                  thumbnail_url=thumbnail_url_of(info))
+            job.tree_item_id = f"job{n}"
+            job.auto_start = True
+            jobs.append(job)
+        engine.jobs.extend(jobs)
+
+        SESSIONS.close_all()
+        finished_at = {}
+        running = []
+        changed = threading.Condition()
+
+        def run_job(job):
+            try:
+                engine.download_worker(job)
+            finally:
+                with changed:
+                    finished_at[job.tree_item_id] = time.perf_counter()
+                    running.remove(job)
+                    changed.notify()
+
+        wall_started = time.perf_counter()
+        with changed:
+            while len(finished_at) < len(jobs):
+                for job in scheduler.next_jobs(jobs, running):
+                    job.status = "Downloading"
+                    running.append(job)
+                    threading.Thread(target=run_job, args=(job,), daemon=True).start()
+                changed.wait()
+        wall_seconds = time.perf_counter() - wall_started
+    finally:
+        engine.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    completion = {job.tree_item_id: finished_at[job.tree_item_id] - wall_started for job in jobs}
+    return {
+        'policy': policy,
+        'slots': slots,
+        'jobs': len(jobs),
+        'completed': sum(1 for job in jobs if job.status == "Completed"),
+        'wall_seconds': wall_seconds,
+        'completion_seconds': summarize(list(completion.values())),
+        'large_completion_seconds': summarize([completion[j.tree_item_id] for j in jobs[:large_jobs]]),
+        'small_completion_seconds': summarize([completion[j.tree_item_id] for j in jobs[large_jobs:]]),
+    }
@@ -0,0 +1,73 @@
+"""Microbenchmark for the per-call cost of the yt-dlp progress hook.
+
+    python -m bench.hook_microbench
+    python -m bench.hook_microbench --calls 200000 --jobs 500
+"""
+import argparse
+import queue
+import sys
+import time
+
+from bench.harness import gui, percentile
+
+
+class HookTarget:
+    """Just enough app state for ``YTDownloaderApp.ytdl_hook``."""
+
+    ytdl_hook = gui.YTDownloaderApp.ytdl_hook
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.ui_queue = queue.Queue()
+        self.min_update_interval = 0.5
+        self.max_update_interval = 2.0
+
+
+def progress_events(calls, total_bytes=50 * 1024 * 1024):
+    step = total_bytes // calls
+    return [{
+        'status': 'downloading',
+        'filename': 'bench.f137.mp4.part',
+        'downloaded_bytes': step * (n + 1),
+        'total_bytes': total_bytes,
+        'speed': 4.2e6,
+        'eta': (calls - n) // 100,
+        'elapsed': n / 100,
+        '_speed_str': '\x1b[0;32m   4.01MiB/s\x1b[0m',
+        '_eta_str': '\x1b[0;33m00:12\x1b[0m',
+        '_percent_str': '\x1b[0;94m 42.0%\x1b[0m',
+    } for n in range(calls)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100000, help="Progress callbacks per repeat.")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=100, help="Other jobs in the queue while the hook runs.")
+    args = parser.parse_args(argv)
+
+    jobs = [gui.DownloadJob(f"https://example.com/watch/{n}", "video", {"format_id": "137"}, "None", ".",
+                            title=f"job {n}", status="Downloading" if n % 4 == 0 else "Queued")
+            for n in range(args.jobs)]
+    target = HookTarget(jobs)
+    job = jobs[0]
+    job.tree_item_id = "job0"
+    job.current_phase = "video"
+    events = progress_events(args.calls)
+
+    per_call = []
+    for _ in range(args.repeats):
+        job.progress = 0
+        started = time.perf_counter()
+        for d in events:
+            target.ytdl_hook(d, job)
+        per_call.append((time.perf_counter() - started) / args.calls)
+
+    print(f"ytdl_hook: {percentile(per_call, 50) * 1e6:.2f} us/call median, "
+          f"{min(per_call) * 1e6:.2f} us/call best ({args.calls} calls x {args.repeats}, {args.jobs} jobs queued, "
+          f"{target.ui_queue.qsize()} UI messages)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
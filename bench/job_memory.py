@@ -0,0 +1,70 @@
+"""Memory and queue-file footprint per queued job.
+
+    python -m bench.job_memory
+    python -m bench.job_memory --jobs 50000
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from bench.harness import gui
+
+
+def sample_format(n):
+    """A DASH video format roughly as yt-dlp returns it for a large site."""
+    signature = "".join(f"{(n * 7919 + i) % 65536:04x}" for i in range(96))
+    return {
+        'format_id': '137', 'format_note': '1080p', 'ext': 'mp4', 'protocol': 'https',
+        'url': f"https://rr{n % 9}---sn-example.googlevideo.com/videoplayback?expire=1700000000&id=o-{n}"
+               f"&itag=137&source=youtube&requiressl=yes&mime=video%2Fmp4&dur=300.000&sig={signature}",
+        'width': 1920, 'height': 1080, 'fps': 30, 'vcodec': 'avc1.640028', 'acodec': 'none',
+        'vbr': 4400.5, 'tbr': 4400.5, 'filesize': 165000000 + n, 'dynamic_range': 'SDR',
+        'container': 'mp4_dash', 'resolution': '1920x1080', 'aspect_ratio': 1.78,
+        'downloader_options': {'http_chunk_size': 10485760},
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-us,en;q=0.5',
+            'Sec-Fetch-Mode': 'navigate',
+        },
+        'fragments': [{'url': f"sq/{i}", 'duration': 5.0} for i in range(60)],
+    }
+
+
+def make_job(n):
+    return gui.DownloadJob(f"https://www.youtube.com/watch?v={n:011d}", "video", sample_format(n), "None",
+                           "/home/user/Downloads", title=f"Sample video number {n}", video_id=f"{n:011d}")
+
+
+def retained_bytes(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    kept = [factory(n) for n in range(count)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del kept
+    return used / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    per_job = retained_bytes(make_job, args.jobs)
+    full_format = retained_bytes(sample_format, args.jobs)
+    record = make_job(1).to_record()
+    legacy_record = dict(record, format_info=sample_format(1))
+    print(f"memory per queued job:      {per_job:10.0f} B  ({per_job * args.jobs / 2**20:.1f} MiB for {args.jobs} jobs)")
+    print(f"full yt-dlp format dict:    {full_format:10.0f} B  (what each job used to keep)")
+    print(f"queue file per job:         {len(json.dumps(record)) + 2:10d} B")
+    print(f"  with full format, indent: {len(json.dumps(legacy_record, indent=4)) + 2:10d} B")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import time
+import random
+import shutil
+import logging
+import subprocess
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ServerConfig:
+    """Fault/shaping knobs for the local media server.
+
+    All values can also be overridden per request with query parameters of the
+    same name (e.g. ``?latency_ms=200&bandwidth=500000``).
+    """
+
+    def __init__(self, latency_ms=0, bandwidth=0, error_rate=0.0, throttle_rate=0.0, seed=1234):
+        self.latency_ms = latency_ms
+        self.bandwidth = bandwidth  # bytes/s per connection, 0 = unlimited
+        self.error_rate = error_rate  # probability of a 503 on media requests
+        self.throttle_rate = throttle_rate  # probability of a 429 on media requests
+        self.random = random.Random(seed)
+
+
+class MediaAssets:
+    """Synthetic media files generated once with ffmpeg and shared by every video id."""
+
+    def __init__(self, ffmpeg_path='ffmpeg', duration=4, root=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.duration = duration
+        self.root = root or tempfile.mkdtemp(prefix="bench_media_")
+        self.files = {}
+
+    def _ffmpeg(self, *args):
+        cmd = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y', *args]
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def build(self):
+        d = self.duration
+        combined = os.path.join(self.root, 'combined.mp4')
+        sources = ['-f', 'lavfi', '-i', f'testsrc=size=1280x720:rate=30:duration={d}',
+                   '-f', 'lavfi', '-i', f'sine=frequency=440:duration={d}']
+        try:
+            self._ffmpeg(*sources, '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+                         '-c:a', 'aac', '-shortest', combined)
+        except subprocess.CalledProcessError:
+            # ffmpeg builds without libx264 still have the native mpeg4 encoder
+            self._ffmpeg(*sources, '-c:v', 'mpeg4', '-q:v', '5', '-c:a', 'aac', '-shortest', combined)
+        self._ffmpeg('-i', combined, '-an', '-c', 'copy', os.path.join(self.root, 'video.mp4'))
+        self._ffmpeg('-i', combined, '-vn', '-c', 'copy', os.path.join(self.root, 'audio.m4a'))
+        self._ffmpeg('-f', 'lavfi', '-i', 'testsrc=size=480x360', '-frames:v', '1', os.path.join(self.root, 'thumb.jpg'))
+
+        hls_dir = os.path.join(self.root, 'hls')
+        os.makedirs(hls_dir, exist_ok=True)
+        self._ffmpeg('-i', combined, '-c', 'copy', '-f', 'hls', '-hls_time', '1', '-hls_playlist_type', 'vod',
+                     '-hls_segment_filename', os.path.join(hls_dir, 'seg%03d.ts'), os.path.join(hls_dir, 'index.m3u8'))
+        dash_dir = os.path.join(self.root, 'dash')
+        os.makedirs(dash_dir, exist_ok=True)
+        self._ffmpeg('-i', combined, '-map', '0:v', '-map', '0:a', '-c', 'copy', '-f', 'dash', '-seg_duration', '1',
+                     '-use_template', '1', '-use_timeline', '0', os.path.join(dash_dir, 'manifest.mpd'))
+
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                self.files[os.path.relpath(path, self.root).replace(os.sep, '/')] = path
+        logger.info(f"Benchmark media generated in {self.root} ({len(self.files)} files).")
+        return self
+
+    def size(self, name):
+        return os.path.getsize(self.files[name])
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'BenchMedia/1.0'
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.stats['connections'] += 1
+
+    def _option(self, query, name, cast):
+        if name in query:
+            return cast(query[name][0])
+        return getattr(self.server.config, name)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def _handle(self, send_body):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        with self.server.lock:
+            self.server.stats['requests'] += 1
+
+        latency_ms = self._option(query, 'latency_ms', float)
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+
+        m = re.fullmatch(r'/api/([\w-]+)\.json', parsed.path)
+        if m:
+            return self._send_bytes(json.dumps(self.server.describe(m.group(1))).encode('utf-8'),
+                                    'application/json', send_body)
+
+        m = re.fullmatch(r'/v/([\w-]+)/(.+)', parsed.path)
+        if not m or m.group(2) not in self.server.assets.files:
+            return self._send_error(404)
+
+        config = self.server.config
+        with self.server.lock:
+            roll = config.random.random()
+        error_rate = self._option(query, 'error_rate', float)
+        throttle_rate = self._option(query, 'throttle_rate', float)
+        if roll < throttle_rate:
+            with self.server.lock:
+                self.server.stats['throttled'] += 1
+            return self._send_error(429, {'Retry-After': '1'})
+        if roll < throttle_rate + error_rate:
+            with self.server.lock:
+                self.server.stats['errors'] += 1
+            return self._send_error(503)
+
+        name = m.group(2)
+        self._send_file(self.server.assets.files[name], self._content_type(name), send_body,
+                        self._option(query, 'bandwidth', int))
+
+    @staticmethod
+    def _content_type(name):
+        if name.endswith('.m3u8'):
+            return 'application/vnd.apple.mpegurl'
+        if name.endswith('.mpd'):
+            return 'application/dash+xml'
+        if name.endswith('.ts'):
+            return 'video/mp2t'
+        if name.endswith('.jpg'):
+            return 'image/jpeg'
+        if name.endswith('.m4a'):
+            return 'audio/mp4'
+        return 'video/mp4'
+
+    def _send_error(self, code, headers=None):
+        self.send_response(code)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _send_bytes(self, data, content_type, send_body):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+    def _send_file(self, path, content_type, send_body, bandwidth):
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range')
+        m = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header or '')
+        if m and (m.group(1) or m.group(2)):
+            if m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            else:
+                start = max(0, size - int(m.group(2)))
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if not send_body:
+            return
+
+        began = time.monotonic()
+        sent = 0
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                while sent < length:
+                    chunk = f.read(min(CHUNK_SIZE, length - sent))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    if bandwidth:
+                        # Sleep until the average rate drops back to the configured bandwidth
+                        ahead = sent / bandwidth - (time.monotonic() - began)
+                        if ahead > 0:
+                            time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self.server.lock:
+                self.server.stats['bytes_sent'] += sent
+
+
+class LocalMediaServer(ThreadingHTTPServer):
+    """HTTP server for progressive files, HLS/DASH fragments and thumbnails.
+
+    ``/api/<id>.json`` describes a synthetic video (what the extractor stand-in
+    turns into an info dict); ``/v/<id>/<asset>`` serves the media. Every id maps
+    to the same generated assets, so any number of distinct videos can be used.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, assets, config=None, host='127.0.0.1', port=0):
+        super().__init__((host, port), MediaRequestHandler)
+        self.assets = assets
+        self.config = config or ServerConfig()
+        self.lock = threading.Lock()
+        self.stats = {'connections': 0, 'requests': 0, 'bytes_sent': 0, 'errors': 0, 'throttled': 0}
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def describe(self, video_id):
+        base = f"{self.base_url}/v/{video_id}"
+        return {
+            'id': video_id,
+            'title': f"Bench video {video_id}",
+            'duration': self.assets.duration,
+            'thumbnail': f"{base}/thumb.jpg",
+            'progressive': [
+                {'format_id': 'combined-720p', 'url': f"{base}/combined.mp4", 'ext': 'mp4',
+                 'width': 1280, 'height': 720, 'fps': 30, 'vcodec': 'avc1', 'acodec': 'mp4a.40.2',
+                 'filesize': self.assets.size('combined.mp4')},
+                {'format_id': 'video-720p', 'url': f"{base}/video.mp4", 'ext': 'mp4',
+                 'width': 1280, 'height': 720, 'fps': 30, 'vcodec': 'avc1', 'acodec': 'none',
+                 'filesize': self.assets.size('video.mp4')},
+                {'format_id': 'audio-aac', 'url': f"{base}/audio.m4a", 'ext': 'm4a',
+                 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 128,
+                 'filesize': self.assets.size('audio.m4a')},
+            ],
+            'hls': f"{base}/hls/index.m3u8",
+            'dash': f"{base}/dash/manifest.mpd",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Local media server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
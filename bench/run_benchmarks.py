@@ -0,0 +1,173 @@
+"""Offline benchmark suite for the download engine.
+
+Runs end-to-end jobs against a local media server with a yt-dlp extractor
+stand-in, so results don't depend on a live site. Examples:
+
+    python -m bench.run_benchmarks --output bench_results.json
+    python -m bench.run_benchmarks --scenarios split_av,hls --concurrency 1,10 --bandwidth 2000000
+    python -m bench.run_benchmarks --scenarios "" --policies fifo,shortest,mixed --bandwidth 500000
+    python -m bench.run_benchmarks --compare old.json new.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+
+from bench.harness import SCENARIOS, SESSIONS, run_policy_scenario, run_scenario, gui
+from scheduler import SCHEDULING_POLICIES
+from bench.media_server import LocalMediaServer, MediaAssets, ServerConfig
+
+logger = logging.getLogger(__name__)
+
+# metric path -> True if higher is better
+COMPARED_METRICS = {
+    ('jobs_per_hour',): True,
+    ('bytes_per_s',): True,
+    ('connections',): False,
+    ('ttfb_seconds', 'p50'): False,
+    ('merge_seconds', 'p50'): False,
+    ('ui_queue_lag_seconds', 'p95'): False,
+    ('ui_tick_delay_seconds', 'p95'): False,
+    ('transcodes', 'throughput'): True,
+}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metric(result, path):
+    value = result
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(base_path, new_path, threshold):
+    with open(base_path) as f:
+        base = {(r['scenario'], r['concurrency']): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {(r['scenario'], r['concurrency']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        for path, higher_is_better in COMPARED_METRICS.items():
+            old_value, new_value = _metric(base[key], path), _metric(new[key], path)
+            if not old_value or new_value is None:
+                continue
+            change = (new_value - old_value) / old_value
+            regressed = change < -threshold if higher_is_better else change > threshold
+            regressions += regressed
+            print(f"{key[0]:>14} x{key[1]:<4} {'.'.join(path):<28} {old_value:>14.4f} -> {new_value:>14.4f} "
+                  f"({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated scenario names.")
+    parser.add_argument('--concurrency', default="1,10,100", help="Comma-separated concurrent job counts.")
+    parser.add_argument('--jobs-per-slot', type=int, default=2, help="Jobs run per concurrency slot.")
+    parser.add_argument('--duration', type=int, default=4, help="Length of the synthetic media in seconds.")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Added latency per request.")
+    parser.add_argument('--bandwidth', type=int, default=0, help="Per-connection bandwidth cap in bytes/s (0 = unlimited).")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a 503 on media requests.")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Probability of a 429 on media requests.")
+    parser.add_argument('--output', default="bench_results.json", help="Where to write machine-readable results.")
+    parser.add_argument('--no-session-pool', action='store_true',
+                        help="Open a fresh YoutubeDL for every call, to measure what the session pool saves.")
+    parser.add_argument('--transcode-workers', type=int, default=gui.TRANSCODE_WORKERS,
+                        help="Concurrent MP3 encodes (default: one per core).")
+    parser.add_argument('--fragment-threads', type=int, default=1,
+                        help="concurrent_fragment_downloads for HLS/DASH scenarios.")
+    parser.add_argument('--prefetch-info', action='store_true',
+                        help="Extract every job's metadata before the scenario starts, as the app does for queued jobs.")
+    parser.add_argument('--policies', default="",
+                        help=f"Comma-separated scheduling policies to compare ({', '.join(SCHEDULING_POLICIES)}) "
+                             "on a mixed large/small workload.")
+    parser.add_argument('--policy-slots', type=int, default=2, help="Download slots for the policy comparison.")
+    parser.add_argument('--trace-dir', help="Write a Chrome trace-event file per scenario run into this directory.")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Compare two result files and exit.")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative change treated as a regression.")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+
+    logging.getLogger().setLevel(logging.WARNING)  # gui.py logs every job step at INFO
+    SESSIONS.enabled = not args.no_session_pool
+    gui.TRANSCODE_WORKERS = args.transcode_workers
+    assets = MediaAssets(ffmpeg_path=gui.ffmpeg_path, duration=args.duration).build()
+    config = ServerConfig(latency_ms=args.latency_ms, bandwidth=args.bandwidth,
+                          error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    server = LocalMediaServer(assets, config).start()
+    if args.trace_dir:
+        os.makedirs(args.trace_dir, exist_ok=True)
+    results = []
+    policy_results = []
+    try:
+        for name in filter(None, args.scenarios.split(',')):
+            for concurrency in (int(c) for c in args.concurrency.split(',')):
+                trace_path = os.path.join(args.trace_dir, f"{name}_x{concurrency}.json") if args.trace_dir else None
+                result = run_scenario(server, name, concurrency, args.jobs_per_slot, trace_path, args.fragment_threads,
+                                      args.prefetch_info)
+                results.append(result)
+                print(f"{name:>14} x{concurrency:<4} {result['completed']}/{result['jobs']} ok  "
+                      f"{result['jobs_per_hour']:10.0f} jobs/h  {result['bytes_per_s'] / 1e6:8.2f} MB/s  "
+                      f"ttfb p50 {result['ttfb_seconds']['p50'] or 0:.3f}s  "
+                      f"ui lag p95 {result['ui_queue_lag_seconds']['p95'] or 0:.3f}s  "
+                      f"tick delay p95 {result['ui_tick_delay_seconds']['p95'] or 0:.3f}s  stalls {result['ui_stalls']}  "
+                      f"{result['connections']} conns/{result['requests']} reqs  "
+                      f"sessions {result['sessions']['created']} new/{result['sessions']['reused']} reused")
+                transcodes = result['transcodes']
+                if transcodes['done']:
+                    print(f"{'':>20} {transcodes['done']} encodes on {transcodes['workers']} workers: "
+                          f"{transcodes['audio_seconds']:.0f}s of audio in {transcodes['busy_seconds']:.1f}s "
+                          f"({transcodes['throughput'] or 0:.1f}x realtime)")
+                if result['disk']['waiting']:
+                    print(f"{'':>20} {result['disk']['waiting']} jobs paused waiting for disk space")
+                if result['job_retries']:
+                    print(f"{'':>20} job retries: " + ", ".join(f"{count} {kind}" for kind, count in result['job_retries'].items()))
+        for policy in filter(None, args.policies.split(',')):
+            result = run_policy_scenario(server, policy, args.policy_slots)
+            policy_results.append(result)
+            print(f"{policy:>14} x{args.policy_slots:<4} {result['completed']}/{result['jobs']} ok  "
+                  f"mean completion {result['completion_seconds']['mean']:.2f}s  "
+                  f"(small {result['small_completion_seconds']['mean']:.2f}s, "
+                  f"large {result['large_completion_seconds']['mean']:.2f}s)  wall {result['wall_seconds']:.2f}s")
+    finally:
+        server.stop()
+        assets.cleanup()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'server': {'latency_ms': args.latency_ms, 'bandwidth': args.bandwidth,
+                       'error_rate': args.error_rate, 'throttle_rate': args.throttle_rate},
+            'media_duration': args.duration,
+            'session_pool': SESSIONS.enabled,
+            'transcode_workers': gui.TRANSCODE_WORKERS,
+            'fragment_threads': args.fragment_threads,
+            'prefetch_info': args.prefetch_info,
+        },
+        'results': results,
+        'policy_results': policy_results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Cold-start numbers: module import, window-ready time and first-fetch latency.
+
+Every measurement runs in a fresh interpreter so import caches don't leak
+between runs. First-fetch latency is measured against the local media server,
+once cold and once after ``warmup.warm_up`` has run.
+
+    python -m bench.startup
+    python -m bench.startup --repeats 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench.harness import BENCH_DIR, ROOT_DIR, gui, summarize
+from bench.media_server import LocalMediaServer, MediaAssets
+
+PRELUDE = f"""
+import json, sys, time
+started = time.perf_counter()
+sys.path[:0] = [{BENCH_DIR!r}, {ROOT_DIR!r}]
+"""
+
+IMPORT_GUI = PRELUDE + """
+import gui
+print(json.dumps({'value': time.perf_counter() - started}))
+"""
+
+IMPORT_YTDLP = PRELUDE + """
+import yt_dlp
+print(json.dumps({'value': time.perf_counter() - started}))
+"""
+
+WINDOW_READY = PRELUDE + """
+import gui
+try:
+    app = gui.YTDownloaderApp()
+except Exception:  # no display
+    print(json.dumps({'value': None}))
+    sys.exit(0)
+app.update()
+ready = time.perf_counter() - started
+app.watchdog.stop()
+app.destroy()
+print(json.dumps({'value': ready}))
+"""
+
+FIRST_FETCH = PRELUDE + """
+from warmup import yt_dlp, warm_up
+if {warm}:
+    warm_up({ffmpeg!r})
+fetch_started = time.perf_counter()
+with yt_dlp.YoutubeDL({{'quiet': True, 'no_warnings': True}}) as ydl:
+    ydl.extract_info({url!r}, download=False)
+print(json.dumps({{'value': time.perf_counter() - fetch_started}}))
+"""
+
+
+def run_snippet(code, cwd):
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "snippet failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])['value']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="Also write the results as JSON.")
+    args = parser.parse_args(argv)
+
+    assets = MediaAssets(ffmpeg_path=gui.ffmpeg_path, duration=1).build()
+    server = LocalMediaServer(assets).start()
+    # Run from an empty directory so the app doesn't load (or rewrite) a real download_queue.json
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    snippets = {
+        'import_ytdlp_seconds': IMPORT_YTDLP,
+        'import_gui_seconds': IMPORT_GUI,
+        'window_ready_seconds': WINDOW_READY,
+        'first_fetch_cold_seconds': FIRST_FETCH.format(warm=False, ffmpeg=gui.ffmpeg_path, url=f"{server.base_url}/watch/startup"),
+        'first_fetch_warm_seconds': FIRST_FETCH.format(warm=True, ffmpeg=gui.ffmpeg_path, url=f"{server.base_url}/watch/startup"),
+    }
+    results = {}
+    try:
+        for name, code in snippets.items():
+            values = [run_snippet(code, work_dir) for _ in range(args.repeats)]
+            values = [v for v in values if v is not None]
+            results[name] = summarize(values)
+            p50 = results[name]['p50']
+            print(f"{name:>26}: " + (f"{p50:.3f}s p50" if p50 is not None else "n/a (no display)"))
+    finally:
+        server.stop()
+        assets.cleanup()
+        for leftover in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, leftover))
+        os.rmdir(work_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+from yt_dlp.extractor.common import InfoExtractor
+
+
+class BenchLocalIE(InfoExtractor):
+    """Extractor stand-in for the benchmark media server (bench/media_server.py).
+
+    Loaded by yt-dlp's plugin mechanism when ``bench/`` is on ``sys.path``.
+    """
+
+    IE_NAME = 'benchlocal'
+    _VALID_URL = r'https?://(?P<host>127\.0\.0\.1|localhost):(?P<port>\d+)/watch/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        mobj = self._match_valid_url(url)
+        video_id = mobj.group('id')
+        base = f"http://{mobj.group('host')}:{mobj.group('port')}"
+        meta = self._download_json(f"{base}/api/{video_id}.json", video_id)
+
+        formats = [dict(f, protocol='https' if f['url'].startswith('https') else 'http') for f in meta['progressive']]
+        formats.extend(self._extract_m3u8_formats(
+            meta['hls'], video_id, 'mp4', entry_protocol='m3u8_native', m3u8_id='hls', fatal=False))
+        formats.extend(self._extract_mpd_formats(meta['dash'], video_id, mpd_id='dash', fatal=False))
+
+        return {
+            'id': video_id,
+            'title': meta['title'],
+            'duration': meta.get('duration'),
+            'thumbnail': meta.get('thumbnail'),
+            'formats': formats,
+        }
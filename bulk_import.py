@@ -0,0 +1,187 @@
+import csv
+import io
+import re
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metrics import METRICS
+from ytdl_sessions import SESSIONS
+
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r'https?://[^\s,;"\'<>]+')
+
+
+def parse_url_list(text):
+    """Extract URLs from pasted text or CSV content, keeping order and dropping duplicates."""
+    urls = []
+    seen = set()
+    try:
+        rows = list(csv.reader(io.StringIO(text)))
+    except csv.Error:
+        rows = [[line] for line in text.splitlines()]
+    for row in rows:
+        for cell in row:
+            for url in URL_RE.findall(cell):
+                url = url.rstrip(').]')
+                if url not in seen:
+                    seen.add(url)
+                    urls.append(url)
+    return urls
+
+
+def read_url_file(path):
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        return parse_url_list(f.read())
+
+
+class FormatPolicy:
+    """Picks a format from an extracted info dict without user interaction."""
+
+    def __init__(self, name, choice, max_height=None, passthrough=False):
+        self.name = name
+        self.choice = choice
+        self.max_height = max_height
+        self.passthrough = passthrough
+
+    def _best_audio(self):
+        fmt = {"format_id": "bestaudio/best", "is_best_audio_option": True}
+        if self.passthrough:
+            fmt["audio_passthrough"] = True
+        return fmt
+
+    def select(self, info):
+        if self.choice == 'audio':
+            return self._best_audio()
+
+        candidates = []
+        for f in info.get('formats') or []:
+            if f.get('vcodec') == 'none' or not f.get('format_id'):
+                continue
+            height = f.get('height') or 0
+            if self.max_height and height > self.max_height:
+                continue
+            candidates.append(f)
+        if not candidates:
+            return None
+        # Video-only streams get bestaudio merged in by download_worker, so both kinds end up with audio
+        return max(candidates, key=lambda f: (
+            f.get('height') or 0,
+            f.get('fps') or 0,
+            f.get('tbr') or 0,
+            f.get('filesize') or f.get('filesize_approx') or 0,
+        ))
+
+    def selector(self):
+        """Format info for entries whose formats aren't known yet (e.g. flat playlist entries).
+
+        yt-dlp resolves the selector string at download time, so no per-entry
+        metadata extraction is needed up front.
+        """
+        if self.choice == 'audio':
+            return self._best_audio()
+        h = f"[height<={self.max_height}]" if self.max_height else ""
+        return {
+            "format_id": f"bv*{h}[ext=mp4]+ba[ext=m4a]/b{h}[ext=mp4]/bv*{h}+ba/b{h}",
+            "ext": "mp4",
+            "height": self.max_height,
+            "is_format_selector": True,
+        }
+
+
+FORMAT_POLICIES = [
+    FormatPolicy("Best video ≤1080p with audio", 'video', max_height=1080),
+    FormatPolicy("Best video ≤720p with audio", 'video', max_height=720),
+    FormatPolicy("Best video ≤480p with audio", 'video', max_height=480),
+    FormatPolicy("Best video (any resolution) with audio", 'video'),
+    FormatPolicy("Best audio (MP3)", 'audio'),
+    FormatPolicy("Best audio (original codec, no re-encode)", 'audio', passthrough=True),
+]
+
+
+class BulkImporter:
+    """Extracts metadata for many URLs through a bounded thread pool.
+
+    ``on_result(url, info, format_info)`` is called from worker threads for every
+    URL that produced a usable format. ``done``/``total``/``failures`` can be polled
+    for progress and ``finished`` is set once every URL has been handled. Results whose
+    video id is in ``known``, or was already reported, are counted in ``duplicates`` instead.
+    """
+
+    def __init__(self, policy, max_workers=6, known=()):
+        self.policy = policy
+        self.max_workers = max_workers
+        self.known = set(known)
+        self.duplicates = 0
+        self.cancel_event = threading.Event()
+        self.finished = threading.Event()
+        self.failures = []
+        self.done = 0
+        self.total = 0
+
+    def _extract(self, url):
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'noplaylist': True,
+            'extract_flat': 'in_playlist',
+        }
+        started = time.perf_counter()
+        try:
+            with SESSIONS.session(ydl_opts, url) as ydl:
+                info = ydl.extract_info(url, download=False)
+        except Exception:
+            METRICS.extract_failed(url)
+            raise
+        METRICS.observe_extract(url, info, time.perf_counter() - started)
+        return info
+
+    def _process(self, url):
+        if self.cancel_event.is_set():
+            return None
+        info = self._extract(url)
+        if info.get('_type') in ('playlist', 'multi_video'):
+            raise ValueError("Playlist URLs are not supported by bulk import.")
+        format_info = self.policy.select(info)
+        if not format_info:
+            raise ValueError(f"No format matches policy '{self.policy.name}'.")
+        return info, format_info
+
+    def run(self, urls, on_result):
+        self.total = len(urls)
+        logger.info(f"Bulk import started for {self.total} URLs with policy '{self.policy.name}' ({self.max_workers} workers).")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._process, url): url for url in urls}
+                for future in as_completed(futures):
+                    url = futures[future]
+                    if not future.cancelled():
+                        try:
+                            result = future.result()
+                            if result is not None and not self._is_duplicate(result[0].get('id')):
+                                on_result(url, *result)
+                        except Exception as e:
+                            self.failures.append((url, str(e)))
+                            logger.warning(f"Bulk import failed for {url}: {e}")
+                    self.done += 1
+                    if self.cancel_event.is_set():
+                        for pending in futures:
+                            pending.cancel()
+        finally:
+            self.finished.set()
+        logger.info(f"Bulk import finished: {self.done - len(self.failures) - self.duplicates} of {self.total} URLs processed, {len(self.failures)} failed, {self.duplicates} already queued.")
+
+    def _is_duplicate(self, video_id):
+        if not video_id:
+            return False
+        if video_id in self.known:
+            self.duplicates += 1
+            return True
+        self.known.add(video_id)
+        return False
+
+    def cancel(self):
+        self.cancel_event.set()
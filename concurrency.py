@@ -0,0 +1,154 @@
+import time
+import logging
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyController:
+    """AIMD control of download slots and per-download fragment threads.
+
+    ``tick()`` runs every few seconds with the number of running and waiting
+    jobs, and how many of the running ones have received bytes. It reads
+    aggregate bytes downloaded plus yt-dlp retries and HTTP 429s from the
+    metrics counters:
+
+    - Any retry or 429 since the last tick halves both knobs (multiplicative
+      decrease) and holds them for ``hold_ticks``. Jobs failing for other
+      reasons (a removed video, a failed merge) say nothing about the link.
+    - Otherwise, if every slot is busy and jobs are waiting, one slot is added
+      (additive increase). Once slots are at their bound, a fragment thread
+      is added instead, for the HLS/DASH downloads started next.
+    - An increase is judged once it has taken effect: for a slot, from the
+      moment the added job reports bytes (it spends its first seconds
+      extracting), otherwise after ``settle`` seconds. If throughput over
+      that window isn't ``min_gain`` above the rate before the increase, it
+      is taken back and held: the pipe or the disk is already full, and
+      another stream would only add contention.
+
+    ``saturated`` is set by a backoff or a taken-back increase and cleared
+    once an increase pays off or the link goes idle; the scheduler uses it to
+    keep bulk jobs from competing with an interactive one for bandwidth.
+
+    The slot target is applied to ``scheduler.max_active``. Fragment threads
+    apply to downloads started afterwards.
+    """
+
+    def __init__(self, scheduler, min_slots=1, max_slots=8, max_fragments=4, min_gain=0.05, hold_ticks=3,
+                 settle=20.0, metrics=METRICS):
+        self.scheduler = scheduler
+        self.min_slots = min_slots
+        self.max_slots = max_slots
+        self.max_fragments = max_fragments
+        self.min_gain = min_gain
+        self.hold_ticks = hold_ticks
+        self.settle = settle
+        self.metrics = metrics
+        self.enabled = True
+        self.fragments = 1
+        self.rate = 0.0
+        self.reason = "start"
+        self.saturated = False
+        self._last = None  # (time, bytes, trouble count)
+        self._probe = None  # pending increase, see _probe_result()
+        self._hold = 0
+        self._publish()
+
+    @property
+    def slots(self):
+        return self.scheduler.max_active
+
+    def _counters(self):
+        m = self.metrics
+        return m.downloaded_bytes.total(), m.retries.total() + m.throttled.total()
+
+    def _publish(self):
+        if self.metrics:
+            self.metrics.concurrency_target.set(self.slots, knob="slots")
+            self.metrics.concurrency_target.set(self.fragments, knob="fragments")
+
+    def _set(self, slots, fragments, reason):
+        slots = min(max(slots, self.min_slots), self.max_slots)
+        fragments = min(max(fragments, 1), self.max_fragments)
+        if (slots, fragments) != (self.slots, self.fragments):
+            logger.info(f"Concurrency {self.slots}x{self.fragments} -> {slots}x{fragments} ({reason}, "
+                        f"{self.rate / (1024 * 1024):.2f} MB/s)")
+        self.scheduler.max_active = slots
+        self.fragments = fragments
+        self.reason = reason
+        self._publish()
+
+    def _start_probe(self, knob, now, downloaded, downloading):
+        self._probe = {'knob': knob, 'before': self.rate, 'started': now, 'since': now, 'bytes': downloaded,
+                       'downloading': downloading, 'effective': False}
+
+    def _probe_result(self, now, downloaded, downloading):
+        """Throughput since the pending increase took effect, or None while it is still settling."""
+        probe = self._probe
+        if (probe['knob'] == "slots" and not probe['effective'] and downloading is not None
+                and downloading > probe['downloading']):
+            # The added job is receiving bytes: measure from here on
+            probe.update(effective=True, since=now, bytes=downloaded)
+            return None
+        if not probe['effective'] and now - probe['started'] < self.settle:
+            return None
+        if now <= probe['since']:
+            return None
+        return (downloaded - probe['bytes']) / (now - probe['since'])
+
+    def tick(self, active, backlog, now=None, downloading=None):
+        """Updates the targets; returns True when more jobs may start now.
+
+        ``downloading`` is the number of running jobs that have received bytes;
+        without it, slot increases are judged after the settle time as well.
+        """
+        now = time.monotonic() if now is None else now
+        downloaded, trouble = self._counters()
+        last, self._last = self._last, (now, downloaded, trouble)
+        if last is None or now <= last[0]:
+            return False
+        self.rate = (downloaded - last[1]) / (now - last[0])
+        if not self.enabled or not active:
+            self.saturated = False
+        if not self.enabled:
+            return False
+
+        if trouble > last[2]:
+            self._probe = None
+            self._hold = self.hold_ticks
+            self.saturated = True
+            self._set(self.slots // 2, self.fragments // 2, "backing off after retries/throttling")
+            return False
+        if self._hold:
+            self._hold -= 1
+            return False
+
+        if self._probe:
+            rate = self._probe_result(now, downloaded, downloading)
+            if rate is None:
+                return False
+            knob, before = self._probe['knob'], self._probe['before']
+            self._probe = None
+            if rate < before * (1 + self.min_gain):
+                self._hold = self.hold_ticks
+                self.saturated = True
+                if knob == "slots":
+                    self._set(self.slots - 1, self.fragments, "extra slot didn't help")
+                else:
+                    self._set(self.slots, self.fragments - 1, "extra fragment thread didn't help")
+                return False
+            self.saturated = False
+
+        if backlog and active >= self.slots and self.slots < self.max_slots:
+            self._start_probe("slots", now, downloaded, downloading)
+            self._set(self.slots + 1, self.fragments, "probing")
+            return True
+        if backlog and self.slots >= self.max_slots and self.fragments < self.max_fragments:
+            self._start_probe("fragments", now, downloaded, downloading)
+            self._set(self.slots, self.fragments + 1, "probing fragments")
+        return False
+
+    def describe(self):
+        mode = "adaptive" if self.enabled else "fixed"
+        return f"Slots: {self.slots} ({mode}) | Fragments: {self.fragments} | {self.rate / (1024 * 1024):.2f} MB/s"
@@ -0,0 +1,283 @@
+import os
+import sys
+import errno
+import shutil
+import ctypes
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+GiB = 1024 * 1024 * 1024
+MIN_FREE_BYTES = 1 * GiB  # headroom admission never hands out
+LOW_SPACE_BYTES = 256 * 1024 * 1024  # running jobs on a disk are paused below this
+UNKNOWN_VIDEO_BYTES = 2 * GiB  # formats without filesize/filesize_approx
+UNKNOWN_AUDIO_BYTES = 100 * 1024 * 1024
+AUDIO_SHARE = 0.15  # bestaudio next to a video-only stream of unknown audio size
+
+OUT_OF_SPACE_TEXT = ("no space left on device", "not enough space on the disk", "disk quota exceeded")
+
+
+def format_bytes(num_bytes):
+    if num_bytes >= GiB:
+        return f"{num_bytes / GiB:.1f} GB"
+    return f"{num_bytes / (1024 * 1024):.0f} MB"
+
+
+def format_size(format_info):
+    return format_info.get('filesize') or format_info.get('filesize_approx') or None
+
+
+def estimate_job_bytes(choice, format_info, out_dir, cache_dir):
+    """Peak disk use of a job as {directory: bytes}, counting every copy that exists at once."""
+    size = format_size(format_info)
+    if choice == "audio":
+        size = size or UNKNOWN_AUDIO_BYTES
+        # The native stream stays until the copy or encode (an MP3 can outgrow an Opus source) is written
+        return {out_dir: size * (2 if format_info.get('audio_passthrough') else 3)}
+    if format_info.get('vcodec') != 'none' and format_info.get('acodec') == 'none':
+        video = size or UNKNOWN_VIDEO_BYTES
+        streams = video + int(video * AUDIO_SHARE)
+        # Both streams stay in the stream cache while ffmpeg writes the merged file
+        return {cache_dir: streams, out_dir: streams}
+    # The thumbnail/subtitle remux writes a second copy before replacing the download
+    return {out_dir: (size or UNKNOWN_VIDEO_BYTES) * 2}
+
+
+def is_out_of_space(exc):
+    """True for ENOSPC/EDQUOT, also when wrapped in a yt-dlp DownloadError or an ffmpeg error message."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, OSError) and exc.errno in (errno.ENOSPC, errno.EDQUOT):
+            return True
+        text = f"{exc} {getattr(exc, 'stderr', '') or ''}".lower()
+        if any(marker in text for marker in OUT_OF_SPACE_TEXT):
+            return True
+        exc_info = getattr(exc, 'exc_info', None)
+        exc = (exc_info[1] if exc_info else None) or exc.__cause__ or exc.__context__
+    return False
+
+
+class InsufficientSpace(Exception):
+    """Raised by ``DiskSpaceManager.reserve`` when a job's estimate doesn't fit."""
+
+    def __init__(self, path, needed, available):
+        super().__init__(f"needs {format_bytes(needed)} on {path}, {format_bytes(max(available, 0))} available")
+        self.path = path
+        self.needed = needed
+        self.available = available
+
+
+def _existing_dir(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+if sys.platform.startswith("linux"):
+    FALLOC_FL_KEEP_SIZE = 1
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _fallocate = getattr(_libc, "fallocate64", None) or getattr(_libc, "fallocate", None)
+    if _fallocate is not None:
+        _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+        _fallocate.restype = ctypes.c_int
+
+    def _preallocate(path, size):
+        if _fallocate is None:
+            raise OSError(errno.EOPNOTSUPP, "fallocate not available")
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            # KEEP_SIZE reserves extents without moving EOF, so yt-dlp's resume offset stays right
+            if _fallocate(fd, FALLOC_FL_KEEP_SIZE, 0, size) != 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err), path)
+        finally:
+            os.close(fd)
+
+elif sys.platform == "win32":
+    import msvcrt
+    from ctypes import wintypes
+
+    FILE_ALLOCATION_INFO_CLASS = 5
+
+    class _FileAllocationInfo(ctypes.Structure):
+        _fields_ = [("AllocationSize", ctypes.c_int64)]
+
+    _SetFileInformationByHandle = ctypes.windll.kernel32.SetFileInformationByHandle
+    _SetFileInformationByHandle.argtypes = [wintypes.HANDLE, ctypes.c_int, ctypes.c_void_p, wintypes.DWORD]
+    _SetFileInformationByHandle.restype = wintypes.BOOL
+
+    def _preallocate(path, size):
+        fd = os.open(path, os.O_WRONLY | os.O_BINARY)
+        try:
+            info = _FileAllocationInfo(size)
+            # Allocation size only; the end of file (and so the resume offset) is untouched
+            if not _SetFileInformationByHandle(msvcrt.get_osfhandle(fd), FILE_ALLOCATION_INFO_CLASS,
+                                               ctypes.byref(info), ctypes.sizeof(info)):
+                raise ctypes.WinError()
+        finally:
+            os.close(fd)
+
+else:
+    def _preallocate(path, size):
+        raise OSError(errno.EOPNOTSUPP, "preallocation not supported on this platform")
+
+
+class _Reservation:
+    def __init__(self, job, devices):
+        self.job = job
+        self.devices = devices  # st_dev -> (directory, bytes)
+
+
+class DiskSpaceManager:
+    """Space reservations per disk, so jobs are only admitted when their output fits.
+
+    A job reserves its estimated peak use before downloading and releases it
+    when its worker ends. Admission checks the free space reported by the OS
+    minus every outstanding reservation on the same device minus
+    ``min_free``. That counts bytes running jobs have already written twice,
+    which errs on the side of waiting. Jobs that don't fit are parked in
+    ``waiting`` and handed back by ``resumable()`` once they would.
+    """
+
+    def __init__(self, min_free=MIN_FREE_BYTES, low_space=LOW_SPACE_BYTES, disk_usage=shutil.disk_usage):
+        self.min_free = min_free
+        self.low_space = low_space
+        self.disk_usage = disk_usage
+        self._reservations = {}  # job -> _Reservation
+        self._no_prealloc = set()  # devices where preallocation failed once
+        self.waiting = {}  # job -> [{directory: bytes}, ...], oldest first
+        self._lock = threading.Lock()
+        self.preallocated_bytes = 0
+
+    @staticmethod
+    def device_of(path):
+        path = _existing_dir(path)
+        return os.stat(path).st_dev, path
+
+    def _by_device(self, needs):
+        devices = {}
+        for directory, size in needs.items():
+            dev, existing = self.device_of(directory)
+            known_dir, total = devices.get(dev, (existing, 0))
+            devices[dev] = (known_dir, total + int(size))
+        return devices
+
+    def _reserved_on(self, dev, exclude=None):
+        return sum(r.devices[dev][1] for job, r in self._reservations.items() if dev in r.devices and job is not exclude)
+
+    def _available(self, dev, directory, job=None):
+        return self.disk_usage(directory).free - self._reserved_on(dev, job) - self.min_free
+
+    def _check(self, devices, job=None):
+        for dev, (directory, size) in devices.items():
+            available = self._available(dev, directory, job)
+            if size > available:
+                raise InsufficientSpace(directory, size, available)
+
+    def headroom(self, needs):
+        """Bytes left on the tightest disk if ``needs`` were reserved; negative when they don't fit."""
+        devices = self._by_device(needs)
+        with self._lock:
+            return min(self._available(dev, directory) - size for dev, (directory, size) in devices.items())
+
+    def reserve(self, job, needs):
+        """Reserves ``needs`` ({directory: bytes}) for ``job``; raises ``InsufficientSpace``."""
+        devices = self._by_device(needs)
+        with self._lock:
+            self._check(devices, job)
+            self._reservations[job] = _Reservation(job, devices)
+            self.waiting.pop(job, None)
+        logger.info(f"Reserved {format_bytes(sum(size for _, size in devices.values()))} of disk space for '{job.title}'")
+
+    def release(self, job):
+        with self._lock:
+            self._reservations.pop(job, None)
+
+    def wait_for_space(self, job, *needs):
+        """Parks ``job`` until one of ``needs`` ({directory: bytes}, one per place it could go) fits."""
+        with self._lock:
+            self.waiting[job] = list(needs)
+
+    def forget(self, job):
+        with self._lock:
+            self.waiting.pop(job, None)
+
+    def _fits(self, needs):
+        try:
+            self._check(self._by_device(needs))
+        except (InsufficientSpace, OSError):
+            return False
+        return True
+
+    def resumable(self):
+        """Waiting jobs that fit now, oldest first. They leave the list; one that no longer fits when it starts waits again."""
+        fits = []
+        with self._lock:
+            for job, alternatives in list(self.waiting.items()):
+                if job.status == "Pausing..." or job.is_active():
+                    # Parked by the low-space watcher while still running; resumable once its worker has stopped
+                    continue
+                if job.status != "Paused":
+                    # Resumed, canceled or removed by hand in the meantime
+                    del self.waiting[job]
+                    continue
+                if any(self._fits(needs) for needs in alternatives):
+                    del self.waiting[job]
+                    fits.append(job)
+        return fits
+
+    def low_space_jobs(self):
+        """Jobs holding reservations on a disk whose free space fell below ``low_space``, with that disk's free bytes."""
+        with self._lock:
+            reservations = list(self._reservations.values())
+        free_by_dev = {}
+        low = []
+        for reservation in reservations:
+            for dev, (directory, _) in reservation.devices.items():
+                if dev not in free_by_dev:
+                    try:
+                        free_by_dev[dev] = self.disk_usage(directory).free
+                    except OSError:
+                        free_by_dev[dev] = None
+                free = free_by_dev[dev]
+                if free is not None and free < self.low_space:
+                    low.append((reservation.job, directory, free))
+                    break
+        return low
+
+    def preallocate(self, path, size):
+        """Reserves ``size`` bytes of extents for a file being downloaded. Best effort: returns False when unsupported."""
+        if not size or size <= 0:
+            return False
+        try:
+            dev = os.stat(path).st_dev
+        except OSError:
+            return False
+        if dev in self._no_prealloc:
+            return False
+        try:
+            _preallocate(path, int(size))
+        except OSError as e:
+            if e.errno in (errno.ENOSPC, errno.EDQUOT):
+                raise
+            self._no_prealloc.add(dev)
+            logger.debug(f"Preallocation not supported for {path}: {e}")
+            return False
+        with self._lock:
+            self.preallocated_bytes += int(size)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'reservations': len(self._reservations),
+                'reserved_bytes': sum(size for r in self._reservations.values() for _, size in r.devices.values()),
+                'waiting': len(self.waiting),
+                'preallocated_bytes': self.preallocated_bytes,
+            }
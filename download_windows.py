@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import datetime
+import threading
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+EXAMPLE_CALENDAR = {
+    # Bulk pulls outside business hours, capped at 5 MB/s on weekend days
+    "bulk": [
+        {"days": ["mon", "tue", "wed", "thu", "fri"], "start": "19:00", "end": "07:00"},
+        {"days": ["sat", "sun"], "start": "00:00", "end": "24:00", "max_bytes_per_second": 5000000},
+    ],
+}
+
+
+def _minutes(value):
+    hours, minutes = value.split(":")
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= 24 * 60:
+        raise ValueError(f"Invalid time of day: {value}")
+    return total
+
+
+class DownloadWindow:
+    """A daily time range on some weekdays; ``end`` at or before ``start`` runs past midnight."""
+
+    __slots__ = ('days', 'start', 'end', 'max_bytes_per_second')
+
+    def __init__(self, days, start, end, max_bytes_per_second=None):
+        unknown = [day for day in days if day.lower()[:3] not in DAYS]
+        if unknown:
+            raise ValueError(f"Unknown day: {unknown[0]}")
+        self.days = {DAYS.index(day.lower()[:3]) for day in days}
+        self.start = _minutes(start)
+        self.end = _minutes(end)
+        if max_bytes_per_second is not None and not max_bytes_per_second > 0:
+            raise ValueError(f"Invalid bandwidth cap: {max_bytes_per_second}")
+        self.max_bytes_per_second = max_bytes_per_second
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record.get('days') or DAYS, record.get('start', "00:00"), record.get('end', "24:00"),
+                   record.get('max_bytes_per_second'))
+
+    def contains(self, now):
+        weekday, minute = now.weekday(), now.hour * 60 + now.minute
+        if self.start < self.end:
+            return weekday in self.days and self.start <= minute < self.end
+        # Overnight: belongs to the day it starts on
+        return (weekday in self.days and minute >= self.start) or ((weekday - 1) % 7 in self.days and minute < self.end)
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every download of one priority class."""
+
+    def __init__(self):
+        self.rate = None
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            if rate != self.rate:
+                self.rate = rate
+                self._tokens = float(rate or 0)  # one second of burst
+                self._updated = time.monotonic()
+
+    def delay(self, nbytes):
+        """Takes ``nbytes`` from the bucket; returns how long the caller should sleep to stay under the rate."""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._updated) * self.rate, float(self.rate))
+            self._updated = now
+            self._tokens -= nbytes
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class DownloadCalendar:
+    """Allowed download windows and bandwidth caps per priority class.
+
+    A class without windows may always download at full speed. A class with
+    windows may only download inside one of them, capped at that window's
+    ``max_bytes_per_second`` (shared by all its downloads). ``update()`` is
+    called periodically: it applies the caps for the current time and returns
+    the classes whose window just opened or closed.
+    """
+
+    def __init__(self, records=None):
+        self.records = {}
+        self.windows = {}  # priority -> [DownloadWindow]
+        self.limiters = {}
+        self._open = {}
+        self._lock = threading.Lock()
+        self.set_records(records or {})
+
+    def set_records(self, records):
+        """Replaces the calendar with ``records`` ({priority: [window record]}); raises ValueError when one is invalid."""
+        try:
+            windows = {priority: [DownloadWindow.from_record(r) for r in entries] for priority, entries in records.items()}
+        except (AttributeError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid download window: {e}") from e
+        self.records = records
+        self.windows = windows
+
+    def _window(self, priority, now):
+        windows = self.windows.get(priority)
+        if not windows:
+            # No windows configured: always open, no cap
+            return None
+        return next((w for w in windows if w.contains(now)), False)
+
+    def is_open(self, priority, now=None):
+        return self._window(priority, now or datetime.datetime.now()) is not False
+
+    def update(self, now=None):
+        """Applies the current caps; returns {priority: is_open} for classes whose window changed."""
+        now = now or datetime.datetime.now()
+        changed = {}
+        with self._lock:
+            for priority in set(self.windows) | set(self.limiters):
+                window = self._window(priority, now)
+                limiter = self.limiters.setdefault(priority, BandwidthLimiter())
+                limiter.set_rate(window.max_bytes_per_second if window else None)
+                is_open = window is not False
+                if self._open.get(priority, True) != is_open:
+                    changed[priority] = is_open
+                self._open[priority] = is_open
+        return changed
+
+    def throttle(self, priority, nbytes, stop_requested):
+        """Sleeps as long as the class's cap requires for ``nbytes`` just downloaded, waking early on stop."""
+        limiter = self.limiters.get(priority)
+        if nbytes <= 0 or limiter is None or not limiter.rate:
+            return
+        wait = limiter.delay(nbytes)
+        deadline = time.monotonic() + wait
+        while wait > 0 and not stop_requested():
+            time.sleep(min(wait, 0.25))
+            wait = deadline - time.monotonic()
+
+
+def load_calendar(path):
+    """Reads the configured download windows; a missing file means downloads are always allowed."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_calendar(path, records):
+    with open(path, 'w') as f:
+        json.dump(records, f, indent=2)
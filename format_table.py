@@ -0,0 +1,149 @@
+import sys
+import bisect
+
+# (min height, label), ascending so bisect can find the matching rung
+RESOLUTION_LADDER = [
+    (144, "144p"),
+    (240, "240p"),
+    (360, "360p"),
+    (480, "480p"),
+    (720, "720p"),
+    (1080, "1080p"),
+    (1440, "2K"),
+    (2160, "4K"),
+    (4320, "8K"),
+    (7680, "16K"),
+    (15360, "32K"),
+]
+_LADDER_HEIGHTS = [h for h, _ in RESOLUTION_LADDER]
+
+KIND_COMBINED = "combined"
+KIND_VIDEO_ONLY = "video_only"
+KIND_AUDIO = "audio"
+
+
+def resolution_label(height):
+    i = bisect.bisect_right(_LADDER_HEIGHTS, height or 0)
+    return RESOLUTION_LADDER[i - 1][1] if i else ""
+
+
+def codec_family(codec):
+    if not codec or codec == 'none':
+        return None
+    return codec.split('.')[0]
+
+
+def format_size(size_bytes):
+    return f"{size_bytes / 1024 / 1024:.2f} MB" if size_bytes else "Unknown"
+
+
+# The only format fields a queued job needs to re-select its format; signed URLs,
+# fragment lists and HTTP headers are dropped (and re-extracted at download time)
+COMPACT_FORMAT_KEYS = ('format_id', 'ext', 'vcodec', 'acodec', 'height', 'is_format_selector', 'is_best_audio_option',
+                       'audio_passthrough')
+
+
+def compact_format_info(format_info):
+    compact = {}
+    for key in COMPACT_FORMAT_KEYS:
+        value = format_info.get(key)
+        if value is not None:
+            compact[key] = sys.intern(value) if isinstance(value, str) else value
+    size = format_info.get('filesize') or format_info.get('filesize_approx')
+    if size:
+        compact['filesize'] = int(size)
+    return compact
+
+
+class FormatRow:
+    __slots__ = ('format', 'kind', 'height', 'size', 'codec', 'ext', 'label', 'sort_key')
+
+    def __init__(self, f, kind):
+        self.format = f
+        self.kind = kind
+        self.height = f.get('height') or 0
+        self.size = f.get('filesize') or f.get('filesize_approx') or 0
+        self.codec = codec_family(f.get('acodec') if kind == KIND_AUDIO else f.get('vcodec'))
+        self.ext = f.get('ext')
+        if kind == KIND_AUDIO:
+            abr = f.get('abr', '?')
+            self.label = f"{abr}kbps | {format_size(self.size)}"
+            self.sort_key = -(f.get('abr') or 0)
+        else:
+            res = f"{f.get('width', '?')}x{self.height}"
+            base = f"{resolution_label(self.height)} ({res}) | {format_size(self.size)} | {f.get('fps', '?')}fps"
+            if kind == KIND_COMBINED:
+                self.label = f"{base} | Audio: {f.get('abr', '?')}k"
+            else:
+                self.label = f"{base} (Video Only)"
+            self.sort_key = (self.height, self.size)
+
+
+class FormatTable:
+    """Formats of one fetched video, parsed once into rows with precomputed labels.
+
+    Views (video = combined then video-only, audio) are kept as row index lists
+    and codec/container filters as index sets, so switching views or filtering
+    only intersects indexes instead of re-walking the raw format dicts.
+    """
+
+    def __init__(self, formats):
+        self.rows = []
+        combined, video_only, audio = [], [], []
+        for f in formats or []:
+            vcodec, acodec = f.get('vcodec'), f.get('acodec')
+            if vcodec != 'none':
+                kind = KIND_COMBINED if acodec != 'none' else KIND_VIDEO_ONLY
+                (combined if kind == KIND_COMBINED else video_only).append(len(self.rows))
+                self.rows.append(FormatRow(f, kind))
+            if acodec != 'none':
+                audio.append(len(self.rows))
+                self.rows.append(FormatRow(f, KIND_AUDIO))
+
+        def by_key(indices):
+            return sorted(indices, key=lambda i: self.rows[i].sort_key)
+
+        self.views = {
+            'video': by_key(combined) + by_key(video_only),
+            'audio': by_key(audio),
+        }
+        self._by_codec = {}
+        self._by_ext = {}
+        for i, row in enumerate(self.rows):
+            if row.codec:
+                self._by_codec.setdefault(row.codec, set()).add(i)
+            if row.ext:
+                self._by_ext.setdefault(row.ext, set()).add(i)
+        self._cache = {}
+
+    def codecs(self, choice):
+        return sorted({self.rows[i].codec for i in self.views.get(choice, []) if self.rows[i].codec})
+
+    def containers(self, choice):
+        return sorted({self.rows[i].ext for i in self.views.get(choice, []) if self.rows[i].ext})
+
+    def view(self, choice, codec=None, container=None, max_height=None, max_size=None):
+        key = (choice, codec, container, max_height, max_size)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        indices = self.views.get(choice, [])
+        allowed = None
+        if codec:
+            allowed = self._by_codec.get(codec, set())
+        if container:
+            ext_set = self._by_ext.get(container, set())
+            allowed = ext_set if allowed is None else allowed & ext_set
+        rows = []
+        for i in indices:
+            if allowed is not None and i not in allowed:
+                continue
+            row = self.rows[i]
+            if max_height and row.kind != KIND_AUDIO and row.height > max_height:
+                continue
+            # Unknown sizes are kept; they can't be ruled out
+            if max_size and row.size and row.size > max_size:
+                continue
+            rows.append(row)
+        self._cache[key] = rows
+        return rows
@@ -3,16 +3,59 @@ import time
 import queue
 import os
 import subprocess
-import yt_dlp
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import re
 import ttkbootstrap as ttk
 import json
 import logging
 import sys
+import tempfile
+import shutil
+import itertools
+from collections import OrderedDict
+from stream_cache import StreamCache, CacheWaitCancelled
+from bulk_import import BulkImporter, FORMAT_POLICIES, URL_RE, parse_url_list, read_url_file
+from playlist import PlaylistExpander, entry_url
+from format_table import FormatTable, compact_format_info
+from tracing import TraceRecorder
+from metrics import METRICS, MeteredQueue, MetricsServer
+from ui_watchdog import StallWatchdog
+from warmup import yt_dlp, warm_up
+from ytdl_sessions import SESSIONS
+from thumbnails import ThumbnailCache, thumbnail_url_of
+from subtitles import SubtitleFetcher, subtitle_langs, subtitle_mux_args
+from concurrency import ConcurrencyController
+from scheduler import DEFAULT_PRIORITY, PRIORITY_CLASSES, SCHEDULING_POLICIES, Scheduler
+from storage import OutputRoot, StoragePolicy, load_roots, save_roots
+from download_windows import EXAMPLE_CALENDAR, DownloadCalendar, load_calendar, save_calendar
+from retries import RETRY_POLICIES, YTDL_RETRIES, classify_error, ytdl_retry_sleep
+from info_refresh import InfoRefresher
+from disk_space import DiskSpaceManager, InsufficientSpace, estimate_job_bytes, format_bytes, is_out_of_space
+from audio_transcode import COVER_EXTS, PASSTHROUGH_EXTS, TranscodeCancelled, TranscodePool, audio_command, audio_metadata, passthrough_ext
 
 QUEUE_FILE = "download_queue.json"
+OUTPUT_ROOTS_FILE = "output_roots.json"
+DOWNLOAD_WINDOWS_FILE = "download_windows.json"
+QUEUE_LOAD_BATCH = 200  # jobs handed to the Tk thread per ui_queue message while loading
+BULK_IMPORT_WORKERS = 6
+MAX_CONCURRENT_DOWNLOADS = 3  # starting point; the concurrency controller moves it within CONCURRENCY_BOUNDS
+CONCURRENCY_BOUNDS = (1, 8)
+MAX_FRAGMENT_THREADS = 4
+CONCURRENCY_TICK_MS = 5000
+SCHEDULING_POLICY = "fifo"
+SMALL_JOB_SLOTS = 1  # slots the "mixed" policy keeps for small jobs
+PLAYLIST_PAGE_SIZE = 50
+PREFETCH_DEBOUNCE_MS = 400
+INFO_CACHE_SIZE = 16
+INFO_CACHE_TTL = 600
+STREAM_CACHE_DIR = os.path.join(tempfile.gettempdir(), "url_downloader_streams")
+STREAM_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+THUMBNAIL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TRANSCODE_WORKERS = os.cpu_count() or 2  # MP3 encodes are single-threaded, so one per core
+DISK_CHECK_INTERVAL = 5  # seconds between free-space checks of disks with running jobs
+WINDOW_CHECK_INTERVAL = 30  # seconds between download window checks
+INFO_REFRESH_AHEAD = 2  # jobs per download slot whose metadata is extracted before they start
+INFO_REFRESH_INTERVAL_MS = 60000
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO) # Set a default logging level
@@ -31,6 +74,21 @@ def get_ffmpeg_path():
         return 'ffmpeg'  # fallback to system ffmpeg for development
 
 ffmpeg_path = get_ffmpeg_path()
+# CREATE_NO_WINDOW only exists on Windows; elsewhere there is no console window to hide
+NO_WINDOW_FLAGS = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+UI_QUEUE_MAX_PER_CYCLE = 10
+METRICS_ADDRESS = ("127.0.0.1", 9477)  # Prometheus scrape endpoint, local only
+UI_HEARTBEAT_MS = 100
+UI_STALL_THRESHOLD = 0.25  # seconds without an event-loop tick before the Tk thread's stack is dumped
+
+def ui_queue_check_interval(queue_size):
+    # Dynamic UI check interval (ms) based on queue size
+    if queue_size > 50:
+        return 50  # Check more frequently if queue is building up
+    elif queue_size > 20:
+        return 75
+    return 100  # Normal interval
 
 def sanitize_filename(filename):
     safe_filename = "".join(c if c.isalnum() or c in (' ', '.', '_', '-', '(', ')') else '_' for c in filename)
@@ -40,6 +98,95 @@ def sanitize_filename(filename):
         return "downloaded_file"
     return safe_filename
 
+def file_size_or_none(path):
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
+
+def format_mb(num_bytes):
+    return f"{num_bytes / (1024*1024):.2f} MB" if num_bytes else "0 MB"
+
+def format_speed(bps):
+    if not bps:
+        return "N/A"
+    if bps >= 1024*1024:
+        return f"{bps / (1024*1024):.2f} MB/s"
+    if bps >= 1024:
+        return f"{bps / 1024:.1f} KB/s"
+    return f"{bps:.0f} B/s"
+
+def format_eta(seconds):
+    if seconds is None:
+        return "N/A"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+# (eta, speed) shown instead of live numbers for jobs that aren't transferring
+STATUS_DISPLAY = {
+    "Queued": ("N/A", "N/A"),
+    "Paused": ("Paused", "Paused"),
+    "Pausing...": ("Pausing...", "Pausing..."),
+    "Retrying": ("Retrying", "N/A"),
+    "Processing": ("Processing...", "N/A"),
+    "Completed": ("Done", "Done"),
+    "Error": ("Error", "Error"),
+}
+
+def job_display_values(job):
+    size = f"{format_mb(job.downloaded_bytes)}/{format_mb(job.total_bytes) if job.total_bytes else 'Unknown'}"
+    fixed = STATUS_DISPLAY.get(job.status)
+    if fixed:
+        return fixed[0], size, fixed[1]
+    return format_eta(job.eta_seconds), size, format_speed(job.speed_bps)
+
+def progress_update_interval(active_downloads, min_interval, max_interval):
+    if active_downloads <= 1:
+        return min_interval
+    if active_downloads <= 3:
+        return min_interval * 1.5
+    if active_downloads <= 5:
+        return min_interval * 2
+    return max_interval
+
+def iter_queue_records(path):
+    with open(path, 'r') as f:
+        first, second = f.readline(), f.readline()
+        if first.strip() == "[" and second.startswith('{"'):
+            # One job per line (see save_queue): parse as we go instead of holding the whole document
+            for line in itertools.chain((second,), f):
+                line = line.strip().rstrip(',')
+                if line and line != "]":
+                    yield json.loads(line)
+            return
+        f.seek(0)
+        yield from json.load(f)
+
+def final_extensions(choice, format_info):
+    """Extensions (with the dot) the finished file of a job can have."""
+    if choice == "audio":
+        if format_info.get("audio_passthrough"):
+            return tuple(f".{ext}" for ext in sorted({*PASSTHROUGH_EXTS.values(), "mka"}))
+        return (".mp3",)
+    if choice == "video":
+        # Split streams are merged into MP4; combined formats and selectors keep or merge into their own container
+        return tuple(f".{ext}" for ext in sorted({"mp4", format_info.get("ext") or "mp4"}))
+    return ()
+
+def completed_file_exists(job):
+    extensions = final_extensions(job.choice, job.format_info)
+    if not extensions:
+        return False
+    base_name = sanitize_filename(job.title)
+    if any(os.path.exists(os.path.join(job.out_dir, base_name + extension)) for extension in extensions):
+        return True
+    # generate_unique_filename may have saved it as "title(1).mp4"
+    if os.path.isdir(job.out_dir):
+        prefix = base_name + "("
+        return any(name.startswith(prefix) and name.endswith(extensions) for name in os.listdir(job.out_dir))
+    return False
+
 def generate_unique_filename(base_path):
     if not os.path.exists(base_path):
         return base_path
@@ -52,34 +199,127 @@ def generate_unique_filename(base_path):
         counter += 1
 
 class DownloadJob:
-    def __init__(self, url, choice, format_info, sub_lang, out_dir, title=None, status="Queued"):
+    # Slotted so huge queues stay cheap; the stop event and thread only exist while the job runs
+    __slots__ = ('url', 'video_id', 'thumbnail_url', 'choice', 'format_info', 'sub_lang', 'out_dir', 'title', '_status',
+                 'progress', 'downloaded_bytes', 'total_bytes', 'speed_bps', 'eta_seconds',
+                 'thread', 'stop_event', 'tree_item_id', 'last_ui_update_time', 'last_row_render_time',
+                 'temp_files', 'cache_leases', 'video_downloaded_bytes', 'audio_downloaded_bytes',
+                 'video_total_bytes', 'audio_total_bytes', 'current_phase', 'auto_start', 'embed_subs', 'preallocated',
+                 'storage_root', 'priority', 'preempted', 'retry_at', 'retries')
+
+    def __init__(self, url, choice, format_info, sub_lang, out_dir, title=None, status="Queued", video_id=None,
+                 thumbnail_url=None, embed_subs=False, storage_root=None, priority=DEFAULT_PRIORITY):
         self.url = url
+        self.video_id = video_id
+        self.thumbnail_url = thumbnail_url
         self.choice = choice
-        self.format_info = format_info
+        self.format_info = compact_format_info(format_info)
         self.sub_lang = sub_lang
+        self.embed_subs = embed_subs
         self.out_dir = out_dir
+        self.storage_root = storage_root  # output root the job was placed on, once it has been
         self.title = title if title else "Fetching title..."
+        self._status = None
         self.status = status
         self.progress = 0
-        self.eta = "N/A"
-        self.current_size = "0 MB"
-        self.total_size = "Unknown"
-        self.speed = "0 B/s"
+        self.downloaded_bytes = 0
+        self.total_bytes = 0
+        self.speed_bps = None
+        self.eta_seconds = None
         self.thread = None
-        self.stop_event = threading.Event()
-        self.is_paused = False
+        self.stop_event = None
         self.tree_item_id = None
         self.last_ui_update_time = 0
+        self.last_row_render_time = 0
         self.temp_files = []
+        self.cache_leases = []
         self.video_downloaded_bytes = 0
         self.audio_downloaded_bytes = 0
         self.video_total_bytes = 0
         self.audio_total_bytes = 0
         self.current_phase = "video"
+        self.auto_start = False
+        self.priority = priority
+        self.preempted = False
+        self.preallocated = None
+        self.retry_at = 0  # time.monotonic() when a "Retrying" job may start again
+        self.retries = {}  # error class -> automatic retries since the last manual start
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(url=record['url'], choice=record['choice'], format_info=record['format_info'],
+                   sub_lang=record['sub_lang'], out_dir=record['out_dir'], title=record['title'],
+                   status=record['status'], video_id=record.get('video_id'),
+                   thumbnail_url=record.get('thumbnail_url'), embed_subs=record.get('embed_subs', False),
+                   storage_root=record.get('storage_root'), priority=record.get('priority', DEFAULT_PRIORITY))
+
+    def to_record(self):
+        return {
+            'url': self.url,
+            'video_id': self.video_id,
+            'thumbnail_url': self.thumbnail_url,
+            'choice': self.choice,
+            'format_info': self.format_info,
+            'sub_lang': self.sub_lang,
+            'embed_subs': self.embed_subs,
+            'out_dir': self.out_dir,
+            'storage_root': self.storage_root,
+            'priority': self.priority,
+            'title': self.title,
+            # A pending retry doesn't survive a restart of the app; the job waits to be resumed instead
+            'status': "Paused" if self.status == "Retrying" else self.status,
+        }
+
+    def is_active(self):
+        thread = self.thread
+        return thread is not None and thread.is_alive()
+
+    def stop_requested(self):
+        stop_event = self.stop_event
+        return stop_event is not None and stop_event.is_set()
+
+    def request_stop(self):
+        stop_event = self.stop_event
+        if stop_event is not None:
+            stop_event.set()
+
+    def join(self, timeout=None):
+        """Waits for the worker thread; returns True once it is gone."""
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def start_thread(self, target):
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=target, args=(self,), daemon=True)
+        self.thread.start()
+
+    def release_thread(self):
+        # Only the worker that owns the job drops the handles, so a restart racing a slow exit keeps its own
+        if self.thread is threading.current_thread():
+            self.thread = None
+            self.stop_event = None
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        # "Removed" is terminal so a worker winding down can't resurrect the job in the counts
+        if value != self._status and self._status != "Removed":
+            METRICS.job_transition(self._status, None if value == "Removed" else value)
+            self._status = value
 
 class YTDownloaderApp(ttk.Window):
+    watchdog = None
+
     def __init__(self):
         super().__init__(themename="cyborg")
+        self.watchdog = StallWatchdog(METRICS, UI_STALL_THRESHOLD).start()
+        self.after(UI_HEARTBEAT_MS, self._ui_heartbeat)
 
         try:
             from ctypes import windll
@@ -105,17 +345,55 @@ class YTDownloaderApp(ttk.Window):
         self.ui_update_interval = 0.5
         self.min_update_interval = 0.5
         self.max_update_interval = 2.0
-
-        self.ui_queue = queue.Queue()
+        self.calendar = DownloadCalendar(self._load_download_windows())
+        self.scheduler = Scheduler(MAX_CONCURRENT_DOWNLOADS, SCHEDULING_POLICY, SMALL_JOB_SLOTS,
+                                   is_open=self.calendar.is_open)
+        self.concurrency = ConcurrencyController(self.scheduler, *CONCURRENCY_BOUNDS, max_fragments=MAX_FRAGMENT_THREADS)
+        self.queue_loading = False
+        self.queue_changed_while_loading = False
+
+        self.ui_queue = MeteredQueue(METRICS)
+        self.stream_cache = StreamCache(STREAM_CACHE_DIR, STREAM_CACHE_MAX_BYTES)
+        self.thumbnail_cache = ThumbnailCache(THUMBNAIL_CACHE_MAX_BYTES, ffmpeg_path, NO_WINDOW_FLAGS)
+        self.transcoder = TranscodePool(TRANSCODE_WORKERS, NO_WINDOW_FLAGS)
+        self.disk_space = DiskSpaceManager()
+        self.storage = StoragePolicy(self.disk_space, self._load_output_roots())
+        self.info_refresher = InfoRefresher()
+        threading.Thread(target=self._watch_disk_space, daemon=True).start()
+        threading.Thread(target=self._watch_download_windows, daemon=True).start()
+        self.tracer = TraceRecorder(on_span_end=METRICS.observe_span)
+        try:
+            self.metrics_server = MetricsServer(METRICS, *METRICS_ADDRESS).start()
+        except OSError as e:
+            self.metrics_server = None
+            logger.warning(f"Metrics endpoint disabled, could not bind {METRICS_ADDRESS[0]}:{METRICS_ADDRESS[1]}: {e}")
 
         self.available_themes = ttk.Style().theme_names()
         self.current_theme_var = tk.StringVar(value=self.style.theme.name)
 
+        self.warmup_timings = None
+
         self.create_widgets()
         self.load_queue()
         self.after(100, self._check_ui_queue)
+        self.after(CONCURRENCY_TICK_MS, self._tune_concurrency)
+        self.after(INFO_REFRESH_INTERVAL_MS, self._refresh_upcoming_info_tick)
+        # yt-dlp is imported and warmed up once the window is on screen
+        self.after(50, lambda: threading.Thread(target=self._warm_up, daemon=True).start())
         logger.info("Application started.")
 
+    def _warm_up(self):
+        try:
+            self.warmup_timings = warm_up(ffmpeg_path, NO_WINDOW_FLAGS)
+        except Exception:
+            logger.exception("yt-dlp warm-up failed; it will load on first use instead.")
+            return
+        timings = self.warmup_timings
+        logger.info(f"Warm-up done in {timings['total_seconds']:.2f}s (import {timings['import_seconds']:.2f}s, "
+                    f"{timings['extractors']} extractors {timings['extractor_seconds']:.2f}s, ffmpeg {timings['ffmpeg_seconds']:.2f}s)")
+        if not timings['ffmpeg_version']:
+            self.ui_queue.put((None, 'status_update', "FFmpeg missing", "FFmpeg was not found; merging and MP3 conversion will fail."))
+
     def _setup_scrolling(self):
         """Set up scrolling behavior for Windows after window is fully loaded"""
         def on_state_change(event):
@@ -199,6 +477,8 @@ class YTDownloaderApp(ttk.Window):
 
     
         def bind_mousewheel_to_children(widget):
+            if widget in (self.format_listbox, self.jobs_tree):
+                return  # These scroll their own content
             widget.bind("<MouseWheel>", _on_mousewheel) 
             for child in widget.winfo_children():
                 bind_mousewheel_to_children(child)
@@ -253,6 +533,25 @@ class YTDownloaderApp(ttk.Window):
         for theme_name in self.available_themes:
             theme_menu.add_radiobutton(label=theme_name, variable=self.current_theme_var, command=self.change_theme)
 
+        queue_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Queue", menu=queue_menu)
+        queue_menu.add_command(label="Bulk Import...", command=self.open_bulk_import_dialog)
+        queue_menu.add_command(label="Import Playlist/Channel...", command=self.open_playlist_import_dialog)
+        queue_menu.add_command(label="Output Roots...", command=self.open_output_roots_dialog)
+        queue_menu.add_command(label="Download Windows...", command=self.open_download_windows_dialog)
+        self.adaptive_concurrency_var = tk.BooleanVar(value=self.concurrency.enabled)
+        queue_menu.add_checkbutton(label="Adaptive Concurrency", variable=self.adaptive_concurrency_var,
+                                   command=self._toggle_adaptive_concurrency)
+        scheduling_menu = tk.Menu(queue_menu, tearoff=0)
+        queue_menu.add_cascade(label="Scheduling", menu=scheduling_menu)
+        self.scheduling_policy_var = tk.StringVar(value=self.scheduler.policy)
+        for policy, label in SCHEDULING_POLICIES.items():
+            scheduling_menu.add_radiobutton(label=label, value=policy, variable=self.scheduling_policy_var,
+                                            command=self._set_scheduling_policy)
+        queue_menu.add_separator()
+        queue_menu.add_command(label="Export Timing Traces (JSONL)...", command=lambda: self.export_traces("jsonl"))
+        queue_menu.add_command(label="Export Timing Traces (Chrome)...", command=lambda: self.export_traces("chrome"))
+
         # Create main container with grid layout for better scrollbar management
         main_container = ttk.Frame(self)
         main_container.pack(fill="both", expand=True)
@@ -338,6 +637,8 @@ class YTDownloaderApp(ttk.Window):
         self.url_entry = ttk.Entry(frame, width=70)
         self.url_entry.grid(row=0, column=1, sticky='ew', pady=(0,5))
         self.url_entry.bind('<Return>', lambda e: self.fetch_info())  # Add Enter key binding
+        self.url_entry.bind('<KeyRelease>', self._schedule_prefetch)
+        self.url_entry.bind('<<Paste>>', self._schedule_prefetch)
 
         ttk.Button(frame, text="Fetch Info", command=self.fetch_info).grid(row=0, column=2, padx=5, pady=(0,5))
 
@@ -350,6 +651,30 @@ class YTDownloaderApp(ttk.Window):
         ttk.Radiobutton(frame, text="Audio", variable=self.choice_var, value="audio", command=self.update_format_list).grid(row=2, column=1, sticky='w', pady=(5,0))
 
         ttk.Label(frame, text="Available formats:").grid(row=3, column=0, sticky='w', pady=(5,2))
+
+        filter_frame = ttk.Frame(frame)
+        filter_frame.grid(row=3, column=1, columnspan=2, sticky='e', pady=(5,2))
+        self.codec_filter_var = tk.StringVar(value="Any")
+        self.container_filter_var = tk.StringVar(value="Any")
+        self.max_height_filter_var = tk.StringVar(value="Any")
+        self.max_size_filter_var = tk.StringVar()
+        ttk.Label(filter_frame, text="Codec:").pack(side=tk.LEFT)
+        self.codec_filter_combo = ttk.Combobox(filter_frame, textvariable=self.codec_filter_var, state='readonly', width=8, values=["Any"])
+        self.codec_filter_combo.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="Container:").pack(side=tk.LEFT)
+        self.container_filter_combo = ttk.Combobox(filter_frame, textvariable=self.container_filter_var, state='readonly', width=6, values=["Any"])
+        self.container_filter_combo.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="Max height:").pack(side=tk.LEFT)
+        ttk.Combobox(filter_frame, textvariable=self.max_height_filter_var, state='readonly', width=6,
+                     values=["Any", "2160", "1440", "1080", "720", "480", "360"]).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="Max MB:").pack(side=tk.LEFT)
+        max_size_entry = ttk.Entry(filter_frame, textvariable=self.max_size_filter_var, width=7)
+        max_size_entry.pack(side=tk.LEFT, padx=(2, 0))
+        for combo in filter_frame.winfo_children():
+            if isinstance(combo, ttk.Combobox):
+                combo.bind('<<ComboboxSelected>>', self.update_format_list)
+        max_size_entry.bind('<Return>', self.update_format_list)
+        max_size_entry.bind('<FocusOut>', self.update_format_list)
         format_list_frame = ttk.Frame(frame)
         format_list_frame.grid(row=4, column=0, columnspan=3, sticky='ew')
 
@@ -361,16 +686,30 @@ class YTDownloaderApp(ttk.Window):
         self.format_listbox.config(yscrollcommand=list_scrollbar.set)
         self.format_listbox.bind('<<ListboxSelect>>', self.on_format_select)
 
+        def _on_listbox_mousewheel(event):
+            self.format_listbox.yview_scroll(int(-1*(event.delta/120)), "units")
+            return "break"
+
+        self.format_listbox.bind("<MouseWheel>", _on_listbox_mousewheel)
+
         ttk.Label(frame, text="Subtitles:").grid(row=5, column=0, sticky='w', pady=(5,2))
-        self.sub_lang_var = tk.StringVar()
-        self.sub_lang_combo = ttk.Combobox(frame, textvariable=self.sub_lang_var, state='readonly')
-        self.sub_lang_combo.grid(row=5, column=1, sticky='w', pady=(5,0))
-        self.sub_lang_combo['values'] = ["None"]
-        self.sub_lang_combo.current(0)
+        sub_frame = ttk.Frame(frame)
+        sub_frame.grid(row=5, column=1, sticky='w', pady=(5,0))
+        self.sub_lang_var = tk.StringVar(value="None")
+        self.sub_lang_button = ttk.Menubutton(sub_frame, textvariable=self.sub_lang_var, width=24)
+        self.sub_lang_button.pack(side=tk.LEFT)
+        self.sub_lang_menu = tk.Menu(self.sub_lang_button, tearoff=0)
+        self.sub_lang_button['menu'] = self.sub_lang_menu
+        self.sub_lang_vars = {}
+        self.embed_subs_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(sub_frame, text="Embed in file", variable=self.embed_subs_var).pack(side=tk.LEFT, padx=(8, 0))
 
         ttk.Label(frame, text="Output Folder:").grid(row=6, column=0, sticky='w', pady=(5,2))
-        default_output_dir = os.path.join(os.path.expanduser("~"), "Videos")
-        os.makedirs(default_output_dir, exist_ok=True)
+        if self.storage.roots:
+            default_output_dir = self.storage.roots[0].path
+        else:
+            default_output_dir = os.path.join(os.path.expanduser("~"), "Videos")
+            os.makedirs(default_output_dir, exist_ok=True)
         self.out_dir_var = tk.StringVar(value=default_output_dir)
         out_dir_entry = ttk.Entry(frame, textvariable=self.out_dir_var, width=55)
         out_dir_entry.grid(row=6, column=1, sticky='ew', pady=(5,0))
@@ -412,8 +751,12 @@ class YTDownloaderApp(ttk.Window):
         self.clear_finished_errored_btn = ttk.Button(action_btn_frame, text="Clear Finished/Errored", command=self.clear_finished_or_errored_jobs, bootstyle="secondary")
         self.clear_finished_errored_btn.grid(row=0, column=3, padx=5)
 
-        # Download queue label
-        ttk.Label(content_frame, text="Download Queue:").pack(anchor='w', pady=(10,2))
+        # Download queue label, with what the concurrency controller is currently aiming for
+        queue_header = ttk.Frame(content_frame)
+        queue_header.pack(fill='x', pady=(10,2))
+        ttk.Label(queue_header, text="Download Queue:").pack(side=tk.LEFT)
+        self.concurrency_var = tk.StringVar(value=self.concurrency.describe())
+        ttk.Label(queue_header, textvariable=self.concurrency_var, bootstyle="secondary").pack(side=tk.RIGHT)
         
         # Create a frame for the treeview that will expand
         tree_frame = ttk.Frame(content_frame)
@@ -435,11 +778,34 @@ class YTDownloaderApp(ttk.Window):
         self.jobs_tree.pack(fill='both', expand=True, side=tk.LEFT)
         
         # Treeview scrollbar
-        tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.jobs_tree.yview)
-        tree_scrollbar.pack(side=tk.RIGHT, fill="y")
-        self.jobs_tree.config(yscrollcommand=tree_scrollbar.set)
+        self.tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.jobs_tree.yview)
+        self.tree_scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.stale_rows = set()
+        self._stale_refresh_pending = False
+        self.jobs_tree.config(yscrollcommand=self._on_jobs_tree_scrolled)
         
         self.jobs_tree.bind('<<TreeviewSelect>>', self.on_job_select)
+        self.jobs_tree.tag_configure("interactive", font=('Segoe UI', 9, 'bold'))
+        self.jobs_tree.tag_configure("bulk", foreground="gray")
+        # Drag a row to reorder the queue; right-click for priority and move to top/bottom
+        self.jobs_tree.bind('<B1-Motion>', self._on_job_drag)
+        self.jobs_tree.bind('<ButtonRelease-1>', self._on_job_drop)
+        self.job_menu = tk.Menu(self.jobs_tree, tearoff=0)
+        self.job_priority_var = tk.StringVar(value=DEFAULT_PRIORITY)
+        for priority in PRIORITY_CLASSES:
+            self.job_menu.add_radiobutton(label=f"Priority: {priority.capitalize()}", value=priority,
+                                          variable=self.job_priority_var, command=self._set_selected_priority)
+        self.job_menu.add_separator()
+        self.job_menu.add_command(label="Move to Top", command=lambda: self._move_selected_jobs(0))
+        self.job_menu.add_command(label="Move to Bottom", command=lambda: self._move_selected_jobs('end'))
+        self.jobs_tree.bind('<Button-3>', self._show_job_menu)
+        self._drag_moved = False
+
+        def _on_treeview_mousewheel(event):
+            self.jobs_tree.yview_scroll(int(-1*(event.delta/120)), "units")
+            return "break"
+
+        self.jobs_tree.bind("<MouseWheel>", _on_treeview_mousewheel)
 
         # About button at the bottom
         about_btn_frame = ttk.Frame(content_frame)
@@ -453,7 +819,14 @@ class YTDownloaderApp(ttk.Window):
 
         # Initialize variables
         self.info = None
+        self.format_table = None
         self.candidates = []
+        self.bulk_importer = None
+        self.info_cache = OrderedDict()
+        self.info_inflight = {}
+        self.fetch_generation = 0
+        self.requested_fetch_url = None
+        self._prefetch_after_id = None
         self.after(100, self._setup_scrolling)
 
     def change_theme(self):
@@ -461,9 +834,19 @@ class YTDownloaderApp(ttk.Window):
         self.style.theme_use(selected_theme)
             # No log text widget to update
 
+    def after(self, ms, func=None, *args):
+        # Every callback scheduled on the app reports how late it ran to the stall watchdog
+        if func is None or self.watchdog is None:
+            return super().after(ms, func, *args)
+        return super().after(ms, self.watchdog.wrap(ms, func, getattr(func, '__name__', 'after')), *args)
+
+    def _ui_heartbeat(self):
+        # Keeps the watchdog fed while nothing else is scheduled
+        self.after(UI_HEARTBEAT_MS, self._ui_heartbeat)
+
     def _check_ui_queue(self):
         processed_count = 0
-        max_process_per_cycle = 10
+        max_process_per_cycle = UI_QUEUE_MAX_PER_CYCLE
         
         # Create a job lookup dict once per cycle to reduce repeated lookups
         with self.jobs_lock:
@@ -483,9 +866,13 @@ class YTDownloaderApp(ttk.Window):
                             selected_items = self.jobs_tree.selection()
                             if selected_items and selected_items[0] == job.tree_item_id:
                                 self.progress_var.set(job.progress)
-                                self.status_var.set(f"{job.status} {job.title}: {job.progress:.1f}% ({self._strip_ansi_codes(job.speed)}, ETA: {self._strip_ansi_codes(job.eta)})")
+                                display_eta, _, display_speed = job_display_values(job)
+                                self.status_var.set(f"{job.status} {job.title}: {job.progress:.1f}% ({display_speed}, ETA: {display_eta})")
 
                         elif message_type == 'status_update':
+                            if args[0] == "Pausing..." and not job.is_active():
+                                # The worker already stopped and set its final status
+                                continue
                             job.status = args[0]
                             self.update_job_list_item_ui(job)
                             selected_items = self.jobs_tree.selection()
@@ -526,6 +913,24 @@ class YTDownloaderApp(ttk.Window):
                         self.status_var.set(args[1])
                         if not any(j.status in ("Downloading", "Processing") for j in job_lookup.values()):
                             self.progress_var.set(0)
+                    elif message_type == 'add_job':
+                        self._add_job_to_queue(args[0])
+                    elif message_type == 'add_jobs':
+                        for new_job in args[0]:
+                            self._add_job_to_queue(new_job, announce=False)
+                        self._dispatch_queued_jobs()
+                    elif message_type == 'dispatch':
+                        self._dispatch_queued_jobs()
+                    elif message_type == 'save_queue':
+                        self.save_queue()
+                    elif message_type == 'load_jobs':
+                        self._insert_loaded_jobs(args[0])
+                    elif message_type == 'remove_jobs':
+                        self._remove_missing_jobs(args[0])
+                    elif message_type == 'queue_loaded':
+                        self._finish_queue_load(*args)
+                    elif message_type == 'info_extracted':
+                        self._on_info_extracted(*args)
                 finally:
                     self.ui_queue.task_done()
             except queue.Empty:
@@ -533,14 +938,8 @@ class YTDownloaderApp(ttk.Window):
             except Exception as e:
                 logger.exception("Error processing UI queue message (top level).")
         
-        # Dynamic UI check interval based on queue size
         queue_size = self.ui_queue.qsize() if hasattr(self.ui_queue, 'qsize') else 0
-        if queue_size > 50:
-            next_check = 50  # Check more frequently if queue is building up
-        elif queue_size > 20:
-            next_check = 75
-        else:
-            next_check = 100  # Normal interval
+        next_check = ui_queue_check_interval(queue_size)
         
         if queue_size > 20:
             logger.debug(f"UI queue has {queue_size} pending messages")
@@ -561,35 +960,62 @@ class YTDownloaderApp(ttk.Window):
             logger.warning("Attempted to fetch info with empty URL.")
             return
 
-        self.status_var.set("Fetching video info... This might take a moment.")
-        self.update()
         logger.info(f"Fetching info for URL: {url}")
+        self.requested_fetch_url = url
 
         self.info = None
+        self.format_table = None
         self.title_var.set("")
         self.format_listbox.delete(0, 'end')
         self.candidates.clear()
-        self.sub_lang_combo['values'] = ["None"]
-        self.sub_lang_combo.current(0)
+        self.set_subtitle_languages([])
         self.add_job_btn['state'] = 'disabled'
         self.download_now_btn['state'] = 'disabled'
 
-        
-        def _on_treeview_mousewheel(event):
-         self.jobs_tree.yview_scroll(int(-1*(event.delta/120)), "units")
-         return "break"
-
-        self.jobs_tree.bind("<MouseWheel>", _on_treeview_mousewheel)
+        cached = self._get_cached_info(url)
+        if cached:
+            logger.info(f"Using prefetched info for URL: {url}")
+            self.info, self.format_table = cached
+            self._update_info_ui()
+            return
 
-        def _on_listbox_mousewheel(event):
-         self.format_listbox.yview_scroll(int(-1*(event.delta/120)), "units")
-         return "break"
+        self.status_var.set("Fetching video info... This might take a moment.")
+        if url not in self.info_inflight:
+            self._start_info_extraction(url)
 
-        self.format_listbox.bind("<MouseWheel>", _on_listbox_mousewheel)
+    def _schedule_prefetch(self, event=None):
+        # Debounce: restart the timer on every keystroke/paste
+        if self._prefetch_after_id:
+            self.after_cancel(self._prefetch_after_id)
+        self._prefetch_after_id = self.after(PREFETCH_DEBOUNCE_MS, self._prefetch_info)
 
-       
+    def _prefetch_info(self):
+        self._prefetch_after_id = None
+        url = self.url_entry.get().strip()
+        if not URL_RE.fullmatch(url) or url in self.info_inflight or self._get_cached_info(url):
+            return
+        logger.debug(f"Speculatively prefetching info for URL: {url}")
+        self._start_info_extraction(url)
+
+    def _get_cached_info(self, url):
+        cached = self.info_cache.get(url)
+        if not cached:
+            return None
+        fetched_at, info, format_table = cached
+        if time.time() - fetched_at > INFO_CACHE_TTL:
+            # Stream URLs inside the info dict expire, so don't hand out stale metadata
+            del self.info_cache[url]
+            return None
+        self.info_cache.move_to_end(url)
+        return info, format_table
+
+    def _start_info_extraction(self, url):
+        self.fetch_generation += 1
+        generation = self.fetch_generation
+        self.info_inflight[url] = generation
 
         def worker():
+            info, format_table, error = None, None, None
             try:
                 ydl_opts = {
                     'quiet': True,
@@ -597,29 +1023,60 @@ class YTDownloaderApp(ttk.Window):
                     'extract_flat': True,
                     'no_warnings': True,
                 }
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    self.info = ydl.extract_info(url, download=False)
-                self.after(0, self._update_info_ui)
-            except yt_dlp.utils.DownloadError as e:
-                error_msg = f"Failed to fetch video info: {e}"
-                if "unavailable" in str(e).lower() or "private" in str(e).lower():
-                    error_msg = "Error: Video is unavailable or private or geographical restrictions."
-                elif "no appropriate" in str(e).lower() or "unsupported URL" in str(e).lower():
-                    error_msg = "Error: No downloadable content or unsupported URL found for this link."
-                self.after(0, lambda: messagebox.showerror("Error", error_msg))
-                self.after(0, lambda: self.status_var.set("Idle"))
-                self.after(0, lambda: self.add_job_btn.config(state='disabled'))
-                self.after(0, lambda: self.download_now_btn.config(state='disabled'))
-                logger.error(f"yt-dlp DownloadError: {error_msg}")
+                started = time.perf_counter()
+                with SESSIONS.session(ydl_opts, url) as ydl:
+                    info = ydl.extract_info(url, download=False)
+                METRICS.observe_extract(url, info, time.perf_counter() - started)
+                # Parse the formats here rather than on the Tk thread
+                format_table = FormatTable(info.get('formats'))
             except Exception as e:
-                self.after(0, lambda: messagebox.showerror("Error", f"An unexpected error occurred:\n{e}"))
-                self.after(0, lambda: self.status_var.set("Idle"))
-                self.after(0, lambda: self.add_job_btn.config(state='disabled'))
-                self.after(0, lambda: self.download_now_btn.config(state='disabled'))
-                logger.exception("An unexpected error occurred during fetch_info.")
+                METRICS.extract_failed(url)
+                error = e
+            # Tk calls aren't safe from this thread; the UI queue hands the result over
+            self.ui_queue.put((None, 'info_extracted', url, generation, info, format_table, error))
 
         threading.Thread(target=worker, daemon=True).start()
 
+    def _on_info_extracted(self, url, generation, info, format_table, error):
+        if self.info_inflight.get(url) != generation:
+            logger.debug(f"Ignoring superseded info fetch for URL: {url}")
+            return
+        del self.info_inflight[url]
+
+        if info:
+            self.info_cache[url] = (time.time(), info, format_table)
+            while len(self.info_cache) > INFO_CACHE_SIZE:
+                self.info_cache.popitem(last=False)
+
+        # Only results for the URL the user actually asked for touch the UI
+        if url != self.requested_fetch_url:
+            return
+        self.requested_fetch_url = None
+        if self.url_entry.get().strip() != url:
+            self.status_var.set("Idle")
+            return
+
+        if info:
+            self.info = info
+            self.format_table = format_table
+            self._update_info_ui()
+            return
+
+        if isinstance(error, yt_dlp.utils.DownloadError):
+            error_msg = f"Failed to fetch video info: {error}"
+            if "unavailable" in str(error).lower() or "private" in str(error).lower():
+                error_msg = "Error: Video is unavailable or private or geographical restrictions."
+            elif "no appropriate" in str(error).lower() or "unsupported URL" in str(error).lower():
+                error_msg = "Error: No downloadable content or unsupported URL found for this link."
+            logger.error(f"yt-dlp DownloadError: {error_msg}")
+        else:
+            error_msg = f"An unexpected error occurred:\n{error}"
+            logger.error(f"An unexpected error occurred during fetch_info: {error}")
+        messagebox.showerror("Error", error_msg)
+        self.status_var.set("Idle")
+        self.add_job_btn.config(state='disabled')
+        self.download_now_btn.config(state='disabled')
+
     def _update_info_ui(self):
         if not self.info:
             self.status_var.set("Info fetch failed.")
@@ -627,6 +1084,11 @@ class YTDownloaderApp(ttk.Window):
             return
 
         self.title_var.set(self.info.get('title', 'Unknown Title'))
+        if self.info.get('_type') == 'playlist':
+            self.status_var.set("This URL is a playlist. Use playlist import to queue its entries.")
+            if messagebox.askyesno("Playlist detected", "This URL is a playlist or channel. Queue its entries with playlist import?"):
+                self.open_playlist_import_dialog(url=self.info.get('webpage_url') or self.url_entry.get().strip())
+            return
         self.update_format_list()
 
         subtitles = self.info.get('subtitles') or {}
@@ -635,155 +1097,71 @@ class YTDownloaderApp(ttk.Window):
         available_subs = set(k for k,v in subtitles.items() if v)
         available_auto = set(k for k,v in automatic_captions.items() if v)
         langs = sorted(list(available_subs | available_auto))
-
-        langs_display = ["None"] + langs
-        self.sub_lang_combo['values'] = langs_display
-        self.sub_lang_combo.current(0)
+        self.set_subtitle_languages(langs)
 
         self.add_job_btn['state'] = 'normal'
         self.download_now_btn['state'] = 'normal'
         self.status_var.set("Info fetched successfully. Select a format and add to queue or download.")
         logger.info(f"Info fetched successfully for '{self.info.get('title', 'Unknown Title')}'")
 
+    def set_subtitle_languages(self, langs):
+        self.sub_lang_menu.delete(0, 'end')
+        self.sub_lang_vars = {}
+        for lang in langs:
+            var = self.sub_lang_vars[lang] = tk.BooleanVar(value=False)
+            self.sub_lang_menu.add_checkbutton(label=lang, variable=var, command=self._on_subtitle_toggled)
+        self.sub_lang_var.set("None")
+
+    def _on_subtitle_toggled(self):
+        self.sub_lang_var.set(",".join(lang for lang, var in self.sub_lang_vars.items() if var.get()) or "None")
+
     def update_format_list(self, *_):
         choice = self.choice_var.get()
-        if not self.info:
+        if not self.info or not self.format_table:
             return
 
-        formats = self.info.get('formats', [])
+        table = self.format_table
+        self.codec_filter_combo['values'] = ["Any"] + table.codecs(choice)
+        self.container_filter_combo['values'] = ["Any"] + table.containers(choice)
+        if self.codec_filter_var.get() not in self.codec_filter_combo['values']:
+            self.codec_filter_var.set("Any")
+        if self.container_filter_var.get() not in self.container_filter_combo['values']:
+            self.container_filter_var.set("Any")
+        try:
+            max_size = float(self.max_size_filter_var.get()) * 1024 * 1024 if self.max_size_filter_var.get().strip() else None
+        except ValueError:
+            max_size = None
+        rows = table.view(
+            choice,
+            codec=None if self.codec_filter_var.get() == "Any" else self.codec_filter_var.get(),
+            container=None if self.container_filter_var.get() == "Any" else self.container_filter_var.get(),
+            max_height=None if self.max_height_filter_var.get() == "Any" else int(self.max_height_filter_var.get()),
+            max_size=max_size,
+        )
+
         self.format_listbox.delete(0, 'end')
         self.candidates.clear()
-
-        idx = 1
-        if choice == 'video':
-            combined_formats = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
-            video_only_formats = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') == 'none']
-
-            # Sort combined formats by resolution (low to high)
-            combined_formats.sort(key=lambda x: (
-                x.get('height', 0),  # Sort by height (resolution)
-                x.get('filesize', 0) or x.get('filesize_approx', 0)  # Then by size
-            ))  # Removed reverse=True for low to high sorting
-
-            # Add combined formats
-            for f in combined_formats:
-                size_bytes = f.get('filesize') or f.get('filesize_approx') or 0
-                size_mb_str = f"{size_bytes / 1024 / 1024:.2f} MB" if size_bytes else "Unknown"
-                height = f.get('height', 0)
-                res = f"{f.get('width', '?')}x{height}"
-                ext = f.get('ext', 'N/A')
-                fps = f.get('fps', '?')
-                abr = f.get('abr', '?') # Audio Bitrate
-                
-                # Add resolution label
-                res_label = ""
-                if height >= 15360:
-                    res_label = "32K"
-                elif height >= 7680:
-                    res_label = "16K"
-                elif height >= 4320:
-                    res_label = "8k"
-                elif height >= 2160:
-                    res_label = "4K"
-                elif height >= 1440:
-                    res_label = "2K"
-                elif height >= 1080:
-                    res_label = "1080p"
-                elif height >= 720:
-                    res_label = "720p"
-                elif height >= 480:
-                    res_label = "480p"
-                elif height >= 360:
-                    res_label = "360p"
-                elif height >= 240:
-                    res_label = "240p"
-                elif height >= 144:
-                    res_label = "144p"
-                
-                display_text = f"{idx}. {res_label} ({res}) | {size_mb_str} | {fps}fps | Audio: {abr}k"
-                self.format_listbox.insert('end', display_text)
-                self.candidates.append(f)
-                idx += 1
-
-            # Sort video-only formats by resolution (low to high)
-            video_only_formats.sort(key=lambda x: (
-                x.get('height', 0),  # Sort by height (resolution)
-                x.get('filesize', 0) or x.get('filesize_approx', 0)  # Then by size
-            ))  # Removed reverse=True for low to high sorting
-
-            # Add video-only formats
-            for f in video_only_formats:
-                size_bytes = f.get('filesize') or f.get('filesize_approx') or 0
-                size_mb_str = f"{size_bytes / 1024 / 1024:.2f} MB" if size_bytes else "Unknown"
-                height = f.get('height', 0)
-                res = f"{f.get('width', '?')}x{height}"
-                ext = f.get('ext', 'N/A')
-                fps = f.get('fps', '?')
-                
-                # Add resolution label
-                res_label = ""
-                if height >= 15360:
-                    res_label = "32K"
-                elif height >= 7680:
-                    res_label = "16K"
-                elif height >= 4320:
-                    res_label = "8K"
-                elif height >= 2160:
-                    res_label = "4K"
-                elif height >= 1440:
-                    res_label = "2K"
-                elif height >= 1080:
-                    res_label = "1080p"
-                elif height >= 720:
-                    res_label = "720p"
-                elif height >= 480:
-                    res_label = "480p"
-                elif height >= 360:
-                    res_label = "360p"
-                elif height >= 240:
-                    res_label = "240p"
-                elif height >= 144:
-                    res_label = "144p"
-
-
-                display_text = f"{idx}. {res_label} ({res}) | {size_mb_str} | {fps}fps (Video Only)"
-                self.format_listbox.insert('end', display_text)
-                self.candidates.append(f)
-                idx += 1
-            
-            if not combined_formats and not video_only_formats:
+        labels = []
+        if choice == 'audio':
+            # Add a general "Best Audio" option first
+            labels.append("Best Audio (320kbps) - recommended")
+            self.candidates.append({"format_id": "bestaudio/best", "is_best_audio_option": True})
+            labels.append("Best Audio (original codec, no re-encode)")
+            self.candidates.append({"format_id": "bestaudio/best", "is_best_audio_option": True, "audio_passthrough": True})
+        for row in rows:
+            labels.append(row.label)
+            self.candidates.append(row.format)
+
+        if not labels:
+            if table.views['video']:
+                self.format_listbox.insert('end', "No formats match the current filters.")
+            else:
                 self.format_listbox.insert('end', "No video formats found. Try Audio option.")
-                self.candidates.append({"dummy": True})
                 logger.info("No video formats found for the current video.")
+            self.candidates.append({"dummy": True})
+        else:
+            self.format_listbox.insert('end', *(f"{i}. {label}" for i, label in enumerate(labels, 1)))
 
-        elif choice == 'audio':
-            # Get all audio formats
-            audio_formats = [f for f in formats if f.get('acodec') != 'none']
-            
-            # Sort by audio quality (abr)
-            audio_formats.sort(key=lambda x: (x.get('abr', 0) or 0), reverse=True)
-
-            # Add a general "Best Audio" option first
-            display_text = "1. Best Audio (320kbps) - recommended"
-            self.format_listbox.insert('end', display_text)
-            self.candidates.append({"format_id": "bestaudio/best", "is_best_audio_option": True})
-            idx += 1
-
-            # Add other available audio formats
-            for f in audio_formats:
-                size_bytes = f.get('filesize') or f.get('filesize_approx') or 0
-                size_mb_str = f"{size_bytes / 1024 / 1024:.2f} MB" if size_bytes else "Unknown"
-                abr = f.get('abr', '?') # Audio Bitrate
-                display_text = f"{idx}. {abr}kbps | {size_mb_str}"
-                self.format_listbox.insert('end', display_text)
-                self.candidates.append(f)
-                idx += 1
-
-            if not audio_formats and not any(c.get("is_best_audio_option") for c in self.candidates):
-                self.format_listbox.insert('end', "No audio formats found.")
-                self.candidates.append({"dummy": True})
-                logger.info("No audio formats found for the current video.")
-        
         self.on_format_select(None)
         # Select the first valid item if available
         if self.candidates and not self.candidates[0].get("dummy"):
@@ -831,41 +1209,555 @@ class YTDownloaderApp(ttk.Window):
         sub_lang = self.sub_lang_var.get()
         out_dir = self.out_dir_var.get()
 
-        job = DownloadJob(url, choice, format_info, sub_lang, out_dir, title=self.title_var.get())
+        job = DownloadJob(url, choice, format_info, sub_lang, out_dir, title=self.title_var.get(), video_id=self.info.get('id'),
+                          thumbnail_url=thumbnail_url_of(self.info), embed_subs=self.embed_subs_var.get(),
+                          priority="interactive" if start_immediately else DEFAULT_PRIORITY)
+        self._add_job_to_queue(job)
+
+        if start_immediately:
+            self._start_interactive_job(job)
+            self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Starting download immediately: {job.title}"))
+            logger.info(f"Job '{job.title}' started immediately.")
         
+        self.save_queue()
+
+    def _add_job_to_queue(self, job: DownloadJob, announce=True):
         with self.jobs_lock:
             self.jobs.append(job)
-            job.tree_item_id = self.jobs_tree.insert('', 'end',
+            job.tree_item_id = self.jobs_tree.insert('', 'end', tags=(job.priority,),
                                                     values=(job.title, job.status, f"{job.progress:.1f}%"))
-            self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Added to queue: {job.title}"))
+            if announce:
+                self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Added to queue: {job.title}"))
         logger.info(f"Job '{job.title}' added to queue. Choice: {job.choice}, Format: {job.format_info.get('format_id', 'N/A')}")
 
-        if start_immediately:
-            self.start_download_job(job, select_in_ui=True)
-            self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Starting download immediately: {job.title}"))
-            logger.info(f"Job '{job.title}' started immediately.")
-        
+    def _dispatch_queued_jobs(self):
+        # Start auto-start jobs (Start All, playlist expansion, preempted jobs) as download slots free up
+        with self.jobs_lock:
+            running = [j for j in self.jobs if j.is_active()]
+            jobs = list(self.jobs)
+        if self.scheduler.max_active > len(running):
+            for job in self.disk_space.resumable():
+                # Back in line like a preempted job, so priorities, the policy and download windows apply
+                job.preempted = True
+                job.auto_start = True
+            saturated = self.concurrency.saturated
+            for job in self.scheduler.next_jobs(jobs, running, saturated=saturated):
+                if saturated and job.priority == "interactive":
+                    self._preempt_for(job, running)
+                self.start_download_job(job, select_in_ui=False)
+                running.append(job)
+        self._refresh_upcoming_info(jobs)
+
+    def _refresh_upcoming_info(self, jobs):
+        # Jobs next in line get their metadata (and fresh stream URLs) in the background, so they transfer as soon
+        # as they start instead of extracting first
+        self.info_refresher.refresh(self.scheduler.upcoming(jobs, self.scheduler.max_active * INFO_REFRESH_AHEAD))
+
+    def _refresh_upcoming_info_tick(self):
+        # Catches info that is about to expire while its job still waits
+        with self.jobs_lock:
+            jobs = list(self.jobs)
+        self._refresh_upcoming_info(jobs)
+        self.after(INFO_REFRESH_INTERVAL_MS, self._refresh_upcoming_info_tick)
+
+    def _start_interactive_job(self, job: DownloadJob):
+        # Starts right away; when every slot is busy, running bulk jobs are paused to make room
+        with self.jobs_lock:
+            running = [j for j in self.jobs if j.is_active()]
+        self._preempt_for(job, running)
+        self.start_download_job(job, select_in_ui=True)
+
+    def _preempt_for(self, job, running):
+        # On a saturated link a bulk job makes way even when a slot is free, or it keeps most of the bandwidth
+        running = [j for j in running if not j.stop_requested()]
+        for victim in self.scheduler.victims(job, running, saturated=self.concurrency.saturated):
+            # Queued before the stop signal, so it can't land after the worker's "Paused"
+            victim.status = "Pausing..."
+            self.ui_queue.put((victim.tree_item_id, 'status_update', victim.status, f"Pausing {victim.title} for {job.title}"))
+            self.scheduler.preempt(victim, job)
+
+    def _tune_concurrency(self):
+        with self.jobs_lock:
+            active = [j for j in self.jobs if j.is_active()]
+            backlog = sum(1 for j in self.jobs if self.scheduler.is_runnable(j))
+        downloading = sum(1 for j in active if j.downloaded_bytes)
+        if self.concurrency.tick(len(active), backlog, downloading=downloading):
+            self._dispatch_queued_jobs()
+        self.concurrency_var.set(self.concurrency.describe())
+        self.after(CONCURRENCY_TICK_MS, self._tune_concurrency)
+
+    def _toggle_adaptive_concurrency(self):
+        self.concurrency.enabled = self.adaptive_concurrency_var.get()
+        if not self.concurrency.enabled:
+            self.concurrency._set(MAX_CONCURRENT_DOWNLOADS, 1, "adaptive concurrency off")
+        self.concurrency_var.set(self.concurrency.describe())
+        self._dispatch_queued_jobs()
+
+    def _set_scheduling_policy(self):
+        self.scheduler.policy = self.scheduling_policy_var.get()
+        logger.info(f"Scheduling policy set to {self.scheduler.policy}")
+        self._dispatch_queued_jobs()
+
+    def _show_job_menu(self, event):
+        item = self.jobs_tree.identify_row(event.y)
+        if not item:
+            return
+        if item not in self.jobs_tree.selection():
+            self.jobs_tree.selection_set(item)
+        job = self._job_for_item(item)
+        if job:
+            self.job_priority_var.set(job.priority)
+        self.job_menu.tk_popup(event.x_root, event.y_root)
+
+    def _job_for_item(self, item):
+        with self.jobs_lock:
+            return next((j for j in self.jobs if j.tree_item_id == item), None)
+
+    def _set_selected_priority(self):
+        priority = self.job_priority_var.get()
+        selected = set(self.jobs_tree.selection())
+        with self.jobs_lock:
+            jobs = [j for j in self.jobs if j.tree_item_id in selected]
+        for job in jobs:
+            job.priority = priority
+            self.jobs_tree.item(job.tree_item_id, tags=(priority,))
+        logger.info(f"Set priority of {len(jobs)} job(s) to {priority}")
+        self.save_queue()
+        self._dispatch_queued_jobs()
+
+    def _move_selected_jobs(self, index):
+        selected = self.jobs_tree.selection()
+        for item in (reversed(selected) if index == 0 else selected):
+            self.jobs_tree.move(item, '', index)
+        self._sync_job_order()
+
+    def _on_job_drag(self, event):
+        target = self.jobs_tree.identify_row(event.y)
+        dragged = self.jobs_tree.focus()
+        if target and dragged and target != dragged:
+            self.jobs_tree.move(dragged, '', self.jobs_tree.index(target))
+            self._drag_moved = True
+
+    def _on_job_drop(self, event):
+        if self._drag_moved:
+            self._drag_moved = False
+            self._sync_job_order()
+
+    def _sync_job_order(self):
+        # The tree is the source of truth for queue order after a reorder
+        order = {item: n for n, item in enumerate(self.jobs_tree.get_children())}
+        with self.jobs_lock:
+            self.jobs.sort(key=lambda j: order.get(j.tree_item_id, len(order)))
         self.save_queue()
 
     def add_job(self):
         self._create_and_start_job(start_immediately=False)
 
+    def export_traces(self, fmt):
+        if fmt == "chrome":
+            path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="url_downloader_trace.json",
+                                                filetypes=[("Chrome trace", "*.json"), ("All files", "*.*")])
+        else:
+            path = filedialog.asksaveasfilename(defaultextension=".jsonl", initialfile="url_downloader_trace.jsonl",
+                                                filetypes=[("JSON Lines", "*.jsonl"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            count = self.tracer.export_chrome_trace(path) if fmt == "chrome" else self.tracer.export_jsonl(path)
+        except OSError as e:
+            messagebox.showerror("Export Traces", f"Could not write {path}:\n{e}")
+            return
+        messagebox.showinfo("Export Traces", f"Exported {count} spans to {path}")
+
+    def open_bulk_import_dialog(self):
+        dialog = ttk.Toplevel(self)
+        dialog.title("Bulk Import")
+        dialog.geometry("640x480")
+        dialog.transient(self)
+
+        ttk.Label(dialog, text="Paste URLs (one per line, or CSV):").pack(anchor='w', padx=10, pady=(10, 2))
+        text_frame = ttk.Frame(dialog)
+        text_frame.pack(fill='both', expand=True, padx=10)
+        urls_text = tk.Text(text_frame, height=12, wrap='none')
+        urls_text.pack(side=tk.LEFT, fill='both', expand=True)
+        text_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=urls_text.yview)
+        text_scrollbar.pack(side=tk.RIGHT, fill="y")
+        urls_text.config(yscrollcommand=text_scrollbar.set)
+
+        def load_file():
+            path = filedialog.askopenfilename(parent=dialog, filetypes=[("URL lists", "*.txt *.csv"), ("All files", "*.*")])
+            if path:
+                try:
+                    urls = read_url_file(path)
+                except OSError as e:
+                    messagebox.showerror("Bulk Import", f"Could not read {path}:\n{e}", parent=dialog)
+                    return
+                urls_text.insert('end', "\n".join(urls) + "\n")
+                logger.info(f"Loaded {len(urls)} URLs from {path} for bulk import.")
+
+        options_frame = ttk.Frame(dialog)
+        options_frame.pack(fill='x', padx=10, pady=5)
+        ttk.Button(options_frame, text="Load File...", command=load_file, bootstyle="secondary").grid(row=0, column=0, sticky='w')
+        ttk.Label(options_frame, text="Format policy:").grid(row=0, column=1, sticky='e', padx=(15, 5))
+        policy_combo = ttk.Combobox(options_frame, state='readonly', width=38,
+                                    values=[policy.name for policy in FORMAT_POLICIES])
+        policy_combo.grid(row=0, column=2, sticky='w')
+        policy_combo.current(0)
+
+        import_progress_var = tk.DoubleVar()
+        import_status_var = tk.StringVar(value="Idle")
+        ttk.Progressbar(dialog, variable=import_progress_var, maximum=100).pack(fill='x', padx=10, pady=(5, 2))
+        ttk.Label(dialog, textvariable=import_status_var).pack(anchor='w', padx=10)
+
+        btn_frame = ttk.Frame(dialog)
+        btn_frame.pack(pady=10)
+        import_btn = ttk.Button(btn_frame, text="Import", bootstyle="primary")
+        import_btn.grid(row=0, column=0, padx=5)
+        cancel_btn = ttk.Button(btn_frame, text="Cancel Import", bootstyle="danger", state='disabled')
+        cancel_btn.grid(row=0, column=1, padx=5)
+
+        def start_import():
+            urls = parse_url_list(urls_text.get("1.0", "end"))
+            if not urls:
+                messagebox.showwarning("Bulk Import", "No URLs found.", parent=dialog)
+                return
+            if self.bulk_importer and not self.bulk_importer.finished.is_set():
+                messagebox.showwarning("Bulk Import", "A bulk import is already running.", parent=dialog)
+                return
+            known = self._known_job_keys()
+            duplicates = [url for url in urls if url in known]
+            if duplicates:
+                urls = [url for url in urls if url not in known]
+                logger.info(f"Bulk import skipped {len(duplicates)} URLs already in the queue.")
+            if not urls:
+                import_status_var.set(f"All {len(duplicates)} URLs are already in the queue")
+                return
+            policy = FORMAT_POLICIES[policy_combo.current()]
+            import_btn['state'] = 'disabled'
+            cancel_btn['state'] = 'normal'
+            importer = self._run_bulk_import(urls, policy, out_dir=self.out_dir_var.get(), known=known)
+            poll_progress(importer, len(duplicates))
+
+        def poll_progress(importer, skipped):
+            if not dialog.winfo_exists():
+                return
+            total = importer.total or 1
+            import_progress_var.set(importer.done / total * 100)
+            import_status_var.set(f"{importer.done}/{importer.total} processed, {len(importer.failures)} failed, "
+                                  f"{skipped + importer.duplicates} already queued")
+            if importer.finished.is_set():
+                import_btn['state'] = 'normal'
+                cancel_btn['state'] = 'disabled'
+                if importer.failures:
+                    logger.info("Bulk import failures:\n" + "\n".join(f"{url}: {err}" for url, err in importer.failures))
+                return
+            dialog.after(250, poll_progress, importer, skipped)
+
+        def cancel_import():
+            if self.bulk_importer:
+                self.bulk_importer.cancel()
+                cancel_btn['state'] = 'disabled'
+                logger.info("User canceled bulk import.")
+
+        import_btn.config(command=start_import)
+        cancel_btn.config(command=cancel_import)
+
+    def _run_bulk_import(self, urls, policy, out_dir, known=()):
+        importer = BulkImporter(policy, max_workers=BULK_IMPORT_WORKERS, known=known)
+        self.bulk_importer = importer
+
+        def on_result(url, info, format_info):
+            job = DownloadJob(url, policy.choice, format_info, "None", out_dir,
+                              title=info.get('title') or url, video_id=info.get('id'),
+                              thumbnail_url=thumbnail_url_of(info), priority="bulk")
+            self.ui_queue.put((None, 'add_job', job))
+
+        def worker():
+            try:
+                importer.run(urls, on_result)
+            except Exception:
+                logger.exception("Bulk import failed.")
+            # Jobs are added through the UI queue, so persist after they have been handled
+            self.ui_queue.put((None, 'save_queue'))
+
+        threading.Thread(target=worker, daemon=True).start()
+        return importer
+
+    def _load_output_roots(self):
+        try:
+            return load_roots(OUTPUT_ROOTS_FILE)
+        except Exception as e:
+            logger.error(f"Error loading output roots from {OUTPUT_ROOTS_FILE}: {e}")
+            return []
+
+    def open_output_roots_dialog(self):
+        dialog = ttk.Toplevel(self)
+        dialog.title("Output Roots")
+        dialog.geometry("620x320")
+        dialog.transient(self)
+
+        form = ttk.Frame(dialog, padding=10)
+        form.pack(fill='both', expand=True)
+        ttk.Label(form, text="Jobs saved to any of these folders are spread across them by free space, "
+                             "weight and how many downloads are writing there.", wraplength=590).pack(anchor='w')
+
+        roots_tree = ttk.Treeview(form, columns=('path', 'weight', 'free'), show='headings', height=6)
+        roots_tree.heading('path', text="Folder")
+        roots_tree.heading('weight', text="Weight")
+        roots_tree.heading('free', text="Free")
+        roots_tree.column('path', width=380)
+        roots_tree.column('weight', width=70, anchor='e')
+        roots_tree.column('free', width=90, anchor='e')
+        roots_tree.pack(fill='both', expand=True, pady=5)
+
+        def insert_root(path, weight):
+            try:
+                free = format_bytes(shutil.disk_usage(path).free)
+            except OSError:
+                free = "n/a"
+            roots_tree.insert('', 'end', values=(path, f"{weight:g}", free))
+
+        for root in self.storage.roots:
+            insert_root(root.path, root.weight)
+
+        weight_var = tk.DoubleVar(value=1.0)
+        btn_frame = ttk.Frame(form)
+        btn_frame.pack(fill='x')
+
+        def add_root():
+            folder = filedialog.askdirectory(parent=dialog, initialdir=self.out_dir_var.get())
+            if folder:
+                insert_root(folder, weight_var.get())
+
+        def remove_root():
+            for item in roots_tree.selection():
+                roots_tree.delete(item)
+
+        def set_weight():
+            for item in roots_tree.selection():
+                path, _, free = roots_tree.item(item, 'values')
+                roots_tree.item(item, values=(path, f"{weight_var.get():g}", free))
+
+        def save():
+            roots = [OutputRoot(path, float(weight)) for path, weight, _ in
+                     (roots_tree.item(item, 'values') for item in roots_tree.get_children())]
+            try:
+                save_roots(OUTPUT_ROOTS_FILE, roots)
+            except Exception as e:
+                messagebox.showerror("Output Roots", f"Could not save output roots: {e}", parent=dialog)
+                return
+            self.storage.set_roots(roots)
+            if roots and not self.storage.manages(self.out_dir_var.get()):
+                self.out_dir_var.set(roots[0].path)
+            logger.info(f"Output roots set to {', '.join(f'{r.path} (x{r.weight:g})' for r in roots) or 'none'}")
+            dialog.destroy()
+
+        ttk.Button(btn_frame, text="Add Folder...", command=add_root).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Remove", command=remove_root).pack(side=tk.LEFT, padx=5)
+        ttk.Label(btn_frame, text="Weight:").pack(side=tk.LEFT, padx=(15, 2))
+        ttk.Spinbox(btn_frame, textvariable=weight_var, from_=0, to=100, increment=0.5, width=6).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="Set", command=set_weight).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Save", bootstyle="primary", command=save).pack(side=tk.RIGHT)
+
+    def _load_download_windows(self):
+        try:
+            return load_calendar(DOWNLOAD_WINDOWS_FILE)
+        except Exception as e:
+            logger.error(f"Error loading download windows from {DOWNLOAD_WINDOWS_FILE}: {e}")
+            return {}
+
+    def open_download_windows_dialog(self):
+        dialog = ttk.Toplevel(self)
+        dialog.title("Download Windows")
+        dialog.geometry("620x420")
+        dialog.transient(self)
+
+        form = ttk.Frame(dialog, padding=10)
+        form.pack(fill='both', expand=True)
+        ttk.Label(form, text=f"Allowed download times per priority class ({', '.join(PRIORITY_CLASSES)}). "
+                             "Classes not listed download at any time. Overnight windows end the next day; "
+                             "max_bytes_per_second caps the whole class during that window. "
+                             "Jobs started by the queue pause when their window closes and resume when it reopens.",
+                  wraplength=590).pack(anchor='w')
+
+        text = tk.Text(form, height=14, wrap='none')
+        text.pack(fill='both', expand=True, pady=5)
+        text.insert('1.0', json.dumps(self.calendar.records or EXAMPLE_CALENDAR, indent=2))
+
+        def save():
+            try:
+                records = json.loads(text.get('1.0', 'end'))
+                if not isinstance(records, dict):
+                    raise ValueError("Expected an object of priority class -> list of windows")
+                unknown = set(records) - set(PRIORITY_CLASSES)
+                if unknown:
+                    raise ValueError(f"Unknown priority class: {', '.join(sorted(unknown))}")
+                self.calendar.set_records(records)
+            except ValueError as e:
+                messagebox.showerror("Download Windows", f"Invalid download windows: {e}", parent=dialog)
+                return
+            try:
+                save_calendar(DOWNLOAD_WINDOWS_FILE, records)
+            except Exception as e:
+                messagebox.showerror("Download Windows", f"Could not save download windows: {e}", parent=dialog)
+                return
+            logger.info(f"Download windows set for {', '.join(records) or 'no classes'}")
+            threading.Thread(target=self._apply_download_windows, daemon=True).start()
+            dialog.destroy()
+
+        def clear():
+            text.delete('1.0', 'end')
+            text.insert('1.0', "{}")
+
+        btn_frame = ttk.Frame(form)
+        btn_frame.pack(fill='x')
+        ttk.Button(btn_frame, text="Always Allow", command=clear).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="Save", bootstyle="primary", command=save).pack(side=tk.RIGHT)
+
+    def _known_job_keys(self):
+        with self.jobs_lock:
+            return {key for j in self.jobs for key in (j.video_id, j.url) if key}
+
+    def open_playlist_import_dialog(self, url=None):
+        dialog = ttk.Toplevel(self)
+        dialog.title("Import Playlist/Channel")
+        dialog.geometry("560x240")
+        dialog.transient(self)
+
+        form = ttk.Frame(dialog, padding=10)
+        form.pack(fill='both', expand=True)
+        form.grid_columnconfigure(1, weight=1)
+
+        ttk.Label(form, text="Playlist/Channel URL:").grid(row=0, column=0, sticky='w')
+        url_var = tk.StringVar(value=url or self.url_entry.get().strip())
+        ttk.Entry(form, textvariable=url_var).grid(row=0, column=1, sticky='ew', pady=2)
+
+        ttk.Label(form, text="Format policy:").grid(row=1, column=0, sticky='w')
+        policy_combo = ttk.Combobox(form, state='readonly', values=[policy.name for policy in FORMAT_POLICIES])
+        policy_combo.grid(row=1, column=1, sticky='ew', pady=2)
+        policy_combo.current(0)
+
+        start_now_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(form, text="Start downloading while the playlist is being expanded",
+                        variable=start_now_var).grid(row=2, column=0, columnspan=2, sticky='w', pady=5)
+
+        status_var = tk.StringVar(value="Idle")
+        ttk.Label(form, textvariable=status_var).grid(row=3, column=0, columnspan=2, sticky='w')
+
+        btn_frame = ttk.Frame(form)
+        btn_frame.grid(row=4, column=0, columnspan=2, pady=10)
+        import_btn = ttk.Button(btn_frame, text="Expand and Queue", bootstyle="primary")
+        import_btn.grid(row=0, column=0, padx=5)
+        stop_btn = ttk.Button(btn_frame, text="Stop", bootstyle="danger", state='disabled')
+        stop_btn.grid(row=0, column=1, padx=5)
+        expander_holder = []
+
+        def start_expansion():
+            playlist_url = url_var.get().strip()
+            if not playlist_url:
+                messagebox.showwarning("Input error", "Please enter a Valid URL.", parent=dialog)
+                return
+            policy = FORMAT_POLICIES[policy_combo.current()]
+            expander = self._run_playlist_expansion(playlist_url, policy, self.out_dir_var.get(), start_now_var.get())
+            expander_holder[:] = [expander]
+            import_btn['state'] = 'disabled'
+            stop_btn['state'] = 'normal'
+            poll_progress(expander)
+
+        def poll_progress(expander):
+            if not dialog.winfo_exists():
+                return
+            status_var.set(f"{expander.seen} entries read, {expander.added} queued, {expander.skipped} skipped")
+            if expander.finished.is_set():
+                if expander.error:
+                    status_var.set(f"Stopped after {expander.added} queued: {expander.error}")
+                import_btn['state'] = 'normal'
+                stop_btn['state'] = 'disabled'
+                return
+            dialog.after(250, poll_progress, expander)
+
+        def stop_expansion():
+            if expander_holder:
+                expander_holder[0].cancel()
+                stop_btn['state'] = 'disabled'
+                logger.info("User stopped playlist expansion.")
+
+        import_btn.config(command=start_expansion)
+        stop_btn.config(command=stop_expansion)
+
+    def _run_playlist_expansion(self, url, policy, out_dir, start_now):
+        known = self._known_job_keys()
+        format_info = policy.selector()
+        extensions = final_extensions(policy.choice, format_info)
+
+        def is_known(entry):
+            if entry.get('id') in known or entry_url(entry) in known:
+                return True
+            title = entry.get('title')
+            if not title:
+                return False
+            # Skip entries whose output already exists from an earlier run
+            base = os.path.join(out_dir, sanitize_filename(title))
+            return any(os.path.exists(base + extension) for extension in extensions)
+
+        def on_page(entries):
+            # Backpressure: don't run ahead of the UI thread adding rows
+            while self.ui_queue.qsize() > 200 and not expander.cancel_event.is_set():
+                time.sleep(0.1)
+            jobs = []
+            for entry in entries:
+                url_ = entry_url(entry)
+                job = DownloadJob(url_, policy.choice, dict(format_info), "None", out_dir,
+                                  title=entry.get('title') or url_, video_id=entry.get('id'),
+                                  thumbnail_url=thumbnail_url_of(entry), priority="bulk")
+                job.auto_start = start_now
+                known.update(k for k in (job.video_id, job.url) if k)
+                jobs.append(job)
+            self.ui_queue.put((None, 'add_jobs', jobs))
+
+        expander = PlaylistExpander(url, page_size=PLAYLIST_PAGE_SIZE, is_known=is_known)
+
+        def worker():
+            expander.run(on_page)
+            self.ui_queue.put((None, 'save_queue'))
+
+        threading.Thread(target=worker, daemon=True).start()
+        return expander
+
     def download_now(self):
         self._create_and_start_job(start_immediately=True)
 
-    def _strip_ansi_codes(self, text):
-        return re.sub(r'\x1b\[[0-9;]*m', '', text)
-    
+    def _render_job_row(self, job: DownloadJob):
+        # Rows scrolled out of view are only marked stale; they're formatted once they become visible
+        if not self.jobs_tree.bbox(job.tree_item_id):
+            self.stale_rows.add(job.tree_item_id)
+            return
+        self.stale_rows.discard(job.tree_item_id)
+        display_eta, display_size, display_speed = job_display_values(job)
+        self.jobs_tree.item(job.tree_item_id, values=(job.title, job.status, f"{job.progress:.1f}%", display_eta, display_size, display_speed))
+
+    def _on_jobs_tree_scrolled(self, first, last):
+        self.tree_scrollbar.set(first, last)
+        if self.stale_rows and not self._stale_refresh_pending:
+            self._stale_refresh_pending = True
+            self.after_idle(self._refresh_stale_rows)
+
+    def _refresh_stale_rows(self):
+        self._stale_refresh_pending = False
+        with self.jobs_lock:
+            stale_jobs = [j for j in self.jobs if j.tree_item_id in self.stale_rows]
+        self.stale_rows.clear()
+        for job in stale_jobs:
+            self._render_job_row(job)
+
     def update_job_list_item_ui(self, job: DownloadJob):
         current_time = time.time()
-        if hasattr(job, '_last_ui_list_update') and current_time - job._last_ui_list_update < 0.1:
+        if current_time - job.last_row_render_time < 0.1:
             return
-        job._last_ui_list_update = current_time
+        job.last_row_render_time = current_time
         
         if job.tree_item_id:
-            display_eta = self._strip_ansi_codes(job.eta)
-            display_speed = self._strip_ansi_codes(job.speed)
-            self.jobs_tree.item(job.tree_item_id, values=(job.title, job.status, f"{job.progress:.1f}%", display_eta, f"{job.current_size}/{job.total_size}", display_speed))
+            self._render_job_row(job)
 
         with self.jobs_lock:
             selected_items = self.jobs_tree.selection()
@@ -874,6 +1766,7 @@ class YTDownloaderApp(ttk.Window):
             if currently_selected_job and currently_selected_job.tree_item_id == job.tree_item_id:
                 self.progress_var.set(job.progress)
                 if job.status == "Downloading":
+                    display_eta, _, display_speed = job_display_values(job)
                     status_text = f"Downloading: {job.title} - {job.progress:.1f}% ({display_speed}, ETA: {display_eta})"
                 elif job.status == "Processing":
                     status_text = f"Processing: {job.title} - {job.progress:.1f}% (Merging...)"
@@ -893,47 +1786,43 @@ class YTDownloaderApp(ttk.Window):
                 if not currently_selected_job:
                     self.status_var.set("Idle")
 
-    def _start_all_downloads_worker(self):
+    def start_all_downloads(self):
+        # Everything startable is handed to the scheduler, which runs it by priority as slots free up
         with self.jobs_lock:
-            jobs_to_start = [job for job in self.jobs if job.status in ("Queued", "Paused", "Canceled", "Error")]
-        
+            jobs_to_start = [job for job in self.jobs
+                             if job.status in ("Queued", "Paused", "Canceled", "Error") and not job.is_active()]
+            for job in jobs_to_start:
+                job.status = "Queued"
+                job.auto_start = True
+
         if not jobs_to_start:
-            self.ui_queue.put((None, 'status_update', "No downloads to start.", "No downloads to start."))
+            self.status_var.set("No downloads to start.")
             logger.info("No queued, paused, canceled, or error jobs to start.")
             return
 
-        logger.info(f"About to start {len(jobs_to_start)} jobs")
-        
         for job in jobs_to_start:
-            if not (job.thread and job.thread.is_alive()):
-                self.start_download_job(job, select_in_ui=False)
-                time.sleep(0.1)
-        
-        with self.jobs_lock:
-            active_count = sum(1 for job in self.jobs if job.status in ("Downloading", "Processing"))
-        
-        if active_count > 0:
-            self.ui_queue.put((None, 'status_update', "Started all pending downloads.", f"Started {len(jobs_to_start)} downloads."))
-            logger.info(f"Started {len(jobs_to_start)} pending downloads.")
-        else:
-            self.ui_queue.put((None, 'status_update', "No downloads to start.", "No downloads to start."))
-
-    def start_all_downloads(self):
-        threading.Thread(target=self._start_all_downloads_worker, daemon=True).start()
+            self.update_job_list_item_ui(job)
+        self._dispatch_queued_jobs()
+        outside = sum(1 for job in jobs_to_start if not self.calendar.is_open(job.priority))
+        waiting = f", {outside} waiting for their download window" if outside else ""
+        self.status_var.set(f"Queued {len(jobs_to_start)} downloads, {self.scheduler.max_active} at a time{waiting}.")
+        logger.info(f"Start All queued {len(jobs_to_start)} jobs.")
+        self.save_queue()
 
     def start_download_job(self, job: DownloadJob, select_in_ui=True):
-        if job.thread and job.thread.is_alive():
+        if job.is_active():
             logger.warning(f"Attempted to start job '{job.title}' which is already active.")
             return
 
-        job.stop_event.clear()
-        job.is_paused = False
+        if job.status != "Retrying":
+            # Started by hand or by the queue: a fresh set of automatic retries
+            job.retries.clear()
         job.status = "Downloading"
         job.progress = 0
-        job.eta = "N/A"
-        job.current_size = "0 MB"
-        job.total_size = "Unknown"
-        job.speed = "0 B/s"
+        job.downloaded_bytes = 0
+        job.total_bytes = 0
+        job.speed_bps = None
+        job.eta_seconds = None
         job.last_ui_update_time = time.time()
         job.temp_files = []
         job.video_downloaded_bytes = 0
@@ -941,6 +1830,8 @@ class YTDownloaderApp(ttk.Window):
         job.video_total_bytes = 0
         job.audio_total_bytes = 0
         job.current_phase = "video"
+        job.preallocated = None
+        job.preempted = False
 
         if select_in_ui:
             self.ui_queue.put((job.tree_item_id, 'select_and_update_status', job.status, f"Starting download: {job.title}"))
@@ -949,55 +1840,71 @@ class YTDownloaderApp(ttk.Window):
         
         logger.info(f"Initiating download for '{job.title}'.")
         
-        job.thread = threading.Thread(target=self.download_worker, args=(job,))
-        job.thread.daemon = True
-        job.thread.start()
+        job.start_thread(self.download_worker)
         self.save_queue()
 
     def download_worker(self, job: DownloadJob):
+        self.tracer.begin_job(job)
         try:
-            os.makedirs(job.out_dir, exist_ok=True)
-            base_outtmpl_no_ext = os.path.join(job.out_dir, sanitize_filename(job.title))
-            logger.info(f"Download worker started for '{job.title}'. Output directory: {job.out_dir}")
-
-            if job.stop_event.is_set():
+            if job.stop_requested():
                 job.status = "Paused"
                 self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Download {job.title} paused before start."))
                 logger.info(f"Download for '{job.title}' paused before start by user.")
                 self.save_queue()
                 return
 
-            # Download thumbnail first
-            thumbnail_path = None
             try:
-                ydl_opts_thumb = {
-                    'quiet': True,
-                    'no_warnings': True,
-                    'writethumbnail': True,
-                    'outtmpl': f"{base_outtmpl_no_ext}.%(ext)s",
-                    'skip_download': True,
-                }
-                with yt_dlp.YoutubeDL(ydl_opts_thumb) as ydl:
-                    info = ydl.extract_info(job.url, download=True)
-                    # Find the downloaded thumbnail file
-                    for ext in ['jpg', 'webp', 'png']:
-                        possible_thumb = f"{base_outtmpl_no_ext}.{ext}"
-                        if os.path.exists(possible_thumb):
-                            thumbnail_path = possible_thumb
-                            break
-                logger.info(f"Thumbnail downloaded for '{job.title}' to {thumbnail_path}")
+                self.storage.admit(job, lambda out_dir: self._disk_space_needs(job, out_dir))
+            except InsufficientSpace as e:
+                self._wait_for_disk_space(job, f"Waiting for disk space ({e}): {job.title}")
+                return
+
+            os.makedirs(job.out_dir, exist_ok=True)
+            base_outtmpl_no_ext = os.path.join(job.out_dir, sanitize_filename(job.title))
+            logger.info(f"Download worker started for '{job.title}'. Output directory: {job.out_dir}")
+
+            if not job.video_id or not job.thumbnail_url:
+                # Jobs queued by older versions don't know their id or thumbnail yet
+                span = self.tracer.begin(job, "metadata")
+                with SESSIONS.session({'quiet': True, 'no_warnings': True, 'noplaylist': True}, job.url) as ydl:
+                    info = ydl.extract_info(job.url, download=False, process=False)
+                job.video_id = job.video_id or info.get('id')
+                job.thumbnail_url = job.thumbnail_url or thumbnail_url_of(info)
+                self.tracer.end(span)
+
+            cache_id = job.video_id or job.url
+
+            def on_cache_wait():
+                self.ui_queue.put((job.tree_item_id, 'status_update', "Downloading", f"Waiting for shared stream: {job.title}"))
+
+            # Cover image as JPEG bytes, fed to ffmpeg over stdin (shared with other jobs for the same video)
+            thumbnail_jpeg = None
+            span = self.tracer.begin(job, "thumbnail")
+            try:
+                thumbnail_jpeg = self.thumbnail_cache.get(cache_id, job.thumbnail_url, job.url, cancel_event=job.stop_event)
+                self.tracer.end(span, bytes=len(thumbnail_jpeg))
+                logger.info(f"Thumbnail for '{job.title}' ready ({len(thumbnail_jpeg) / 1024:.1f} KB)")
+            except CacheWaitCancelled:
+                raise
             except Exception as e:
+                self.tracer.end(span, status="error")
                 logger.warning(f"Failed to download thumbnail for '{job.title}': {e}")
 
             ydl_opts = {
                 'outtmpl': f"{base_outtmpl_no_ext}.%(ext)s",
                 'noplaylist': True,
                 'progress_hooks': [lambda d: self.ytdl_hook(d, job)],
+                'postprocessor_hooks': [METRICS.postprocessor_hook],
+                'logger': METRICS.ytdl_logger(job.url),
                 'quiet': True,
                 'no_warnings': True,
-                'retries': 5,
-                'fragment_retries': 5,
+                'retries': YTDL_RETRIES,
+                'fragment_retries': YTDL_RETRIES,
+                'retry_sleep_functions': {'http': ytdl_retry_sleep, 'fragment': ytdl_retry_sleep},
+                'concurrent_fragment_downloads': self.concurrency.fragments,
             }
+            # Subtitles are fetched once the first download that extracts this job's info has finished
+            sub_fetcher = SubtitleFetcher(subtitle_langs(job.sub_lang))
 
             if job.choice == "video":
                 is_combined_format = job.format_info.get('vcodec') != 'none' and job.format_info.get('acodec') != 'none'
@@ -1006,18 +1913,41 @@ class YTDownloaderApp(ttk.Window):
                 if is_video_only:
                     # Original logic for YouTube separate streams
                     job.current_phase = "video"
-                    video_outtmpl_part = f"{base_outtmpl_no_ext}_video.%(ext)s"
-                    ydl_opts_video = {**ydl_opts, 'format': job.format_info['format_id'], 'outtmpl': video_outtmpl_part}
-                    
+                    def produce_video(work_dir):
+                        ydl_opts_video = {**ydl_opts, 'format': job.format_info['format_id'],
+                                          'outtmpl': {'default': os.path.join(work_dir, "video.%(ext)s"),
+                                                      'subtitle': f"{base_outtmpl_no_ext}.%(ext)s"}}
+                        with SESSIONS.session(ydl_opts_video, job.url) as ydl:
+                            sub_fetcher.attach(ydl)
+                            info_dict_video = self._extract_for_download(ydl, job)
+                            return ydl.prepare_filename(info_dict_video)
+
                     self.ui_queue.put((job.tree_item_id, 'status_update', "Downloading", f"Downloading video stream for: {job.title}"))
                     logger.info(f"Starting video stream download for '{job.title}' (Format ID: {job.format_info['format_id']}).")
-                    with yt_dlp.YoutubeDL(ydl_opts_video) as ydl:
-                        info_dict_video = ydl.extract_info(job.url, download=True)
-                        video_file_path = ydl.prepare_filename(info_dict_video)
-                        job.temp_files.append(video_file_path)
+                    span = self.tracer.begin(job, "video")
+                    video_file_path = self.stream_cache.fetch(cache_id, job.format_info['format_id'], produce_video,
+                                                              cancel_event=job.stop_event, on_wait=on_cache_wait)
+                    job.cache_leases.append(video_file_path)
+                    self.tracer.end(span, bytes=file_size_or_none(video_file_path))
+                    if not job.video_total_bytes:
+                        job.video_total_bytes = job.video_downloaded_bytes = os.path.getsize(video_file_path)
                     logger.info(f"Video stream for '{job.title}' downloaded to: {video_file_path}")
 
-                    if job.stop_event.is_set():
+                    if sub_fetcher.langs and sub_fetcher.ydl is None:
+                        # The video stream came from the cache, so no download of ours extracted the subtitles
+                        span = self.tracer.begin(job, "subtitles")
+                        try:
+                            ydl_opts_subs = {**ydl_opts, 'skip_download': True,
+                                             'outtmpl': f"{base_outtmpl_no_ext}.%(ext)s"}
+                            with SESSIONS.session(ydl_opts_subs, job.url) as ydl:
+                                sub_fetcher.attach(ydl)
+                                self._extract_for_download(ydl, job)
+                            self.tracer.end(span)
+                        except Exception as e:
+                            self.tracer.end(span, status="error")
+                            logger.warning(f"Could not fetch subtitles for '{job.title}': {e}")
+
+                    if job.stop_requested():
                         job.status = "Paused"
                         self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Download {job.title} paused during video download."))
                         logger.info(f"Download for '{job.title}' paused during video download.")
@@ -1025,36 +1955,45 @@ class YTDownloaderApp(ttk.Window):
                         return
 
                     job.current_phase = "audio"
-                    audio_outtmpl_part = f"{base_outtmpl_no_ext}_audio.%(ext)s"
-                    ydl_opts_audio = {
-                        **ydl_opts,
-                        'format': "bestaudio/best",
-                        'outtmpl': audio_outtmpl_part,
-                        'postprocessors': [{
-                            'key': 'FFmpegExtractAudio',
-                            'preferredcodec': 'aac',
-                            'preferredquality': '320',
-                        }],
-                    }
-                    
+                    audio_format, audio_codec, audio_quality = "bestaudio/best", "aac", "320"
+                    def produce_audio(work_dir):
+                        ydl_opts_audio = {
+                            **ydl_opts,
+                            'format': audio_format,
+                            'outtmpl': os.path.join(work_dir, "audio.%(ext)s"),
+                            'postprocessors': [{
+                                'key': 'FFmpegExtractAudio',
+                                'preferredcodec': audio_codec,
+                                'preferredquality': audio_quality,
+                            }],
+                        }
+                        with SESSIONS.session(ydl_opts_audio, job.url) as ydl:
+                            info_dict_audio = self._extract_for_download(ydl, job)
+                        produced_path = info_dict_audio.get('filepath')
+                        if not produced_path:
+                            for f in os.listdir(work_dir):
+                                if f.startswith("audio.") and f.endswith(('.aac', '.m4a', '.mp3')):
+                                    produced_path = os.path.join(work_dir, f)
+                                    break
+                        if not produced_path or not os.path.exists(produced_path):
+                            raise Exception("Failed to determine downloaded audio file path for explicit merge.")
+                        return produced_path
+
                     self.ui_queue.put((job.tree_item_id, 'status_update', "Downloading", f"Downloading audio stream for: {job.title}"))
                     logger.info(f"Starting audio stream download for '{job.title}'.")
-                    with yt_dlp.YoutubeDL(ydl_opts_audio) as ydl:
-                        info_dict_audio = ydl.extract_info(job.url, download=True)
-                        audio_file_path = info_dict_audio.get('filepath')
-                        if not audio_file_path:
-                            for f in os.listdir(job.out_dir):
-                                    if f.startswith(os.path.basename(base_outtmpl_no_ext) + "_audio.") and f.endswith(('.aac', '.m4a', '.mp3')):
-                                        audio_file_path = os.path.join(job.out_dir, f)
-                                        break
-                        
-                        if not audio_file_path or not os.path.exists(audio_file_path):
-                            raise Exception("Failed to determine downloaded audio file path for explicit merge.")
-                        job.temp_files.append(audio_file_path)
+                    span = self.tracer.begin(job, "audio")
+                    # Keyed by everything that shapes the file, so another selector or encode never shares it
+                    audio_key = f"{audio_format}:{audio_codec}:{audio_quality}"
+                    audio_file_path = self.stream_cache.fetch(cache_id, audio_key, produce_audio,
+                                                              cancel_event=job.stop_event, on_wait=on_cache_wait)
+                    job.cache_leases.append(audio_file_path)
+                    self.tracer.end(span, bytes=file_size_or_none(audio_file_path))
+                    if not job.audio_total_bytes:
+                        job.audio_total_bytes = job.audio_downloaded_bytes = os.path.getsize(audio_file_path)
                     logger.info(f"Audio stream for '{job.title}' downloaded to: {audio_file_path}")
 
 
-                    if job.stop_event.is_set():
+                    if job.stop_requested():
                         job.status = "Paused"
                         self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Download {job.title} paused during audio download."))
                         logger.info(f"Download for '{job.title}' paused during audio download.")
@@ -1065,34 +2004,23 @@ class YTDownloaderApp(ttk.Window):
                     self.ui_queue.put((job.tree_item_id, 'status_update', "Processing", f"Merging video and audio for: {job.title}"))
                     logger.info(f"Starting merge process for '{job.title}' (Video: {video_file_path}, Audio: {audio_file_path}) to {final_mp4_path}.")
 
+                    merge_span = self.tracer.begin(job, "merge")
+                    embed_subs = sub_fetcher.written() if job.embed_subs else {}
                     # Add thumbnail if available
-                    if thumbnail_path:
+                    if thumbnail_jpeg:
                         try:
-                            # Convert thumbnail to JPEG properly
-                            jpeg_thumb = thumbnail_path.replace('.webp', '.jpg')
-                            convert_cmd = [
-                                ffmpeg_path,
-                                "-i", thumbnail_path,
-                                "-vcodec", "mjpeg",
-                                "-q:v", "2",
-                                "-y",
-                                jpeg_thumb
-                            ]
-                            logger.info(f"Converting thumbnail to JPEG: {' '.join(convert_cmd)}")
-                            convert_result = subprocess.run(convert_cmd, capture_output=True, text=True,creationflags=subprocess.CREATE_NO_WINDOW)
-                            if convert_result.returncode != 0:
-                                logger.error(f"Thumbnail conversion error: {convert_result.stderr}")
-                                raise Exception("Failed to convert thumbnail")
-                            
-                            # Merge video, audio and add thumbnail
+                            # Merge video, audio, thumbnail and subtitles
+                            sub_inputs, sub_outputs = subtitle_mux_args(embed_subs, 3, "mp4")
                             ffmpeg_cmd = [
                                 ffmpeg_path,
                                 "-i", video_file_path,
                                 "-i", audio_file_path,
-                                "-i", jpeg_thumb,
+                                "-f", "image2pipe", "-i", "pipe:0",
+                                *sub_inputs,
                                 "-map", "0:v",
                                 "-map", "1:a",
                                 "-map", "2",
+                                *sub_outputs,
                                 "-c:v", "copy",
                                 "-c:a", "aac",
                                 "-b:a", "320k",
@@ -1101,18 +2029,16 @@ class YTDownloaderApp(ttk.Window):
                                 final_mp4_path
                             ]
                             logger.info(f"Running FFmpeg command: {' '.join(ffmpeg_cmd)}")
-                            result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True,creationflags=subprocess.CREATE_NO_WINDOW)
+                            result = subprocess.run(ffmpeg_cmd, input=thumbnail_jpeg, capture_output=True, creationflags=NO_WINDOW_FLAGS)
                             if result.returncode != 0:
-                                logger.error(f"FFmpeg error: {result.stderr}")
-                                raise Exception(f"FFmpeg failed with error: {result.stderr}")
-                            
-                            # Clean up JPEG thumbnail
-                            if os.path.exists(jpeg_thumb):
-                                os.remove(jpeg_thumb)
-                            
+                                stderr = result.stderr.decode(errors='replace')
+                                logger.error(f"FFmpeg error: {stderr}")
+                                raise Exception(f"FFmpeg failed with error: {stderr}")
+
                         except Exception as e:
                             logger.error(f"Error during FFmpeg processing: {str(e)}")
-                            # Fallback to simple merge without thumbnail
+                            # Fallback to simple merge without thumbnail; subtitles stay beside the file
+                            embed_subs = {}
                             ffmpeg_cmd = [
                                 ffmpeg_path,
                                 "-i", video_file_path,
@@ -1124,38 +2050,42 @@ class YTDownloaderApp(ttk.Window):
                                 final_mp4_path
                             ]
                             logger.info("Falling back to simple merge without thumbnail")
-                            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,creationflags=subprocess.CREATE_NO_WINDOW)
+                            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,creationflags=NO_WINDOW_FLAGS)
                     else:
+                        sub_inputs, sub_outputs = subtitle_mux_args(embed_subs, 2, "mp4")
                         ffmpeg_cmd = [
                             ffmpeg_path,
                             "-i", video_file_path,
                             "-i", audio_file_path,
+                            *sub_inputs,
+                            "-map", "0:v",
+                            "-map", "1:a",
+                            *sub_outputs,
                             "-c:v", "copy",
                             "-c:a", "aac",
                             "-b:a", "320k",
                             "-y",
                             final_mp4_path
                         ]
-                        subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,creationflags=subprocess.CREATE_NO_WINDOW)
+                        subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,creationflags=NO_WINDOW_FLAGS)
+                    self.tracer.end(merge_span, bytes=file_size_or_none(final_mp4_path))
+                    for sub_path in embed_subs.values():
+                        try:
+                            os.remove(sub_path)
+                        except OSError as e:
+                            # The video is done; a leftover subtitle file isn't worth failing the job over
+                            logger.warning(f"Could not remove embedded subtitle file {sub_path}: {e}")
 
+                    span = self.tracer.begin(job, "cleanup")
                     for temp_f in job.temp_files:
                         if os.path.exists(temp_f):
                             os.remove(temp_f)
                             logger.debug(f"Cleaned up temp file: {temp_f}")
                     job.temp_files.clear()
-
-                    # Clean up thumbnail if it exists
-                    if thumbnail_path and os.path.exists(thumbnail_path):
-                        try:
-                            os.remove(thumbnail_path)
-                            logger.debug(f"Cleaned up thumbnail file: {thumbnail_path}")
-                        except Exception as e:
-                            logger.error(f"Error cleaning up thumbnail file {thumbnail_path}: {e}")
+                    self.tracer.end(span)
 
                     job.status = "Completed"
                     job.progress = 100
-                    job.eta = "Done"
-                    job.speed = "Done"
                     self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Completed download: {job.title}"))
                     logger.info(f"Download and merge completed for '{job.title}'. Final file: {final_mp4_path}")
 
@@ -1163,41 +2093,59 @@ class YTDownloaderApp(ttk.Window):
                     job.current_phase = "combined_video_audio"
                     final_path = generate_unique_filename(os.path.join(job.out_dir, f"{sanitize_filename(job.title)}.{job.format_info.get('ext', 'mp4')}"))
                     ydl_opts_combined = {**ydl_opts, 'format': job.format_info['format_id'], 'outtmpl': final_path}
+                    if job.format_info.get('is_format_selector'):
+                        # Selector formats may pick separate streams; let yt-dlp merge them into the target container
+                        ydl_opts_combined['merge_output_format'] = job.format_info.get('ext', 'mp4')
 
                     self.ui_queue.put((job.tree_item_id, 'status_update', "Downloading", f"Downloading video (combined) for: {job.title}"))
                     logger.info(f"Starting combined video/audio download for '{job.title}' (Format ID: {job.format_info['format_id']}).")
-                    with yt_dlp.YoutubeDL(ydl_opts_combined) as ydl:
-                        ydl.download([job.url])
+                    span = self.tracer.begin(job, "download")
+                    with SESSIONS.session(ydl_opts_combined, job.url) as ydl:
+                        sub_fetcher.attach(ydl)
+                        self._extract_for_download(ydl, job)
+                    self.tracer.end(span, bytes=file_size_or_none(final_path))
                     
-                    # Apply thumbnail if available - only for MKV output
-                    if thumbnail_path and os.path.exists(thumbnail_path):
+                    # Apply thumbnail and subtitles in one remux, keeping the container
+                    root, container = os.path.splitext(final_path)
+                    container = container.lstrip('.').lower()
+                    cover = thumbnail_jpeg if container != 'webm' else None  # webm can't carry a JPEG cover
+                    embed_subs = sub_fetcher.written() if job.embed_subs else {}
+                    if (cover or embed_subs) and os.path.exists(final_path):
+                        span = self.tracer.begin(job, "apply_thumbnail")
                         try:
-                            temp_output = f"{final_path}.temp"
-                            # Convert to MKV if it's not already
-                            if not final_path.endswith('.mkv'):
-                                final_path = final_path.replace('.mp4', '.mkv')
+                            temp_output = f"{root}.temp.{container}"
+                            sub_inputs, sub_outputs = subtitle_mux_args(embed_subs, 2 if cover else 1, container)
                             ffmpeg_cmd = [
                                ffmpeg_path,
                                 "-i", final_path,
-                                "-i", thumbnail_path,
+                                *(["-f", "image2pipe", "-i", "pipe:0"] if cover else []),
+                                *sub_inputs,
                                 "-map", "0",
-                                "-map", "1",
+                                *(["-map", "1"] if cover else []),
                                 "-c", "copy",
-                                "-disposition:v:1", "attached_pic",
+                                *sub_outputs,
+                                *(["-disposition:v:1", "attached_pic"] if cover else []),
                                 "-y",
                                 temp_output
                             ]
-                            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,creationflags=subprocess.CREATE_NO_WINDOW)
+                            subprocess.run(ffmpeg_cmd, input=cover, check=True, capture_output=True, creationflags=NO_WINDOW_FLAGS)
                             os.replace(temp_output, final_path)
-                            logger.info(f"Applied thumbnail to video for '{job.title}'")
+                            for sub_path in embed_subs.values():
+                                try:
+                                    os.remove(sub_path)
+                                except OSError as e:
+                                    # The video is done; a leftover subtitle file isn't worth failing the job over
+                                    logger.warning(f"Could not remove embedded subtitle file {sub_path}: {e}")
+                            self.tracer.end(span, bytes=file_size_or_none(final_path))
+                            applied = " and ".join(name for name, present in (("thumbnail", cover), ("subtitles", embed_subs)) if present)
+                            logger.info(f"Applied {applied} to video for '{job.title}'")
                         except Exception as e:
-                            logger.error(f"Failed to apply thumbnail to video for '{job.title}': {e}")
+                            self.tracer.end(span, status="error")
+                            logger.error(f"Failed to apply thumbnail/subtitles to video for '{job.title}': {e}")
                     
-                    if not job.stop_event.is_set():
+                    if not job.stop_requested():
                         job.status = "Completed"
                         job.progress = 100
-                        job.eta = "Done"
-                        job.speed = "Done"
                         self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Completed download: {job.title}"))
                         logger.info(f"Combined download completed for '{job.title}'. Final file: {final_path}")
                     else:
@@ -1207,111 +2155,78 @@ class YTDownloaderApp(ttk.Window):
             
             elif job.choice == "audio":
                 job.current_phase = "audio_only"
-                final_mp3_path = generate_unique_filename(os.path.join(job.out_dir, f"{sanitize_filename(job.title)}.mp3"))
-                if job.format_info.get("is_best_audio_option"):
-                    yt_dlp_outtmpl = os.path.splitext(final_mp3_path)[0] + '.%(ext)s'
-                    ydl_opts_audio = {
-                        **ydl_opts,
-                        'format': "bestaudio/best",
-                        'outtmpl': yt_dlp_outtmpl,
-                        'postprocessors': [{
-                            'key': 'FFmpegExtractAudio',
-                            'preferredcodec': 'mp3',
-                            'preferredquality': '320',
-                        }, {
-                            'key': 'FFmpegMetadata',
-                        }],
-                        'keepvideo': False,
-                    }
-                else: 
-                    yt_dlp_outtmpl = os.path.splitext(final_mp3_path)[0] + '.%(ext)s'
-                    ydl_opts_audio = {
-                        **ydl_opts,
-                        'format': job.format_info['format_id'],
-                        'outtmpl': yt_dlp_outtmpl,
-                        'postprocessors': [{
-                            'key': 'FFmpegExtractAudio',
-                            'preferredcodec': 'mp3', 
-                            'preferredquality': '192', 
-                        }, {
-                            'key': 'FFmpegMetadata',
-                        }],
-                        'keepvideo': False,
-                    }
+                passthrough = bool(job.format_info.get("audio_passthrough"))
+                # Download the native stream; tags, cover and any encode happen in one ffmpeg call afterwards
+                ydl_opts_audio = {
+                    **ydl_opts,
+                    'format': job.format_info['format_id'],
+                    'outtmpl': {'default': f"{base_outtmpl_no_ext}.source.%(ext)s",
+                                'subtitle': f"{base_outtmpl_no_ext}.%(ext)s"},
+                }
 
                 self.ui_queue.put((job.tree_item_id, 'status_update', "Downloading", f"Downloading audio: {job.title}"))
                 logger.info(f"Starting audio-only download for '{job.title}'.")
-                with yt_dlp.YoutubeDL(ydl_opts_audio) as ydl:
-                    ydl.download([job.url])
-
-                # Apply thumbnail to MP3 if available
-                if thumbnail_path and os.path.exists(thumbnail_path):
-                    try:
-                        temp_output = f"{final_mp3_path}.temp"
-                        ffmpeg_cmd = [
-                            ffmpeg_path,
-                            "-i", final_mp3_path,
-                            "-i", thumbnail_path,
-                            "-map", "0",
-                            "-map", "1",
-                            "-c", "copy",
-                            "-id3v2_version", "3",
-                            "-metadata:s:v:1", "title=Cover",
-                            "-metadata:s:v:1", "comment=Cover (front)",
-                            "-y",
-                            temp_output
-                        ]
-                        logger.info(f"Running MP3 thumbnail command: {' '.join(ffmpeg_cmd)}")
-                        subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,creationflags=subprocess.CREATE_NO_WINDOW)
-                        os.replace(temp_output, final_mp3_path)
-                        logger.info(f"Applied thumbnail to MP3 for '{job.title}'")
-                    except subprocess.CalledProcessError as e:
-                        logger.error(f"FFmpeg error output: {e.stderr.decode() if e.stderr else 'No error output'}")
-                        raise Exception(f"FFmpeg failed: {str(e)}")
-                    except Exception as e:
-                        logger.error(f"Unexpected error: {str(e)}")
-                        raise
-
-                if not job.stop_event.is_set():
-                    job.status = "Completed"
-                    job.progress = 100
-                    job.eta = "Done"
-                    job.speed = "Done"
-                    self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Completed download: {job.title}"))
-                    logger.info(f"Audio download completed for '{job.title}'. Final file: {final_mp3_path}")
-                else:
+                span = self.tracer.begin(job, "audio_download")
+                with SESSIONS.session(ydl_opts_audio, job.url) as ydl:
+                    sub_fetcher.attach(ydl)
+                    info_dict_audio = self._extract_for_download(ydl, job)
+                    source_path = ((info_dict_audio.get('requested_downloads') or [{}])[0].get('filepath')
+                                   or ydl.prepare_filename(info_dict_audio))
+                job.temp_files.append(source_path)
+                self.tracer.end(span, bytes=file_size_or_none(source_path))
+
+                if job.stop_requested():
                     job.status = "Paused"
                     self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Download {job.title} was interrupted."))
                     logger.info(f"Audio download for '{job.title}' interrupted by user.")
+                    self.save_queue()
+                    return
+
+                source_ext = os.path.splitext(source_path)[1].lstrip('.').lower()
+                target_ext = passthrough_ext(info_dict_audio.get('acodec'), source_ext) if passthrough else "mp3"
+                final_audio_path = generate_unique_filename(f"{base_outtmpl_no_ext}.{target_ext}")
+                cover = thumbnail_jpeg if target_ext in COVER_EXTS else None
+                ffmpeg_cmd = audio_command(
+                    ffmpeg_path, source_path, final_audio_path,
+                    codec=None if passthrough else "libmp3lame",
+                    bitrate="320k" if job.format_info.get("is_best_audio_option") else "192k",
+                    cover=bool(cover), metadata=audio_metadata(info_dict_audio, job.title))
+                logger.info(f"Running audio {'remux' if passthrough else 'encode'} command: {' '.join(ffmpeg_cmd)}")
+                if passthrough:
+                    # Stream copy is I/O-bound and quick, so it runs here instead of queueing behind encodes
+                    span = self.tracer.begin(job, "remux")
+                    subprocess.run(ffmpeg_cmd, input=cover, check=True, capture_output=True, creationflags=NO_WINDOW_FLAGS)
+                else:
+                    job.current_phase = "transcode"
+                    queued = self.transcoder.stats()['queued']
+                    self.ui_queue.put((job.tree_item_id, 'status_update', "Processing",
+                                       f"Encoding MP3 for: {job.title}" + (f" ({queued} ahead)" if queued else "")))
+                    span = self.tracer.begin(job, "transcode")
+                    self.transcoder.run(ffmpeg_cmd, input=cover, audio_seconds=info_dict_audio.get('duration'),
+                                        codec="mp3", cancel_event=job.stop_event)
+                self.tracer.end(span, bytes=file_size_or_none(final_audio_path))
+                os.remove(source_path)
+                job.temp_files.remove(source_path)
+
+                job.status = "Completed"
+                job.progress = 100
+                self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Completed download: {job.title}"))
+                logger.info(f"Audio download completed for '{job.title}'. Final file: {final_audio_path}")
             
-            if job.sub_lang != "None" and not job.stop_event.is_set():
-                sub_outtmpl = f"{base_outtmpl_no_ext}.{job.sub_lang}.%(ext)s"
-                ydl_opts_subs = {
-                    'writesubtitles': True,
-                    'writeautomaticsub': True,
-                    'subtitleslangs': [job.sub_lang],
-                    'skip_download': True,
-                    'outtmpl': sub_outtmpl,
-                    'quiet': True,
-                    'no_warnings': True,
-                    'noplaylist': True,
-                }
-                self.ui_queue.put((job.tree_item_id, 'status_update', "Downloading Subtitles", f"Downloading subtitles for: {job.title} ({job.sub_lang})"))
-                logger.info(f"Attempting to download subtitles for '{job.title}' in language: {job.sub_lang}.")
-                try:
-                    with yt_dlp.YoutubeDL(ydl_opts_subs) as ydl:
-                        ydl.download([job.url])
-                    self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Subtitles downloaded for: {job.title}"))
-                    logger.info(f"Subtitles downloaded for '{job.title}' ({job.sub_lang}).")
-                except Exception as e:
-                    self.ui_queue.put((job.tree_item_id, 'warning', f"Could not download subtitles for {job.title}: {e}"))
-                    logger.warning(f"Could not download subtitles for '{job.title}' ({job.sub_lang}): {e}")
+            if sub_fetcher.langs:
+                written = sub_fetcher.written()
+                logger.info(f"Subtitles for '{job.title}': {', '.join(written) or 'none'} "
+                            f"(requested {', '.join(sub_fetcher.langs)})")
         
         except yt_dlp.utils.DownloadError as e:
-            if job.stop_event.is_set():
+            if job.stop_requested():
                 job.status = "Paused"
                 self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Paused download: {job.title}"))
                 logger.info(f"Download '{job.title}' paused due to yt-dlp error during interruption.")
+            elif is_out_of_space(e):
+                self._wait_for_disk_space(job, f"Disk full, paused: {job.title}")
+            elif self._schedule_retry(job, e):
+                pass
             else:
                 job.status = "Error"
                 error_detail = str(e)
@@ -1324,6 +2239,8 @@ class YTDownloaderApp(ttk.Window):
                 logger.error(f"DownloadError for '{job.title}': {error_detail}")
                 
                 # Clean up any downloaded files on error
+                self.tracer.end_job(job, "error")
+                span = self.tracer.begin(job, "cleanup")
                 try:
                     # Clean up temp files
                     for temp_f in job.temp_files:
@@ -1361,15 +2278,35 @@ class YTDownloaderApp(ttk.Window):
                                 except Exception as e_clean:
                                     logger.error(f"Error cleaning up partial download file {file_path}: {e_clean}")
                 except Exception as cleanup_error:
+                    self.tracer.end(span, status="error")
                     logger.error(f"Error during cleanup of failed download files: {cleanup_error}")
+                self.tracer.end(span)
+
+        except CacheWaitCancelled:
+            job.status = "Paused"
+            self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Paused download: {job.title}"))
+            logger.info(f"Download '{job.title}' paused while waiting for a shared stream.")
+
+        except TranscodeCancelled:
+            job.status = "Paused"
+            self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Paused download: {job.title}"))
+            logger.info(f"Download '{job.title}' paused while encoding.")
 
         except Exception as e:
+            if is_out_of_space(e):
+                # Partial files stay so the download resumes where it stopped
+                self._wait_for_disk_space(job, f"Disk full, paused: {job.title}")
+                return
+            if self._schedule_retry(job, e):
+                return
             job.status = "Error"
             self.ui_queue.put((job.tree_item_id, 'error', f"An unexpected error occurred downloading {job.title}:\n{e}"))
             self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Error on download: {job.title}"))
             logger.exception(f"An unexpected error occurred in download_worker for '{job.title}'.") # Log full traceback
             
             # Clean up any downloaded files on error
+            self.tracer.end_job(job, "error")
+            span = self.tracer.begin(job, "cleanup")
             try:
                 # Clean up temp files
                 for temp_f in job.temp_files:
@@ -1407,115 +2344,168 @@ class YTDownloaderApp(ttk.Window):
                             except Exception as e_clean:
                                 logger.error(f"Error cleaning up partial download file {file_path}: {e_clean}")
             except Exception as cleanup_error:
+                self.tracer.end(span, status="error")
                 logger.error(f"Error during cleanup of failed download files: {cleanup_error}")
+            self.tracer.end(span)
         finally:
+            self.tracer.end_job(job, job.status.lower())
+            METRICS.job_finished(job)
+            job.release_thread()
+            self.disk_space.release(job)
+            self.storage.release(job)
+            self.info_refresher.discard(job)
+            for cached_path in job.cache_leases:
+                self.stream_cache.release(cached_path)
+            job.cache_leases.clear()
             self.save_queue()
+            self.ui_queue.put((None, 'dispatch'))
             logger.info(f"Download worker for '{job.title}' finished.")
 
+    def _extract_for_download(self, ydl, job: DownloadJob):
+        # Refreshed info is unprocessed, so format selection and post-processing still follow this ydl's options
+        info = self.info_refresher.get(job)
+        if info is None:
+            return ydl.extract_info(job.url, download=True)
+        logger.debug(f"Using refreshed info for '{job.title}'")
+        return ydl.process_ie_result(info, download=True)
+
+    def _schedule_retry(self, job: DownloadJob, error):
+        # Partial files stay: the retry resumes .part files and stream cache work dirs, and extracts fresh stream URLs
+        kind = classify_error(error, ffmpeg_path)
+        policy = RETRY_POLICIES[kind]
+        attempt = job.retries.get(kind, 0)
+        if attempt >= policy.attempts:
+            if policy.attempts:
+                logger.warning(f"Giving up on '{job.title}' after {attempt} {kind} retries.")
+            return False
+        job.retries[kind] = attempt + 1
+        delay = policy.delay(attempt)
+        job.retry_at = time.monotonic() + delay
+        job.status = "Retrying"
+        self.ui_queue.put((job.tree_item_id, 'status_update', job.status,
+                           f"{kind.capitalize()} error, retry {attempt + 1}/{policy.attempts} in {delay:.0f}s: {job.title}"))
+        logger.warning(f"Retrying '{job.title}' in {delay:.1f}s ({kind} error, retry {attempt + 1}/{policy.attempts}): {error}")
+        timer = threading.Timer(delay, self.ui_queue.put, args=((None, 'dispatch'),))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _disk_space_needs(self, job: DownloadJob, out_dir=None):
+        return estimate_job_bytes(job.choice, job.format_info, out_dir or job.out_dir, self.stream_cache.cache_dir)
+
+    def _wait_for_disk_space(self, job: DownloadJob, message):
+        # Paused jobs on this list are restarted by _dispatch_queued_jobs once they fit
+        job.status = "Paused"
+        # A job not yet placed on an output root may resume on whichever root has room first
+        needs = self.storage.placements(job, lambda out_dir: self._disk_space_needs(job, out_dir))
+        self.disk_space.wait_for_space(job, *needs)
+        self.ui_queue.put((job.tree_item_id, 'status_update', job.status, message))
+        logger.warning(message)
+
+    def _watch_disk_space(self):
+        while True:
+            time.sleep(DISK_CHECK_INTERVAL)
+            try:
+                for job, directory, free in self.disk_space.low_space_jobs():
+                    if job.status not in ("Downloading", "Processing") or job.stop_requested():
+                        continue
+                    job.status = "Pausing..."
+                    self.disk_space.wait_for_space(job, self._disk_space_needs(job))
+                    self.ui_queue.put((job.tree_item_id, 'status_update', job.status,
+                                       f"Low disk space on {directory} ({format_bytes(free)} free), pausing: {job.title}"))
+                    job.request_stop()
+                    logger.warning(f"Pausing '{job.title}': only {format_bytes(free)} free on {directory}")
+                if self.disk_space.waiting:
+                    self.ui_queue.put((None, 'dispatch'))
+            except Exception:
+                logger.exception("Disk space check failed.")
+
+    def _watch_download_windows(self):
+        while True:
+            try:
+                self._apply_download_windows()
+            except Exception:
+                logger.exception("Download window check failed.")
+            time.sleep(WINDOW_CHECK_INTERVAL)
+
+    def _apply_download_windows(self):
+        # Jobs the scheduler started are paused when their class's window closes and resumed when it reopens;
+        # jobs the user started by hand (auto_start unset) run regardless
+        changed = self.calendar.update()
+        for priority, is_open in changed.items():
+            logger.info(f"Download window for {priority} jobs {'opened' if is_open else 'closed'}")
+        with self.jobs_lock:
+            outside = [j for j in self.jobs if j.auto_start and j.status == "Downloading" and not j.stop_requested()
+                       and not self.calendar.is_open(j.priority)]
+        for job in outside:
+            job.status = "Pausing..."
+            self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Outside download window, pausing: {job.title}"))
+            self.scheduler.hold(job)
+            logger.info(f"Pausing '{job.title}': outside the download window for {job.priority} jobs")
+        if any(changed.values()):
+            self.ui_queue.put((None, 'dispatch'))
+
 
     def ytdl_hook(self, d, job: DownloadJob):
-        if job.stop_event.is_set():
+        # Called for every yt-dlp progress tick: only store numbers here, formatting happens at render time
+        if job.stop_requested():
             logger.info(f"yt-dlp hook: Stop event detected for '{job.title}'. Raising DownloadError.")
             raise yt_dlp.utils.DownloadError("Download stopped by user.")
 
-        current_time = time.time()
-        
-        job.eta = self._strip_ansi_codes(d.get('_eta_str', "N/A"))
-        job.speed = self._strip_ansi_codes(d.get('_speed_str', "0 B/s"))
-
-        if d['status'] == 'downloading':
-            downloaded_bytes = d.get('downloaded_bytes', 0)
+        METRICS.record_progress(job, d)
+        status = d['status']
+        if status == 'downloading':
+            downloaded_bytes = d.get('downloaded_bytes') or 0
             total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            job.speed_bps = d.get('speed')
+            job.eta_seconds = d.get('eta')
+            tmpfilename = d.get('tmpfilename')
+            if tmpfilename and tmpfilename != job.preallocated and d.get('total_bytes'):
+                # Exact sizes only: an estimate would leave allocated blocks past the end of the file
+                job.preallocated = tmpfilename
+                self.disk_space.preallocate(tmpfilename, d['total_bytes'])
+            previous = job.video_downloaded_bytes if job.current_phase == "video" else job.audio_downloaded_bytes
+            if previous:
+                # Skipping a file's first tick keeps bytes resumed from a .part file out of the bandwidth cap
+                self.calendar.throttle(job.priority, downloaded_bytes - previous, job.stop_requested)
+        elif status == 'finished':
+            downloaded_bytes = total_bytes = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            job.speed_bps = None
+            job.eta_seconds = None
+            logger.debug(f"{job.current_phase} download finished for '{job.title}'. Total bytes: {total_bytes}")
+        else:
+            return
 
-            if job.current_phase == "video":
-                job.video_downloaded_bytes = downloaded_bytes
-                if total_bytes > 0:
-                    job.video_total_bytes = total_bytes
-            elif job.current_phase == "audio":
-                job.audio_downloaded_bytes = downloaded_bytes
-                if total_bytes > 0:
-                    job.audio_total_bytes = total_bytes
-            elif job.current_phase == "audio_only" or job.current_phase == "combined_video_audio":
-                job.audio_downloaded_bytes = downloaded_bytes # Using audio_downloaded_bytes for simplicity
-                if total_bytes > 0:
-                    job.audio_total_bytes = total_bytes
-                job.video_downloaded_bytes = 0 # Not applicable for these phases
-                job.video_total_bytes = 0 # Not applicable for these phases
-
-            total_downloaded = job.video_downloaded_bytes + job.audio_downloaded_bytes
-            total_expected_size = job.video_total_bytes + job.audio_total_bytes
-
-            if total_expected_size > 0:
-                job.progress = (total_downloaded / total_expected_size) * 100
-                job.current_size = f"{total_downloaded / (1024*1024):.2f} MB"
-                job.total_size = f"{total_expected_size / (1024*1024):.2f} MB"
-            else:
-                job.progress = min(job.progress + (downloaded_bytes / (1024*1024) / 100.0), 99.9) # Small increment if size unknown
-                job.current_size = f"{downloaded_bytes / (1024*1024):.2f} MB" if downloaded_bytes else "0 MB"
-                job.total_size = "Unknown"
-            
-            active_downloads = sum(1 for j in self.jobs if j.status == "Downloading")
-            if active_downloads <= 1:
-                update_interval = self.min_update_interval
-            elif active_downloads <= 3:
-                update_interval = self.min_update_interval * 1.5
-            elif active_downloads <= 5:
-                update_interval = self.min_update_interval * 2
-            else:
-                update_interval = self.max_update_interval
-            
-            if current_time - job.last_ui_update_time > update_interval:
-                self.ui_queue.put((job.tree_item_id, 'progress'))
-                job.last_ui_update_time = current_time
-
-        elif d['status'] == 'finished':
-            if job.current_phase == "video":
-                job.video_total_bytes = d.get('total_bytes') or d.get('downloaded_bytes', 0)
-                job.video_downloaded_bytes = job.video_total_bytes
-                logger.debug(f"Video download finished for '{job.title}'. Total bytes: {job.video_total_bytes}")
-            elif job.current_phase == "audio":
-                job.audio_total_bytes = d.get('total_bytes') or d.get('downloaded_bytes', 0)
-                job.audio_downloaded_bytes = job.audio_total_bytes
-                logger.debug(f"Audio download finished for '{job.title}'. Total bytes: {job.audio_total_bytes}")
-            elif job.current_phase == "audio_only" or job.current_phase == "combined_video_audio":
-                job.audio_total_bytes = d.get('total_bytes') or d.get('downloaded_bytes', 0)
-                job.audio_downloaded_bytes = job.audio_total_bytes
-                logger.debug(f"Audio-only/Combined download finished for '{job.title}'. Total bytes: {job.audio_total_bytes}")
-
-            total_downloaded = job.video_downloaded_bytes + job.audio_downloaded_bytes
-            total_expected_size = job.video_total_bytes + job.audio_total_bytes
-            if total_expected_size > 0:
-                job.progress = (total_downloaded / total_expected_size) * 100
-                job.current_size = f"{total_downloaded / (1024*1024):.2f} MB"
-                job.total_size = f"{total_expected_size / (1024*1024):.2f} MB"
-            
-            self.ui_queue.put((job.tree_item_id, 'progress'))
+        phase = job.current_phase
+        if phase == "video":
+            job.video_downloaded_bytes = downloaded_bytes
+            if total_bytes:
+                job.video_total_bytes = total_bytes
+        elif phase == "audio":
+            job.audio_downloaded_bytes = downloaded_bytes
+            if total_bytes:
+                job.audio_total_bytes = total_bytes
+        else:
+            # audio_only / combined_video_audio track everything in the audio counters
+            job.audio_downloaded_bytes = downloaded_bytes
+            if total_bytes:
+                job.audio_total_bytes = total_bytes
+            job.video_downloaded_bytes = 0
+            job.video_total_bytes = 0
+
+        job.downloaded_bytes = job.video_downloaded_bytes + job.audio_downloaded_bytes
+        job.total_bytes = job.video_total_bytes + job.audio_total_bytes
+        if job.total_bytes:
+            job.progress = job.downloaded_bytes / job.total_bytes * 100
+        elif status == 'downloading':
+            job.progress = min(job.progress + downloaded_bytes / 104857600.0, 99.9)  # Small increment if size unknown
 
+        current_time = time.time()
+        if status == 'finished' or current_time - job.last_ui_update_time > progress_update_interval(
+                METRICS.jobs.value(status="downloading"), self.min_update_interval, self.max_update_interval):
+            self.ui_queue.put((job.tree_item_id, 'progress'))
+            job.last_ui_update_time = current_time
 
-        if job.status == "Queued":
-            job.eta = "N/A"
-            job.speed = "N/A"
-            job.current_size = "0 MB"
-            job.total_size = "Unknown"
-        elif job.status == "Paused":
-            job.eta = "Paused"
-            job.speed = "Paused"
-        elif job.status == "Pausing...":
-            job.eta = "Pausing..."
-            job.speed = "Pausing..."
-        elif job.status == "Processing":
-            job.eta = "Processing..."
-            job.speed = "N/A"
-            if job.progress < 100:
-                job.progress = 99.9
-        elif job.status == "Completed":
-            job.eta = "Done"
-            job.speed = "Done"
-            job.progress = 100
-        elif job.status == "Error":
-            job.eta = "Error"
-            job.speed = "Error"
-            
     def on_job_select(self, event):
         selected_items = self.jobs_tree.selection()
         if not selected_items:
@@ -1535,8 +2525,7 @@ class YTDownloaderApp(ttk.Window):
             return
 
         self.progress_var.set(job.progress)
-        display_eta = self._strip_ansi_codes(job.eta)
-        display_speed = self._strip_ansi_codes(job.speed)
+        display_eta, _, display_speed = job_display_values(job)
 
         if job.status == "Downloading":
             status_text = f"Downloading: {job.title} - {job.progress:.1f}% ({display_speed}, ETA: {display_eta})"
@@ -1562,9 +2551,9 @@ class YTDownloaderApp(ttk.Window):
 
         self.cancel_btn['state'] = 'normal'
         
-        self.restart_btn['state'] = 'normal' if job.status in ("Queued", "Paused", "Canceled", "Error", "Completed") else 'disabled'
+        self.restart_btn['state'] = 'normal' if job.status in ("Queued", "Paused", "Retrying", "Canceled", "Error", "Completed") else 'disabled'
 
-        if job.status in ("Downloading", "Processing"):
+        if job.status in ("Downloading", "Processing", "Retrying"):
             self.pause_btn['text'] = "Pause"
             self.pause_btn['state'] = 'normal'
         elif job.status == "Pausing...":
@@ -1587,11 +2576,17 @@ class YTDownloaderApp(ttk.Window):
         if not job: return
 
         if job.status in ("Downloading", "Processing"):
-            job.stop_event.set()
+            job.request_stop()
             job.status = "Pausing..."
             self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Pausing: {job.title}"))
             logger.info(f"User requested pause for '{job.title}'. Signaling stop event.")
+        elif job.status == "Retrying":
+            job.status = "Paused"
+            self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Paused download: {job.title}"))
+            logger.info(f"User paused '{job.title}' while it waited to retry.")
         elif job.status == "Paused":
+            # Resumed by hand: outside the scheduler's control, so download windows don't apply
+            job.auto_start = False
             self.start_download_job(job, select_in_ui=True)
             logger.info(f"User requested resume for '{job.title}'. Restarting download.")
         self.on_job_select(None)
@@ -1608,11 +2603,10 @@ class YTDownloaderApp(ttk.Window):
 
         if messagebox.askyesno("Confirm Cancel", f"Are you sure you want to cancel and remove '{job.title}'?"):
             logger.info(f"User confirmed cancellation for '{job.title}'.")
-            if job.thread and job.thread.is_alive():
-                job.stop_event.set()
+            if job.is_active():
+                job.request_stop()
                 logger.debug(f"Signaling stop for thread of '{job.title}'.")
-                job.thread.join(timeout=3) # Wait for thread to finish
-                if job.thread.is_alive():
+                if not job.join(timeout=3): # Wait for thread to finish
                     logger.warning(f"Thread for '{job.title}' did not terminate gracefully within timeout.")
             
             # Clean up temp files
@@ -1707,6 +2701,7 @@ class YTDownloaderApp(ttk.Window):
             with self.jobs_lock:
                 if job in self.jobs:
                     self.jobs.remove(job)
+                    job.status = "Removed"
                     self.jobs_tree.delete(job.tree_item_id)
                     logger.info(f"Job '{job.title}' removed from queue.")
 
@@ -1724,11 +2719,10 @@ class YTDownloaderApp(ttk.Window):
         if not job: return
 
         logger.info(f"User requested restart for '{job.title}'.")
-        if job.thread and job.thread.is_alive():
-            job.stop_event.set()
+        if job.is_active():
+            job.request_stop()
             logger.debug(f"Signaling stop for thread of '{job.title}' before restart.")
-            job.thread.join(timeout=3)
-            if job.thread.is_alive():
+            if not job.join(timeout=3):
                 logger.warning(f"Thread for '{job.title}' did not terminate gracefully before restart.")
         for temp_f in job.temp_files:
             if os.path.exists(temp_f):
@@ -1741,16 +2735,16 @@ class YTDownloaderApp(ttk.Window):
 
         job.status = "Queued"
         job.progress = 0
-        job.eta = "N/A"
-        job.current_size = "0 MB"
-        job.total_size = "Unknown"
-        job.speed = "0 B/s"
-        job.stop_event.clear()
+        job.downloaded_bytes = 0
+        job.total_bytes = 0
+        job.speed_bps = None
+        job.eta_seconds = None
         job.video_downloaded_bytes = 0
         job.audio_downloaded_bytes = 0
         job.video_total_bytes = 0
         job.audio_total_bytes = 0
         job.current_phase = "video"
+        job.storage_root = None  # starting over, so the job may land on another root
 
         self.start_download_job(job, select_in_ui=True)
         self.on_job_select(None)
@@ -1773,8 +2767,8 @@ class YTDownloaderApp(ttk.Window):
                 with self.jobs_lock:
                     # First signal all downloads to stop
                     for job in self.jobs:
-                        if job.thread and job.thread.is_alive():
-                            job.stop_event.set()
+                        if job.is_active():
+                            job.request_stop()
                             logger.debug(f"Signaling stop for '{job.title}' during queue clear.")
                     
                     # Clear the treeview immediately
@@ -1785,9 +2779,8 @@ class YTDownloaderApp(ttk.Window):
                     
                     # Clean up jobs in parallel
                     def cleanup_job(job):
-                        if job.thread and job.thread.is_alive():
-                            job.thread.join(timeout=3)  # Reduced timeout for faster cleanup
-                            if job.thread.is_alive():
+                        if job.is_active():
+                            if not job.join(timeout=3):  # Reduced timeout for faster cleanup
                                 logger.warning(f"Thread for '{job.title}' did not terminate gracefully during queue clear.")
                         
                         # Clean up temp files
@@ -1890,6 +2883,8 @@ class YTDownloaderApp(ttk.Window):
                             thread.join(timeout=3)
                     
                     # Clear the jobs list
+                    for job in self.jobs:
+                        job.status = "Removed"
                     self.jobs.clear()
                 
                 # Update UI after cleanup
@@ -1932,6 +2927,7 @@ class YTDownloaderApp(ttk.Window):
                             except Exception as e:
                                 logger.error(f"Error cleaning up temp file {temp_f} for removed job: {e}")
                     job.temp_files.clear()
+                    job.status = "Removed"
                     removed_count += 1
                 else:
                     jobs_to_keep.append(job)
@@ -1948,22 +2944,18 @@ class YTDownloaderApp(ttk.Window):
 
 
     def save_queue(self):
+        if self.queue_loading:
+            self.queue_changed_while_loading = True
+            return
         serializable_jobs = []
         with self.jobs_lock:
             for job in self.jobs:
                 if job.status not in ("Downloading", "Processing", "Pausing..."):
-                    serializable_jobs.append({
-                        'url': job.url,
-                        'choice': job.choice,
-                        'format_info': job.format_info,
-                        'sub_lang': job.sub_lang,
-                        'out_dir': job.out_dir,
-                        'title': job.title,
-                        'status': job.status,
-                    })
+                    serializable_jobs.append(job.to_record())
         try:
             with open(QUEUE_FILE, 'w') as f:
-                json.dump(serializable_jobs, f, indent=4)
+                # One line per job keeps the file small for big queues and still diffable
+                f.write("[\n" + ",\n".join(json.dumps(record) for record in serializable_jobs) + "\n]\n")
             logger.info(f"Queue saved to {QUEUE_FILE} ({len(serializable_jobs)} jobs).")
         except Exception as e:
             logger.error(f"Error saving queue to {QUEUE_FILE}: {e}")
@@ -1972,77 +2964,86 @@ class YTDownloaderApp(ttk.Window):
         if not os.path.exists(QUEUE_FILE):
             logger.info(f"No queue file found at {QUEUE_FILE}.")
             return
-
+        # Jobs stream in from a background thread so the window shows up right away;
+        # saving is held off until the whole file is in memory so a partial list never overwrites it
+        self.queue_loading = True
+        threading.Thread(target=self._load_queue_worker, daemon=True).start()
+
+    def _load_queue_worker(self):
+        changed = False
+        loaded = 0
+        error = None
+        completed_jobs = []
         try:
-            with open(QUEUE_FILE, 'r') as f:
-                loaded_jobs_data = json.load(f)
-            
-            jobs_to_keep = []
-            with self.jobs_lock:
-                for job_data in loaded_jobs_data:
-                    expected_file_path_base = None
-                    if job_data['status'] == "Completed":
-                        sanitized_title = sanitize_filename(job_data['title'])
-                        if job_data['choice'] == "video":
-                            expected_file_path_base = os.path.join(job_data['out_dir'], f"{sanitized_title}.mp4")
-                        elif job_data['choice'] == "audio":
-                            expected_file_path_base = os.path.join(job_data['out_dir'], f"{sanitized_title}.mp3")
-
-                        file_found = False
-                        if expected_file_path_base:
-                            base_name_without_ext, ext = os.path.splitext(expected_file_path_base)
-                            parent_dir = os.path.dirname(expected_file_path_base)
-                            
-                            if os.path.exists(expected_file_path_base):
-                                file_found = True
-                            else:
-                                expected_filename_prefix = os.path.basename(base_name_without_ext) + "("
-                                if os.path.isdir(parent_dir): # Ensure directory exists before listing
-                                    for filename in os.listdir(parent_dir):
-                                        if filename.startswith(expected_filename_prefix) and filename.endswith(ext):
-                                            file_found = True
-                                            break
-                                if not file_found and os.path.exists(os.path.join(parent_dir, os.path.basename(base_name_without_ext) + ext)):
-                                    file_found = True
-
-                        if job_data['status'] == "Completed" and not file_found:
-                            logger.warning(f"Completed download '{job_data['title']}' not found at expected location '{expected_file_path_base}'. Removing from queue.")
-                            continue 
-                        elif job_data['status'] == "Completed" and file_found:
-                            logger.info(f"Completed download '{job_data['title']}' found on disk.")
-                    
-                    job = DownloadJob(
-                        url=job_data['url'],
-                        choice=job_data['choice'],
-                        format_info=job_data['format_info'],
-                        sub_lang=job_data['sub_lang'],
-                        out_dir=job_data['out_dir'],
-                        title=job_data['title'],
-                        status=job_data['status']
-                    )
-
-                    size_bytes = job.format_info.get('filesize') or job.format_info.get('filesize_approx')
-                    if size_bytes:
-                        job.total_size = f"{size_bytes / (1024*1024):.2f} MB"
-                        if job.status == "Completed":
-                            job.current_size = job.total_size
-                            job.progress = 100.0 # Set progress to 100% if completed
-
-
-                    jobs_to_keep.append(job)
-                    job.tree_item_id = self.jobs_tree.insert('', 'end',
-                                                             values=(job.title, job.status, f"{job.progress:.1f}%"))
-                    self.ui_queue.put((job.tree_item_id, 'status_update', job.status, f"Loaded from queue: {job.title}"))
-            
-            self.jobs = jobs_to_keep # Update the jobs list with the filtered jobs
-            logger.info(f"Queue loaded from {QUEUE_FILE} ({len(self.jobs)} active jobs after validation).")
-            self.save_queue() # Resave the queue to reflect any removals
+            batch = []
+            for record in iter_queue_records(QUEUE_FILE):
+                job = DownloadJob.from_record(record)
+                if job.format_info != record['format_info']:
+                    changed = True  # Older files carry the full yt-dlp format dict
+                size_bytes = job.format_info.get('filesize')
+                if size_bytes:
+                    job.total_bytes = size_bytes
+                    if job.status == "Completed":
+                        job.downloaded_bytes = size_bytes
+                if job.status == "Completed":
+                    job.progress = 100.0
+                    completed_jobs.append(job)
+                batch.append(job)
+                if len(batch) >= QUEUE_LOAD_BATCH:
+                    self.ui_queue.put((None, 'load_jobs', batch))
+                    loaded += len(batch)
+                    batch = []
+            if batch:
+                self.ui_queue.put((None, 'load_jobs', batch))
+                loaded += len(batch)
+
+            # Completed files are checked after every job is visible, a batch at a time
+            missing = []
+            for job in completed_jobs:
+                if not completed_file_exists(job):
+                    logger.warning(f"Completed download '{job.title}' not found in '{job.out_dir}'. Removing from queue.")
+                    missing.append(job)
+                    if len(missing) >= QUEUE_LOAD_BATCH:
+                        self.ui_queue.put((None, 'remove_jobs', missing))
+                        missing = []
+            if missing:
+                self.ui_queue.put((None, 'remove_jobs', missing))
         except json.JSONDecodeError as e:
-            messagebox.showerror("Error Loading Queue", f"Could not parse queue file. It might be corrupted. Error: {e}")
+            error = f"Could not parse queue file. It might be corrupted. Error: {e}"
             logger.exception(f"Error loading queue from {QUEUE_FILE}: JSON decode error.")
         except Exception as e:
-            messagebox.showerror("Error Loading Queue", f"An unexpected error occurred while loading queue: {e}")
+            error = f"An unexpected error occurred while loading queue: {e}"
             logger.exception(f"An unexpected error occurred while loading queue from {QUEUE_FILE}.")
+        self.ui_queue.put((None, 'queue_loaded', loaded, changed, error))
+
+    def _insert_loaded_jobs(self, jobs):
+        with self.jobs_lock:
+            for job in jobs:
+                self.jobs.append(job)
+                job.tree_item_id = self.jobs_tree.insert('', 'end', tags=(job.priority,),
+                                                         values=(job.title, job.status, f"{job.progress:.1f}%",
+                                                                 *job_display_values(job)))
+
+    def _remove_missing_jobs(self, jobs):
+        with self.jobs_lock:
+            for job in jobs:
+                # The user may have restarted or removed it in the meantime
+                if job in self.jobs and job.status == "Completed":
+                    self.jobs.remove(job)
+                    job.status = "Removed"
+                    self.jobs_tree.delete(job.tree_item_id)
+                    self.queue_changed_while_loading = True
+
+    def _finish_queue_load(self, loaded, changed, error):
+        self.queue_loading = False
+        if error:
+            messagebox.showerror("Error Loading Queue", error)
+        else:
+            logger.info(f"Queue loaded from {QUEUE_FILE} ({len(self.jobs)} jobs after validation).")
+            self.status_var.set(f"Loaded {loaded} jobs from queue.")
+        if not error and (changed or self.queue_changed_while_loading):
+            self.save_queue()
+        self.queue_changed_while_loading = False
         self.on_job_select(None)
 
     def show_about(self):
@@ -2065,7 +3066,7 @@ class YTDownloaderApp(ttk.Window):
     def on_close(self):
         self.save_queue() # Save queue before closing
 
-        active_jobs = [job for job in self.jobs if job.thread and job.thread.is_alive() and not job.stop_event.is_set()]
+        active_jobs = [job for job in self.jobs if job.is_active() and not job.stop_requested()]
         if active_jobs:
             if not messagebox.askyesno("Exit Application", "There are active downloads. Exiting will stop them and attempt to clean up partial files. Are you sure you want to exit?"):
                 return
@@ -2073,14 +3074,13 @@ class YTDownloaderApp(ttk.Window):
         logger.info("Application closing. Attempting to terminate active downloads.")
         with self.jobs_lock:
             for job in self.jobs:
-                if job.thread and job.thread.is_alive():
-                    job.stop_event.set() # Signal all threads to stop
+                if job.is_active():
+                    job.request_stop() # Signal all threads to stop
                     logger.debug(f"Signaling stop for '{job.title}' on application close.")
             
             for job in self.jobs:
-                if job.thread and job.thread.is_alive():
-                    job.thread.join(timeout=5) # Wait with timeout
-                    if job.thread.is_alive():
+                if job.is_active():
+                    if not job.join(timeout=5): # Wait with timeout
                         logger.warning(f"Thread for '{job.title}' did not terminate gracefully within timeout on exit.")
                     for temp_f in job.temp_files:
                         if os.path.exists(temp_f):
@@ -2092,6 +3092,12 @@ class YTDownloaderApp(ttk.Window):
                     job.temp_files.clear()
         
         logger.info("All active download threads terminated (or timed out). Exiting application.")
+        if self.metrics_server:
+            self.metrics_server.stop()
+        self.info_refresher.shutdown()
+        SESSIONS.close_all()
+        self.transcoder.shutdown()
+        self.watchdog.stop()
         self.quit()  
         self.destroy()  
 
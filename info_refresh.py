@@ -0,0 +1,150 @@
+import copy
+import time
+import logging
+import threading
+from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS, host_of
+from ytdl_sessions import SESSIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INFO_TTL = 30 * 60  # sites that don't say when their stream URLs expire
+REFRESH_MARGIN = 10 * 60  # info must stay valid at least this long to be handed to a download
+HOST_EXTRACT_INTERVAL = 1.0  # seconds between extractions on one host
+EXPIRY_PARAMS = ('expire', 'expires', 'Expires')
+
+
+def stream_expiry(info):
+    """Earliest expiry (epoch seconds) signed into the info's stream URLs, or None when they don't carry one."""
+    expiries = []
+    for f in info.get('formats') or [info]:
+        for url in (f.get('url'), f.get('manifest_url')):
+            if not url:
+                continue
+            parsed = urlparse(url)
+            query = parse_qs(parsed.query)
+            # YouTube manifests carry it as a path segment: .../expire/1700000000/...
+            parts = parsed.path.split('/')
+            values = [(query.get(name) or [''])[0] for name in EXPIRY_PARAMS]
+            values += [value for name, value in zip(parts, parts[1:]) if name == 'expire']
+            expiries.extend(int(value) for value in values if value.isdigit())
+    return min(expiries) if expiries else None
+
+
+class InfoRefresher:
+    """Extracts metadata for the jobs about to start, so they can skip extraction when a slot opens.
+
+    ``refresh(upcoming)`` is called with the next jobs in scheduling order.
+    Jobs without info, or whose stream URLs expire within ``margin`` seconds,
+    are extracted in the background. Each host works through its jobs one at
+    a time on a warm session, at most one extraction per ``host_interval``
+    seconds; up to ``max_hosts`` hosts run in parallel. Info for jobs that
+    are neither upcoming nor running is dropped.
+
+    The info is kept as the extractor returned it, before format selection.
+    ``get(job)`` returns a copy of it while it is still valid, for the worker's
+    ``YoutubeDL.process_ie_result``. ``discard(job)`` drops it when the worker
+    ends, so a retry after an error extracts again.
+    """
+
+    def __init__(self, default_ttl=DEFAULT_INFO_TTL, margin=REFRESH_MARGIN, host_interval=HOST_EXTRACT_INTERVAL,
+                 max_hosts=4):
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self.host_interval = host_interval
+        self.enabled = True
+        self._entries = {}  # job -> (info, expires_at)
+        self._busy_hosts = set()
+        self._last_extract = {}  # host -> time.monotonic() of the last extraction
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_hosts, thread_name_prefix="info-refresh")
+        self.stats = {'refreshed': 0, 'used': 0, 'expired': 0, 'failed': 0}
+
+    def _is_fresh(self, entry, now):
+        return entry is not None and entry[1] - now > self.margin
+
+    def refresh(self, upcoming):
+        if not self.enabled:
+            return
+        now = time.time()
+        keep = set(upcoming)
+        batches = {}
+        with self._lock:
+            for job in [j for j in self._entries if j not in keep and not j.is_active()]:
+                del self._entries[job]
+            for job in upcoming:
+                entry = self._entries.get(job)
+                if self._is_fresh(entry, now):
+                    continue
+                if entry is not None:
+                    self.stats['expired'] += 1
+                host = host_of(job.url)
+                if host not in self._busy_hosts:
+                    batches.setdefault(host, []).append(job)
+            self._busy_hosts.update(batches)
+        for host, jobs in batches.items():
+            self._pool.submit(self._run_batch, host, jobs)
+
+    def _run_batch(self, host, jobs):
+        try:
+            for job in jobs:
+                wait = self._last_extract.get(host, 0) + self.host_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._last_extract[host] = time.monotonic()
+                if job.is_active() or job.status in ("Completed", "Canceled"):
+                    continue
+                self._extract(job)
+        finally:
+            with self._lock:
+                self._busy_hosts.discard(host)
+
+    def _extract(self, job):
+        started = time.perf_counter()
+        try:
+            with SESSIONS.session({'quiet': True, 'no_warnings': True, 'noplaylist': True}, job.url) as ydl:
+                # Unprocessed: the worker picks formats and fills in requested_formats with its own options
+                info = ydl.extract_info(job.url, download=False, process=False)
+        except Exception as e:
+            METRICS.extract_failed(job.url)
+            with self._lock:
+                self.stats['failed'] += 1
+            # The download extracts by itself and reports the error properly
+            logger.debug(f"Background refresh failed for '{job.title}': {e}")
+            return
+        METRICS.observe_extract(job.url, info, time.perf_counter() - started)
+        expires_at = stream_expiry(info) or time.time() + self.default_ttl
+        with self._lock:
+            self._entries[job] = (info, expires_at)
+            self.stats['refreshed'] += 1
+        logger.debug(f"Refreshed info for '{job.title}', valid for {(expires_at - time.time()) / 60:.0f} min")
+
+    def get(self, job):
+        with self._lock:
+            entry = self._entries.get(job)
+            if not self._is_fresh(entry, time.time()):
+                return None
+            info = entry[0]
+        try:
+            info = copy.deepcopy(info)
+        except Exception as e:
+            # Some extractors leave objects in the info that can't be copied; the download extracts by itself then
+            logger.debug(f"Can't reuse refreshed info for '{job.title}': {e}")
+            return None
+        with self._lock:
+            self.stats['used'] += 1
+        return info
+
+    def discard(self, job):
+        with self._lock:
+            self._entries.pop(job, None)
+
+    def pending(self):
+        with self._lock:
+            return bool(self._busy_hosts)
+
+    def shutdown(self):
+        self.enabled = False
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,346 @@
+import os
+import time
+import queue
+import bisect
+import logging
+import threading
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# ffmpeg phases recorded by the tracer (tracing.TraceRecorder) that count as post-processing
+POSTPROCESS_PHASES = ("merge", "apply_thumbnail")
+
+
+@lru_cache(maxsize=1024)
+def host_of(url):
+    host = (urlparse(url).hostname or "unknown").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def total(self):
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are produced by ``callback`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames, callback):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        return [(self.name, key, (), value) for key, value in self.callback().items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key, (("le", _number(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+class EngineMetrics:
+    """Counters for the download engine, rendered in the Prometheus text format.
+
+    Everything is updated incrementally where the event happens (job status
+    transitions, ``ytdl_hook``, finished trace spans, ui_queue put/get), so a
+    scrape never walks the job list.
+    """
+
+    def __init__(self):
+        self.jobs = Gauge("url_downloader_jobs", "Jobs by status.", ("status",))
+        self.transitions = Counter("url_downloader_job_transitions_total", "Job status transitions by new status.", ("status",))
+        self.downloaded_bytes = Counter("url_downloader_downloaded_bytes_total", "Bytes downloaded by host.", ("host",))
+        self.host_speed = CallbackGauge("url_downloader_host_bytes_per_second", "Current download speed by host.",
+                                        ("host",), self._host_speeds)
+        self.total_speed = CallbackGauge("url_downloader_bytes_per_second", "Current aggregate download speed.",
+                                         (), lambda: {(): sum(self._host_speeds().values())})
+        self.extract_seconds = Histogram("url_downloader_extract_seconds", "Metadata extraction latency.", ("extractor",))
+        self.extract_errors = Counter("url_downloader_extract_errors_total", "Failed metadata extractions by host.", ("host",))
+        self.postprocess_seconds = Histogram("url_downloader_postprocess_seconds", "ffmpeg post-processing durations.", ("step",))
+        self.ui_queue_depth = Gauge("url_downloader_ui_queue_depth", "Messages waiting in the UI queue.")
+        self.ui_queue_lag = Histogram("url_downloader_ui_queue_lag_seconds", "Time messages wait in the UI queue.",
+                                      buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+        self.ui_delay = Histogram("url_downloader_ui_delay_seconds", "How late Tk event-loop callbacks ran.", ("source",),
+                                  buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+        self.ui_stalls = Counter("url_downloader_ui_stalls_total", "Times the Tk thread was blocked past the stall threshold.")
+        self.retries = Counter("url_downloader_retries_total", "Retries reported by yt-dlp by host.", ("host",))
+        self.throttled = Counter("url_downloader_http_429_total", "HTTP 429 responses reported by yt-dlp by host.", ("host",))
+        self.ytdl_sessions = Counter("url_downloader_ytdl_sessions_total", "YoutubeDL session pool events.", ("event",))
+        self.disk_written = Counter("url_downloader_disk_written_bytes_total", "Bytes written to disk.", ("source",))
+        self.transcodes = Gauge("url_downloader_transcodes", "Audio encodes waiting for or holding a transcode worker.", ("state",))
+        self.transcode_seconds = Histogram("url_downloader_transcode_seconds", "Audio encode durations.", ("codec",))
+        self.transcoded_audio_seconds = Counter("url_downloader_transcoded_audio_seconds_total",
+                                                "Seconds of audio encoded; divide by encode time for throughput.", ("codec",))
+        self.concurrency_target = Gauge("url_downloader_concurrency_target",
+                                        "Download slots and fragment threads set by the concurrency controller.", ("knob",))
+        self.metrics = [self.jobs, self.transitions, self.downloaded_bytes, self.host_speed, self.total_speed,
+                        self.extract_seconds, self.extract_errors, self.postprocess_seconds, self.ui_queue_depth,
+                        self.ui_queue_lag, self.ui_delay, self.ui_stalls, self.retries, self.throttled,
+                        self.ytdl_sessions, self.disk_written, self.transcodes, self.transcode_seconds,
+                        self.transcoded_audio_seconds, self.concurrency_target]
+
+        self._lock = threading.Lock()
+        self._progress = {}  # id(job) -> [filename, downloaded bytes]
+        self._speeds = {}  # host -> {id(job): bytes/s}
+        self._pp_started = {}  # (thread id, postprocessor) -> start time
+
+    @staticmethod
+    def _status_label(status):
+        return status.lower().rstrip('.') if status else None
+
+    def job_transition(self, old, new):
+        old, new = self._status_label(old), self._status_label(new)
+        if old:
+            self.jobs.inc(-1, status=old)
+        if new:
+            self.jobs.inc(1, status=new)
+            self.transitions.inc(status=new)
+
+    def record_progress(self, job, d):
+        host = host_of(job.url)
+        key = id(job)
+        status = d.get('status')
+        with self._lock:
+            if status == 'downloading':
+                downloaded = d.get('downloaded_bytes') or 0
+                filename = d.get('filename')
+                progress = self._progress.get(key)
+                if progress is None or progress[0] != filename:
+                    progress = self._progress[key] = [filename, 0]
+                delta = downloaded - progress[1]
+                progress[1] = downloaded
+                self._speeds.setdefault(host, {})[key] = d.get('speed') or 0
+            else:
+                delta = 0
+                self._speeds.get(host, {}).pop(key, None)
+        if delta > 0:
+            self.downloaded_bytes.inc(delta, host=host)
+            self.disk_written.inc(delta, source="download")
+
+    def job_finished(self, job):
+        with self._lock:
+            self._progress.pop(id(job), None)
+            self._speeds.get(host_of(job.url), {}).pop(id(job), None)
+
+    def _host_speeds(self):
+        with self._lock:
+            return {(host,): sum(speeds.values()) for host, speeds in self._speeds.items() if speeds}
+
+    def observe_extract(self, url, info, seconds):
+        self.extract_seconds.observe(seconds, extractor=(info or {}).get('extractor_key') or host_of(url))
+
+    def extract_failed(self, url):
+        self.extract_errors.inc(host=host_of(url))
+
+    def observe_span(self, span):
+        if span.phase in POSTPROCESS_PHASES and span.end is not None:
+            self.postprocess_seconds.observe(span.end - span.start, step=span.phase)
+            if span.bytes:
+                self.disk_written.inc(span.bytes, source="postprocess")
+
+    def postprocessor_hook(self, d):
+        key = (threading.get_ident(), d.get('postprocessor'))
+        if d.get('status') == 'started':
+            self._pp_started[key] = time.perf_counter()
+        elif d.get('status') == 'finished':
+            started = self._pp_started.pop(key, None)
+            if started is not None:
+                self.postprocess_seconds.observe(time.perf_counter() - started, step=d.get('postprocessor'))
+            filepath = (d.get('info_dict') or {}).get('filepath')
+            if filepath and os.path.exists(filepath):
+                self.disk_written.inc(os.path.getsize(filepath), source="postprocess")
+
+    def ytdl_logger(self, url):
+        return YtdlLogger(self, host_of(url))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class YtdlLogger:
+    """yt-dlp ``logger`` that counts retries and 429s before handing messages to logging."""
+
+    def __init__(self, metrics, host):
+        self.metrics = metrics
+        self.host = host
+
+    def _scan(self, msg):
+        if "Retrying" in msg:
+            self.metrics.retries.inc(host=self.host)
+        if "HTTP Error 429" in msg or "Too Many Requests" in msg:
+            self.metrics.throttled.inc(host=self.host)
+
+    def debug(self, msg):
+        self._scan(msg)
+
+    def info(self, msg):
+        self._scan(msg)
+
+    def warning(self, msg):
+        self._scan(msg)
+        logger.warning(msg)
+
+    def error(self, msg):
+        self._scan(msg)
+        logger.error(msg)
+
+
+class MeteredQueue(queue.Queue):
+    """queue.Queue that reports its depth and how long each item waited."""
+
+    def __init__(self, metrics, maxsize=0):
+        super().__init__(maxsize)
+        self.metrics = metrics
+
+    def _put(self, item):
+        self.queue.append((time.perf_counter(), item))
+        self.metrics.ui_queue_depth.set(len(self.queue))
+
+    def _get(self):
+        put_at, item = self.queue.popleft()
+        self.metrics.ui_queue_depth.set(len(self.queue))
+        self.metrics.ui_queue_lag.observe(time.perf_counter() - put_at)
+        return item
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, metrics, host='127.0.0.1', port=9477):
+        super().__init__((host, port), _MetricsHandler)
+        self.metrics = metrics
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        logger.info(f"Metrics available at http://{self.server_address[0]}:{self.server_address[1]}/metrics")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+METRICS = EngineMetrics()
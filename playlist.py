@@ -0,0 +1,106 @@
+import threading
+import logging
+
+from ytdl_sessions import SESSIONS
+
+logger = logging.getLogger(__name__)
+
+
+def entry_url(entry):
+    url = entry.get('webpage_url') or entry.get('url')
+    if url and not url.startswith(('http://', 'https://')) and entry.get('ie_key') == 'Youtube':
+        url = f"https://www.youtube.com/watch?v={url}"
+    return url
+
+
+class PlaylistExpander:
+    """Streams the entries of a playlist/channel URL page by page.
+
+    The flat extraction is run with ``process=False`` so yt-dlp hands back its
+    lazy entries iterator instead of materializing the whole list; entries are
+    grouped into pages of ``page_size`` and passed to ``on_page`` as soon as each
+    page is complete. ``is_known(entry)`` lets the caller skip entries that are
+    already queued or downloaded.
+    """
+
+    def __init__(self, url, page_size=50, is_known=None):
+        self.url = url
+        self.page_size = page_size
+        self.is_known = is_known
+        self.cancel_event = threading.Event()
+        self.finished = threading.Event()
+        self.title = None
+        self.seen = 0
+        self.added = 0
+        self.skipped = 0
+        self.error = None
+
+    def _iter_entries(self, entries, depth=0):
+        if entries is None:
+            return
+        if hasattr(entries, 'getslice'):
+            # PagedList: pull one page at a time instead of iterating the whole list
+            start = 0
+            while not self.cancel_event.is_set():
+                page = entries.getslice(start, start + self.page_size)
+                if not page:
+                    break
+                for entry in page:
+                    yield from self._expand_entry(entry, depth)
+                start += self.page_size
+        else:
+            for entry in entries:
+                if self.cancel_event.is_set():
+                    break
+                yield from self._expand_entry(entry, depth)
+
+    def _expand_entry(self, entry, depth):
+        if not entry:
+            return
+        if entry.get('_type') == 'playlist' and depth < 2:
+            # Channels can nest tabs/playlists; flatten them lazily too
+            yield from self._iter_entries(entry.get('entries'), depth + 1)
+        else:
+            yield entry
+
+    def run(self, on_page):
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+        }
+        try:
+            with SESSIONS.session(ydl_opts, self.url) as ydl:
+                info = ydl.extract_info(self.url, download=False, process=False)
+                for _ in range(3):
+                    # Unprocessed results can be redirects (e.g. channel root -> videos tab)
+                    if info.get('_type') not in ('url', 'url_transparent'):
+                        break
+                    info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+                self.title = info.get('title') or self.url
+                logger.info(f"Expanding playlist '{self.title}' ({self.url}).")
+                page = []
+                for entry in self._iter_entries(info.get('entries')):
+                    self.seen += 1
+                    if not entry_url(entry) or (self.is_known and self.is_known(entry)):
+                        self.skipped += 1
+                        continue
+                    page.append(entry)
+                    if len(page) >= self.page_size:
+                        on_page(page)
+                        self.added += len(page)
+                        page = []
+                if page and not self.cancel_event.is_set():
+                    on_page(page)
+                    self.added += len(page)
+        except Exception as e:
+            self.error = e
+            logger.error(f"Playlist expansion failed for {self.url}: {e}")
+        finally:
+            self.finished.set()
+        logger.info(f"Playlist expansion finished for {self.url}: {self.seen} entries seen, {self.added} queued, {self.skipped} skipped.")
+
+    def cancel(self):
+        self.cancel_event.set()
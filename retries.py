@@ -0,0 +1,141 @@
+import errno
+import random
+import subprocess
+
+# Error classes, most specific first
+UNAVAILABLE = "unavailable"  # geo-blocked, private, removed, login required: retrying won't help
+THROTTLED = "throttled"  # HTTP 429 and friends
+EXPIRED = "expired"  # signed stream URL no longer valid: extract again
+FFMPEG = "ffmpeg"  # merge/remux/encode failed
+TRANSIENT = "transient"  # timeouts, resets, 5xx, truncated transfers
+FATAL = "fatal"  # anything else
+
+UNAVAILABLE_TEXT = ("not available in your country", "geo restrict", "georestrict", "private video",
+                    "video unavailable", "this video has been removed", "members-only", "join this channel",
+                    "sign in to confirm", "login required", "account associated with this video has been terminated",
+                    "http error 404", "unsupported url")
+THROTTLED_TEXT = ("http error 429", "too many requests", "rate limit", "rate-limit")
+# A bare "forbidden" also comes with geo and login refusals, which a fresh URL doesn't fix
+EXPIRED_TEXT = ("http error 403", "http error 410", "url has expired", "signature expired", "expired url")
+FFMPEG_TEXT = ("ffmpeg", "postprocessing:", "conversion failed", "error opening output", "invalid data found")
+TRANSIENT_TEXT = ("timed out", "timeout", "connection reset", "connection refused", "connection aborted",
+                  "remote end closed", "temporary failure in name resolution", "name or service not known",
+                  "network is unreachable", "incompleteread", "incomplete read", "eof occurred",
+                  "http error 500", "http error 502", "http error 503", "http error 504",
+                  "unable to download video data", "did not get any data blocks", "giving up after",
+                  "unable to continue")  # "fragment 3 not found, unable to continue"
+# A missing binary is a setup problem, not a flaky run
+MISSING_TOOL_TEXT = ("ffmpeg not found", "ffprobe not found", "ffmpeg is not installed", "executable not found",
+                     "no such file or directory")
+TRANSIENT_ERRNOS = (errno.ECONNRESET, errno.ECONNREFUSED, errno.ECONNABORTED, errno.ETIMEDOUT, errno.EHOSTUNREACH,
+                    errno.ENETUNREACH, errno.ENETDOWN, errno.EPIPE)
+HTTP_STATUS_CLASSES = {401: UNAVAILABLE, 403: EXPIRED, 404: UNAVAILABLE, 408: TRANSIENT, 410: EXPIRED, 429: THROTTLED,
+                       451: UNAVAILABLE}
+
+
+class RetryPolicy:
+    """How often an error class is retried and how long to wait in between.
+
+    Waits grow exponentially from ``base`` up to ``cap`` seconds with "equal
+    jitter": half of each step is fixed and half random, so jobs that failed
+    together (one host hiccup) don't all come back at the same moment.
+    """
+
+    __slots__ = ('attempts', 'base', 'cap')
+
+    def __init__(self, attempts, base=1.0, cap=60.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt, rng=random):
+        step = min(self.cap, self.base * 2 ** attempt)
+        return step / 2 + rng.uniform(0, step / 2)
+
+
+RETRY_POLICIES = {
+    TRANSIENT: RetryPolicy(5, base=5, cap=300),
+    THROTTLED: RetryPolicy(4, base=60, cap=1800),
+    EXPIRED: RetryPolicy(2, base=1, cap=5),  # the restart extracts fresh URLs, so no need to wait
+    FFMPEG: RetryPolicy(1, base=5, cap=5),
+    UNAVAILABLE: RetryPolicy(0),
+    FATAL: RetryPolicy(0),
+}
+# In-process retries yt-dlp makes before the error reaches us
+YTDL_RETRIES = 3
+YTDL_RETRY_BASE = 1.0
+YTDL_RETRY_CAP = 15.0
+
+
+def ytdl_retry_sleep(n):
+    """yt-dlp ``retry_sleep_functions`` entry: jittered exponential wait before its ``n``-th retry."""
+    return RetryPolicy(YTDL_RETRIES, YTDL_RETRY_BASE, YTDL_RETRY_CAP).delay(n)
+
+
+def _chain(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc_info = getattr(exc, 'exc_info', None)
+        exc = (exc_info[1] if exc_info else None) or exc.__cause__ or exc.__context__
+
+
+def _text(exc):
+    stderr = getattr(exc, 'stderr', None) or ''
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode(errors='replace')
+    return f"{type(exc).__name__} {exc} {stderr}".lower()
+
+
+def _is(exc, *names):
+    # By name, so yt-dlp's exceptions (and their subclasses) match without importing it
+    return any(cls.__name__ in names for cls in type(exc).__mro__)
+
+
+def _classify_type(exc, text):
+    if _is(exc, 'GeoRestrictedError', 'UnavailableVideoError', 'UnsupportedError'):
+        return UNAVAILABLE
+    if _is(exc, 'PostProcessingError') or isinstance(exc, subprocess.CalledProcessError):
+        return FATAL if any(m in text for m in MISSING_TOOL_TEXT) else FFMPEG
+    if _is(exc, 'HTTPError'):
+        status = getattr(exc, 'status', None) or getattr(exc, 'code', None)
+        if status in HTTP_STATUS_CLASSES:
+            # A 403 that comes with a geo or login message is a refusal, not an expired URL
+            if status == 403 and any(m in text for m in UNAVAILABLE_TEXT):
+                return UNAVAILABLE
+            return HTTP_STATUS_CLASSES[status]
+        if status and status >= 500:
+            return TRANSIENT
+    if _is(exc, 'CertificateVerifyError'):
+        return FATAL
+    if _is(exc, 'TransportError', 'ContentTooShortError') or isinstance(exc, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    if isinstance(exc, OSError) and exc.errno in TRANSIENT_ERRNOS:
+        return TRANSIENT
+    return None
+
+
+def classify_error(exc, ffmpeg_path="ffmpeg"):
+    """Error class of a failed job.
+
+    Looks through yt-dlp's wrapped exceptions (``DownloadError.exc_info``,
+    causes) for a type that tells, then falls back to the message text.
+    """
+    chain = list(_chain(exc))
+    text = " ".join(_text(e) for e in chain)
+    for e in chain:
+        kind = _classify_type(e, text)
+        if kind is not None:
+            return kind
+    if any(m in text for m in UNAVAILABLE_TEXT):
+        return UNAVAILABLE
+    if any(m in text for m in THROTTLED_TEXT):
+        return THROTTLED
+    if any(m in text for m in EXPIRED_TEXT):
+        return EXPIRED
+    if any(m in text for m in FFMPEG_TEXT) or (ffmpeg_path and ffmpeg_path.lower() in text):
+        return FATAL if any(m in text for m in MISSING_TOOL_TEXT) else FFMPEG
+    if any(m in text for m in TRANSIENT_TEXT):
+        return TRANSIENT
+    return FATAL
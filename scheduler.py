@@ -0,0 +1,138 @@
+import time
+import logging
+
+from disk_space import UNKNOWN_AUDIO_BYTES, UNKNOWN_VIDEO_BYTES, format_size
+
+logger = logging.getLogger(__name__)
+
+# Highest first; a job's class decides where it starts and whether it can be preempted
+PRIORITY_CLASSES = ("interactive", "normal", "bulk")
+DEFAULT_PRIORITY = "normal"
+PREEMPTIBLE = ("bulk",)
+_RANK = {priority: rank for rank, priority in enumerate(PRIORITY_CLASSES)}
+# Order within a priority class
+SCHEDULING_POLICIES = {
+    "fifo": "First In, First Out",
+    "shortest": "Shortest Remaining First",
+    "mixed": "First In, First Out + Small-Job Slots",
+}
+SMALL_JOB_BYTES = 100 * 1024 * 1024
+
+
+def priority_rank(priority):
+    return _RANK.get(priority, _RANK[DEFAULT_PRIORITY])
+
+
+def remaining_bytes(job):
+    """Bytes a job still has to transfer: live totals from the progress hook once it has run, else the format's size."""
+    total = (job.total_bytes or format_size(job.format_info)
+             or (UNKNOWN_AUDIO_BYTES if job.choice == "audio" else UNKNOWN_VIDEO_BYTES))
+    return max(total - job.downloaded_bytes, 0)
+
+
+class Scheduler:
+    """Decides which queued jobs start next and which running ones make way.
+
+    Runnable jobs are queued jobs marked ``auto_start``, jobs paused by
+    preemption and failed jobs whose retry backoff has run out. They start by priority class, then by ``policy``, up to
+    ``max_active`` at a time:
+
+    - ``fifo``: queue order.
+    - ``shortest``: fewest remaining bytes first, which minimizes mean
+      completion time but can hold a large job back for as long as smaller
+      ones keep arriving.
+    - ``mixed``: queue order, but ``small_slots`` slots are kept for jobs with
+      at most ``small_bytes`` left, so a few huge jobs can't block a
+      backlog of small ones.
+
+    An interactive job that finds every slot busy
+    takes one from a running bulk job, which is paused (keeping its partial
+    files) and resumes when a slot frees up again. When the link is
+    ``saturated`` (see ``concurrency.ConcurrencyController``), a free slot
+    doesn't mean free bandwidth: an interactive job pauses a bulk job anyway,
+    and bulk jobs don't start while an interactive one is running.
+
+    ``is_open(priority)`` says whether a class may download right now (see
+    ``download_windows.DownloadCalendar``); jobs of a closed class wait.
+    """
+
+    def __init__(self, max_active, policy="fifo", small_slots=1, small_bytes=SMALL_JOB_BYTES, is_open=None):
+        self.max_active = max_active
+        self.policy = policy
+        self.small_slots = small_slots
+        self.small_bytes = small_bytes
+        self.is_open = is_open or (lambda priority: True)
+        self.preemptions = 0
+
+    def is_runnable(self, job):
+        if job.status == "Retrying":
+            due = job.retry_at <= time.monotonic()
+        else:
+            due = job.auto_start and (job.status == "Queued" or (job.status == "Paused" and job.preempted))
+        return due and self.is_open(job.priority)
+
+    def is_small(self, job):
+        return remaining_bytes(job) <= self.small_bytes
+
+    def _ordered(self, jobs):
+        runnable = [job for job in jobs if self.is_runnable(job)]
+        # Sorts are stable, so queue order holds among equals
+        if self.policy == "shortest":
+            runnable.sort(key=lambda job: (priority_rank(job.priority), remaining_bytes(job)))
+        else:
+            runnable.sort(key=lambda job: priority_rank(job.priority))
+        return runnable
+
+    def upcoming(self, jobs, count):
+        """The ``count`` runnable jobs next in line, roughly in the order they will start."""
+        return self._ordered(jobs)[:count]
+
+    def next_jobs(self, jobs, running, saturated=False):
+        """Jobs to start now, given ``jobs`` in queue order and the ``running`` ones."""
+        free_slots = self.max_active - len(running)
+        if free_slots <= 0:
+            return []
+        runnable = self._ordered(jobs)
+        if saturated and any(job.priority == "interactive" for job in running):
+            runnable = [job for job in runnable if job.priority not in PREEMPTIBLE]
+        if self.policy != "mixed":
+            return runnable[:free_slots]
+
+        large_slots = max(self.max_active - self.small_slots, 1)
+        large_running = sum(1 for job in running if not self.is_small(job))
+        picked = []
+        for job in runnable:
+            if len(picked) == free_slots:
+                break
+            if not self.is_small(job):
+                if large_running >= large_slots:
+                    continue
+                large_running += 1
+            picked.append(job)
+        return picked
+
+    def victims(self, job, running, saturated=False):
+        """Running jobs to pause so ``job`` can start right away; empty when a slot (and, if ``saturated``, bandwidth)
+        is free or nothing may yield."""
+        excess = len(running) + 1 - self.max_active
+        if saturated:
+            excess = max(excess, 1)
+        if excess <= 0 or job.priority != "interactive":
+            return []
+        # Jobs already merging or encoding finish their step; only transfers are paused
+        candidates = [j for j in running if j.priority in PREEMPTIBLE and j.status == "Downloading" and not j.stop_requested()]
+        # The least progressed bulk job loses the least by stopping now
+        candidates.sort(key=lambda j: j.progress)
+        return candidates[:excess]
+
+    @staticmethod
+    def hold(job):
+        """Pauses a running job so the scheduler resumes it (from its partial files) later."""
+        job.preempted = True
+        job.auto_start = True
+        job.request_stop()
+
+    def preempt(self, victim, by):
+        self.hold(victim)
+        self.preemptions += 1
+        logger.info(f"Preempting bulk job '{victim.title}' for '{by.title}'")
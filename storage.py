@@ -0,0 +1,119 @@
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _norm(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class OutputRoot:
+    __slots__ = ('path', 'weight')
+
+    def __init__(self, path, weight=1.0):
+        self.path = path
+        self.weight = weight
+
+    def to_record(self):
+        return {'path': self.path, 'weight': self.weight}
+
+
+def load_roots(path):
+    """Reads the configured output roots; a missing file means none."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        records = json.load(f)
+    return [OutputRoot(r['path'], float(r.get('weight', 1.0))) for r in records if r.get('path')]
+
+
+def save_roots(path, roots):
+    with open(path, 'w') as f:
+        json.dump([root.to_record() for root in roots], f, indent=2)
+
+
+class StoragePolicy:
+    """Spreads jobs over several weighted output roots (usually one per disk).
+
+    A job whose output folder is one of the roots is placed when its worker
+    starts: among the roots its space estimate fits on, it gets the one with
+    the highest ``weight * available bytes / (1 + jobs writing there)``, and
+    the space is reserved in the same step so concurrent starts see each
+    other. A job that fits on no root waits until any of them has room
+    (``placements``). Once placed (``job.storage_root``), a job stays where
+    its partial files are. Jobs pointed at any other folder are left alone,
+    and with no roots configured nothing changes.
+    """
+
+    def __init__(self, disk_space, roots=()):
+        self.disk_space = disk_space
+        self.roots = list(roots)
+        self._writers = {}  # job -> normalized root path
+        self._lock = threading.Lock()
+
+    def set_roots(self, roots):
+        with self._lock:
+            self.roots = list(roots)
+
+    def manages(self, out_dir):
+        target = _norm(out_dir)
+        return any(_norm(root.path) == target for root in self.roots)
+
+    def _load(self, path):
+        return sum(1 for root in self._writers.values() if root == path)
+
+    def _pick(self, needs_for):
+        best, best_score = None, None
+        for root in self.roots:
+            if root.weight <= 0:
+                continue
+            try:
+                available = self.disk_space.headroom(needs_for(root.path))
+            except OSError as e:
+                logger.warning(f"Output root {root.path} unavailable: {e}")
+                continue
+            if available < 0:
+                continue
+            score = root.weight * available / (1 + self._load(_norm(root.path)))
+            if best_score is None or score > best_score:
+                best, best_score = root, score
+        return best
+
+    def admit(self, job, needs_for):
+        """Places ``job`` if it's still unplaced and reserves its space; raises ``InsufficientSpace``.
+
+        ``needs_for(out_dir)`` returns the job's space estimate for an output folder.
+        """
+        with self._lock:
+            managed = self.manages(job.out_dir)
+            if managed and job.storage_root is None:
+                root = self._pick(needs_for)
+                if root is not None and _norm(root.path) != _norm(job.out_dir):
+                    logger.info(f"Placing '{job.title}' on {root.path}")
+                    job.out_dir = root.path
+            self.disk_space.reserve(job, needs_for(job.out_dir))
+            if managed:
+                job.storage_root = job.out_dir
+                self._writers[job] = _norm(job.out_dir)
+
+    def placements(self, job, needs_for):
+        """Space estimates for every folder ``job`` may still be written to: each root while it is unplaced."""
+        with self._lock:
+            if job.storage_root is None and self.manages(job.out_dir):
+                needs = [needs_for(root.path) for root in self.roots if root.weight > 0]
+                if needs:
+                    return needs
+        return [needs_for(job.out_dir)]
+
+    def release(self, job):
+        with self._lock:
+            self._writers.pop(job, None)
+
+    def stats(self):
+        with self._lock:
+            return [{'path': root.path, 'weight': root.weight, 'writers': self._load(_norm(root.path))}
+                    for root in self.roots]
+
@@ -0,0 +1,182 @@
+import os
+import hashlib
+import shutil
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWaitCancelled(Exception):
+    """Raised when a job gives up waiting on a stream another job is downloading."""
+
+
+def _safe_part(value):
+    safe = "".join(c if c.isalnum() or c in ('-', '_') else '_' for c in str(value)) or "none"
+    if len(safe) > 64:
+        # Long ids (e.g. URLs used as a fallback id) would make unwieldy file names
+        safe = hashlib.sha1(str(value).encode('utf-8')).hexdigest()
+    return safe
+
+
+class _Entry:
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.pins = 0
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class StreamCache:
+    """Content cache for downloaded elementary streams.
+
+    Entries are keyed by video id + format id. Concurrent requests for the same
+    key wait on a single in-flight download, finished files are reused by later
+    jobs, and unpinned entries are evicted least-recently-used first once the
+    cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._work_root = os.path.join(cache_dir, ".inflight")
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self._work_root, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        # Rebuild the index from disk, oldest files first so LRU order survives restarts
+        found = []
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            if not os.path.isfile(path) or "__" not in filename:
+                continue
+            stem = os.path.splitext(filename)[0]
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((st.st_mtime, stem, path, st.st_size))
+        for _, stem, path, size in sorted(found):
+            self._entries[stem] = _Entry(path, size)
+            self._total_bytes += size
+        if found:
+            logger.info(f"Stream cache loaded {len(found)} entries ({self._total_bytes / (1024*1024):.2f} MB) from {self.cache_dir}")
+        with self._lock:
+            self._evict_locked()
+
+    @staticmethod
+    def make_key(video_id, format_id):
+        return f"{_safe_part(video_id)}__{_safe_part(format_id)}"
+
+    def fetch(self, video_id, format_id, producer, cancel_event=None, on_wait=None):
+        """Return a pinned path for the stream, downloading it at most once.
+
+        ``producer(work_dir)`` must download the stream into ``work_dir`` and
+        return the resulting file path. The work directory is stable per key, so
+        partial downloads from an interrupted producer are resumed by the next one.
+        Callers must ``release`` the key once they no longer need the file.
+        """
+        key = self.make_key(video_id, format_id)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and os.path.exists(entry.path):
+                    entry.pins += 1
+                    self._entries.move_to_end(key)
+                    logger.info(f"Stream cache hit for {key}")
+                    return entry.path
+                if entry is not None:
+                    self._drop_locked(key)
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    inflight = _InFlight()
+                    self._inflight[key] = inflight
+                    is_producer = True
+                else:
+                    is_producer = False
+
+            if is_producer:
+                return self._produce(key, inflight, producer)
+
+            if on_wait:
+                on_wait()
+            logger.info(f"Waiting for in-flight download of {key}")
+            while not inflight.done.wait(timeout=0.5):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CacheWaitCancelled(f"Stopped waiting for {key}")
+            # Loop again: either the entry is now cached, or the producer failed and we take over
+
+    def _produce(self, key, inflight, producer):
+        work_dir = os.path.join(self._work_root, key)
+        os.makedirs(work_dir, exist_ok=True)
+        try:
+            produced_path = producer(work_dir)
+            if not produced_path or not os.path.exists(produced_path):
+                raise FileNotFoundError(f"Producer for {key} did not create a file")
+            final_path = os.path.join(self.cache_dir, key + os.path.splitext(produced_path)[1])
+            os.replace(produced_path, final_path)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            size = os.path.getsize(final_path)
+            with self._lock:
+                entry = _Entry(final_path, size)
+                entry.pins = 1
+                self._entries[key] = entry
+                self._total_bytes += size
+                self._evict_locked()
+            logger.info(f"Stream cache stored {key} ({size / (1024*1024):.2f} MB)")
+            return final_path
+        except BaseException as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.done.set()
+
+    def release(self, path):
+        """Unpin a path returned by ``fetch`` so it becomes evictable again."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.path == path:
+                    entry.pins = max(0, entry.pins - 1)
+                    break
+            self._evict_locked()
+
+    def _drop_locked(self, key):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        try:
+            if os.path.exists(entry.path):
+                os.remove(entry.path)
+        except OSError as e:
+            logger.error(f"Error removing cached stream {entry.path}: {e}")
+
+    def _evict_locked(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if self._entries[key].pins > 0:
+                continue
+            logger.info(f"Evicting {key} from stream cache")
+            self._drop_locked(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'in_flight': len(self._inflight),
+            }
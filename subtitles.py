@@ -0,0 +1,100 @@
+import os
+import logging
+
+from warmup import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+SUBTITLE_FORMAT = 'vtt/srt/best'  # text formats every container we write can take
+TEXT_SUB_CODECS = {'mp4': 'mov_text', 'm4a': 'mov_text', 'mov': 'mov_text', 'webm': 'webvtt'}
+
+
+def subtitle_langs(sub_lang):
+    """Parses a job's ``sub_lang`` ("None", "en" or "en,de") into a list of languages."""
+    if not sub_lang or sub_lang == "None":
+        return []
+    return [lang.strip() for lang in sub_lang.split(',') if lang.strip()]
+
+
+class SubtitleFetcher:
+    """Fetches a job's subtitles once its download has finished.
+
+    ``attach(ydl)`` registers it as an ``after_video`` post-processor, which
+    yt-dlp runs with the video's info dict after its formats are downloaded
+    (and merged). Each requested language is picked from the subtitles, then
+    the automatic captions, in ``SUBTITLE_FORMAT`` order, and written under
+    the ``subtitle`` output template. A language that can't be fetched is
+    dropped and logged; the finished download is kept either way. It only
+    has the two methods yt-dlp calls on a post-processor, so defining it
+    doesn't import yt-dlp.
+    """
+
+    def __init__(self, langs):
+        self.langs = langs
+        self.ydl = None
+        self.files = {}  # lang -> final subtitle path
+        self.failed = {}  # lang -> error
+
+    def attach(self, ydl):
+        if self.langs:
+            ydl.add_post_processor(self, when='after_video')
+
+    def set_downloader(self, ydl):
+        self.ydl = ydl
+
+    @staticmethod
+    def pick(info, lang):
+        for tracks in (info.get('subtitles'), info.get('automatic_captions')):
+            formats = (tracks or {}).get(lang)
+            if formats:
+                for ext in SUBTITLE_FORMAT.split('/'):
+                    matches = [f for f in formats if ext == 'best' or f.get('ext') == ext]
+                    if matches:
+                        return matches[-1]
+        return None
+
+    def _fetch(self, sub_info):
+        if sub_info.get('data') is not None:
+            return sub_info['data']
+        if sub_info.get('protocol', 'https') not in ('http', 'https'):
+            raise ValueError(f"unsupported protocol {sub_info['protocol']}")
+        with self.ydl.urlopen(sub_info['url']) as response:
+            return response.read().decode('utf-8', 'replace')
+
+    def run(self, info):
+        base = self.ydl.prepare_filename(info, 'subtitle')
+        missing = []
+        for lang in self.langs:
+            sub_info = self.pick(info, lang)
+            if sub_info is None:
+                missing.append(lang)
+                continue
+            path = yt_dlp.utils.subtitles_filename(base, lang, sub_info['ext'], info.get('ext'))
+            try:
+                data = self._fetch(sub_info)
+                # newline='' keeps the track's own line endings
+                with open(path, 'w', encoding='utf-8', newline='') as f:
+                    f.write(data)
+            except Exception as e:
+                self.failed[lang] = e
+                logger.warning(f"Skipping {lang} subtitles for '{info.get('title')}': {e}")
+                continue
+            self.files[lang] = path
+        if missing:
+            logger.info(f"No subtitles in {', '.join(missing)} for '{info.get('title')}'")
+        return [], info
+
+    def written(self):
+        return {lang: path for lang, path in self.files.items() if os.path.exists(path)}
+
+
+def subtitle_mux_args(sub_files, first_input, container):
+    """ffmpeg input and output arguments that add ``sub_files`` ({lang: path}) as subtitle streams."""
+    inputs, outputs = [], []
+    for n, (lang, path) in enumerate(sub_files.items()):
+        inputs += ["-i", path]
+        outputs += ["-map", f"{first_input + n}:s",
+                    f"-metadata:s:s:{n}", f"language={yt_dlp.utils.ISO639Utils.short2long(lang) or lang}"]
+    if inputs:
+        outputs += ["-c:s", TEXT_SUB_CODECS.get(container, "copy")]
+    return inputs, outputs
@@ -0,0 +1,138 @@
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from bulk_import import BulkImporter, FormatPolicy, parse_url_list
+
+
+def video(format_id, height, fps=30, tbr=1000, vcodec='avc1', **extra):
+    return dict(format_id=format_id, height=height, fps=fps, tbr=tbr, vcodec=vcodec, **extra)
+
+
+FORMATS = [
+    video('audio', None, vcodec='none'),
+    video('360', 360),
+    video('720', 720),
+    video('720-60', 720, fps=60),
+    video('1080', 1080),
+    video('2160', 2160, tbr=9000),
+]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("https://a.example/1\nhttps://b.example/2\n", ["https://a.example/1", "https://b.example/2"]),
+    ("title,url\nFirst,https://a.example/1\nSecond,https://b.example/2\n",
+     ["https://a.example/1", "https://b.example/2"]),
+    ("https://a.example/1\nhttps://a.example/1\nhttps://b.example/2\n",
+     ["https://a.example/1", "https://b.example/2"]),
+    ("see (https://a.example/1). and [https://b.example/2]", ["https://a.example/1", "https://b.example/2"]),
+    ("https://a.example/1; https://b.example/2 'https://c.example/3'",
+     ["https://a.example/1", "https://b.example/2", "https://c.example/3"]),
+    ("no links here\nftp://a.example/1\n", []),
+    ("", []),
+])
+def test_parse_url_list(text, expected):
+    assert parse_url_list(text) == expected
+
+
+def test_parse_url_list_keeps_first_occurrence_order():
+    text = "https://b.example/2,https://a.example/1\nhttps://a.example/1,https://c.example/3"
+    assert parse_url_list(text) == ["https://b.example/2", "https://a.example/1", "https://c.example/3"]
+
+
+@pytest.mark.parametrize("max_height, expected", [
+    (None, '2160'),
+    (1080, '1080'),
+    (720, '720-60'),
+    (480, '360'),
+    (240, None),
+])
+def test_video_policy_picks_best_format_under_height(max_height, expected):
+    chosen = FormatPolicy("p", 'video', max_height=max_height).select({'formats': FORMATS})
+    assert (chosen or {}).get('format_id') == expected
+
+
+def test_video_policy_ranks_by_bitrate_then_size():
+    formats = [video('low', 720, tbr=800), video('high', 720, tbr=1500),
+               video('a', 480, tbr=500, filesize=10), video('b', 480, tbr=500, filesize_approx=20)]
+    assert FormatPolicy("p", 'video').select({'formats': formats})['format_id'] == 'high'
+    assert FormatPolicy("p", 'video', max_height=480).select({'formats': formats})['format_id'] == 'b'
+
+
+def test_video_policy_skips_formats_without_id_or_video():
+    formats = [video(None, 1080), video('audio', None, vcodec='none'), video('ok', 360)]
+    assert FormatPolicy("p", 'video').select({'formats': formats})['format_id'] == 'ok'
+    assert FormatPolicy("p", 'video').select({}) is None
+
+
+@pytest.mark.parametrize("passthrough", [False, True])
+def test_audio_policy(passthrough):
+    policy = FormatPolicy("p", 'audio', passthrough=passthrough)
+    expected = {"format_id": "bestaudio/best", "is_best_audio_option": True}
+    if passthrough:
+        expected["audio_passthrough"] = True
+    assert policy.select({'formats': FORMATS}) == expected
+    assert policy.selector() == expected
+
+
+@pytest.mark.parametrize("max_height, fragment", [(720, "[height<=720]"), (None, "")])
+def test_video_selector(max_height, fragment):
+    selector = FormatPolicy("p", 'video', max_height=max_height).selector()
+    assert selector == {
+        "format_id": f"bv*{fragment}[ext=mp4]+ba[ext=m4a]/b{fragment}[ext=mp4]/bv*{fragment}+ba/b{fragment}",
+        "ext": "mp4",
+        "height": max_height,
+        "is_format_selector": True,
+    }
+
+
+class FakeImporter(BulkImporter):
+    def __init__(self, infos, **kwargs):
+        super().__init__(FormatPolicy("p", 'video'), max_workers=2, **kwargs)
+        self.infos = infos
+
+    def _extract(self, url):
+        info = self.infos[url]
+        if isinstance(info, Exception):
+            raise info
+        return info
+
+
+def test_importer_reports_results_and_failures():
+    importer = FakeImporter({
+        'https://a': {'id': 'a', 'formats': FORMATS},
+        'https://b': {'id': 'b', 'formats': []},
+        'https://c': {'_type': 'playlist', 'id': 'c'},
+        'https://d': OSError("offline"),
+    })
+    results = []
+    importer.run(list(importer.infos), lambda url, info, fmt: results.append((url, fmt['format_id'])))
+
+    assert results == [('https://a', '2160')]
+    assert sorted(url for url, _ in importer.failures) == ['https://b', 'https://c', 'https://d']
+    assert importer.done == importer.total == 4
+    assert importer.finished.is_set()
+
+
+def test_importer_skips_videos_already_known_or_seen():
+    importer = FakeImporter({
+        'https://a': {'id': 'queued', 'formats': FORMATS},
+        'https://b': {'id': 'new', 'formats': FORMATS},
+        'https://b?feature=share': {'id': 'new', 'formats': FORMATS},
+    }, known={'queued'})
+    results = []
+    importer.run(list(importer.infos), lambda url, info, fmt: results.append(info['id']))
+
+    assert results == ['new']
+    assert importer.duplicates == 2
+    assert importer.done == 3
+    assert not importer.failures
+
+
+def test_canceled_importer_skips_remaining_urls():
+    importer = FakeImporter({'https://a': {'id': 'a', 'formats': FORMATS}})
+    importer.cancel()
+    results = []
+    importer.run(['https://a'], lambda *args: results.append(args))
+    assert results == []
+    assert importer.finished.is_set()
@@ -0,0 +1,193 @@
+import pytest
+
+from concurrency import ConcurrencyController
+from metrics import EngineMetrics
+
+MB = 1024 * 1024
+
+
+class Slots:
+    def __init__(self, max_active):
+        self.max_active = max_active
+
+
+class Link:
+    """Feeds the controller synthetic throughput, one tick every ``step`` seconds."""
+
+    def __init__(self, slots=2, step=5.0, **kwargs):
+        self.metrics = EngineMetrics()
+        self.controller = ConcurrencyController(Slots(slots), metrics=self.metrics, **kwargs)
+        self.step = step
+        self.now = 0.0
+        self.controller.tick(0, 0, now=self.now)
+
+    def tick(self, rate, active=None, backlog=5, downloading=None):
+        self.metrics.downloaded_bytes.inc(int(rate * self.step), host='example.com')
+        self.now += self.step
+        active = self.controller.slots if active is None else active
+        return self.controller.tick(active, backlog, now=self.now, downloading=downloading)
+
+    @property
+    def knobs(self):
+        return self.controller.slots, self.controller.fragments
+
+
+def test_first_tick_only_records_a_baseline():
+    link = Link()
+    assert link.controller.tick(2, 5, now=link.now) is False
+    assert link.knobs == (2, 1)
+
+
+def test_extra_slot_is_kept_when_throughput_rises():
+    link = Link(slots=2)
+    assert link.tick(1 * MB, downloading=2) is True
+    assert link.knobs == (3, 1)
+    # Still extracting: the new job hasn't received bytes yet
+    assert link.tick(1 * MB, downloading=2) is False
+    # Bytes arrive; the window starts now, not when the slot was added
+    assert link.tick(1.5 * MB, downloading=3) is False
+    assert link.knobs == (3, 1)
+    assert link.tick(1.5 * MB, downloading=3) is True
+    assert link.knobs == (4, 1)
+    assert link.controller.reason == "probing"
+
+
+def test_extra_slot_is_taken_back_and_held_without_gain():
+    link = Link(slots=2, hold_ticks=3)
+    link.tick(1 * MB, downloading=2)
+    link.tick(1 * MB, downloading=3)
+    assert link.tick(1.02 * MB, downloading=3) is False
+    assert link.knobs == (2, 1)
+    assert link.controller.reason == "extra slot didn't help"
+    for _ in range(3):
+        assert link.tick(1 * MB, downloading=2) is False
+        assert link.knobs == (2, 1)
+    assert link.tick(1 * MB, downloading=2) is True
+    assert link.knobs == (3, 1)
+
+
+def test_slot_is_judged_after_settle_without_downloading_count():
+    link = Link(slots=2, settle=20.0)
+    link.tick(1 * MB)
+    assert link.knobs == (3, 1)
+    # The window covers the whole settle time, so an early dip still counts
+    for _ in range(3):
+        assert link.tick(2 * MB) is False
+    assert link.tick(0.5 * MB) is True
+    assert link.knobs == (4, 1)
+
+
+@pytest.mark.parametrize("counter", ['retries', 'throttled'])
+def test_retries_and_throttling_halve_both_knobs(counter):
+    link = Link(slots=6, hold_ticks=2)
+    link.controller.fragments = 4
+    getattr(link.metrics, counter).inc(host='example.com')
+    assert link.tick(1 * MB) is False
+    assert link.knobs == (3, 2)
+    assert link.controller.reason == "backing off after retries/throttling"
+    # Held, even though every slot is busy with jobs waiting
+    assert link.tick(1 * MB) is False
+    assert link.tick(1 * MB) is False
+    assert link.knobs == (3, 2)
+    assert link.tick(1 * MB) is True
+    assert link.knobs == (4, 2)
+
+
+def test_trouble_cancels_a_pending_probe():
+    link = Link(slots=4)
+    link.tick(1 * MB, downloading=4)
+    assert link.knobs == (5, 1)
+    link.metrics.throttled.inc(host='example.com')
+    link.tick(1 * MB, downloading=5)
+    assert link.knobs == (2, 1)
+    assert link.controller._probe is None
+
+
+def test_backoff_stops_at_the_lower_bound():
+    link = Link(slots=2, min_slots=2)
+    link.metrics.retries.inc(host='example.com')
+    link.tick(1 * MB)
+    assert link.knobs == (2, 1)
+
+
+def test_failed_jobs_do_not_back_off():
+    link = Link(slots=2)
+    link.metrics.job_transition("Downloading", "Error")
+    link.metrics.extract_errors.inc(host='example.com')
+    assert link.tick(1 * MB) is True
+    assert link.knobs == (3, 1)
+
+
+@pytest.mark.parametrize("active, backlog", [(1, 5), (2, 0)])
+def test_no_probe_unless_slots_are_full_and_jobs_wait(active, backlog):
+    link = Link(slots=2)
+    assert link.tick(1 * MB, active=active, backlog=backlog) is False
+    assert link.knobs == (2, 1)
+
+
+def test_fragments_are_probed_once_slots_are_at_the_bound():
+    link = Link(slots=3, max_slots=3, max_fragments=2, settle=10.0)
+    assert link.tick(1 * MB) is False
+    assert link.knobs == (3, 2)
+    assert link.controller.reason == "probing fragments"
+    link.tick(2 * MB)
+    link.tick(2 * MB)
+    # Kept, and no further increase past either bound
+    assert link.knobs == (3, 2)
+    assert link.tick(2 * MB) is False
+    assert link.knobs == (3, 2)
+
+
+def test_extra_fragment_is_taken_back_without_gain():
+    link = Link(slots=3, max_slots=3, settle=10.0, hold_ticks=1)
+    link.tick(1 * MB)
+    link.tick(1 * MB)
+    link.tick(1 * MB)
+    assert link.knobs == (3, 1)
+    assert link.controller.reason == "extra fragment thread didn't help"
+
+
+def test_saturated_from_backoff_or_wasted_slot_until_an_increase_pays_off():
+    link = Link(slots=2, hold_ticks=1)
+    assert not link.controller.saturated
+    link.tick(1 * MB, downloading=2)
+    link.tick(1 * MB, downloading=3)
+    link.tick(1 * MB, downloading=3)
+    assert link.controller.saturated
+    link.tick(1 * MB, downloading=2)
+    # Probing again doesn't clear it; only a kept increase does
+    link.tick(1 * MB, downloading=2)
+    link.tick(1 * MB, downloading=3)
+    assert link.controller.saturated
+    link.tick(2 * MB, downloading=3)
+    assert not link.controller.saturated
+    link.metrics.throttled.inc(host='example.com')
+    link.tick(2 * MB)
+    assert link.controller.saturated
+
+
+def test_idle_link_is_not_saturated():
+    link = Link(slots=2)
+    link.metrics.retries.inc(host='example.com')
+    link.tick(1 * MB)
+    assert link.controller.saturated
+    link.tick(0, active=0, backlog=0)
+    assert not link.controller.saturated
+
+
+def test_disabled_controller_only_measures():
+    link = Link(slots=2)
+    link.controller.enabled = False
+    assert link.tick(2 * MB) is False
+    link.metrics.retries.inc(host='example.com')
+    assert link.tick(2 * MB) is False
+    assert link.knobs == (2, 1)
+    assert link.controller.rate == 2 * MB
+    assert "fixed" in link.controller.describe()
+
+
+def test_targets_are_published():
+    link = Link(slots=2)
+    link.tick(1 * MB)
+    assert link.metrics.concurrency_target.value(knob="slots") == 3
+    assert link.metrics.concurrency_target.value(knob="fragments") == 1
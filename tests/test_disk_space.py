@@ -0,0 +1,116 @@
+from collections import namedtuple
+
+import pytest
+
+from disk_space import (AUDIO_SHARE, UNKNOWN_AUDIO_BYTES, UNKNOWN_VIDEO_BYTES, DiskSpaceManager, InsufficientSpace,
+                        estimate_job_bytes)
+
+Usage = namedtuple('Usage', 'free')
+GB = 1024 ** 3
+MB = 1024 ** 2
+
+
+class Job:
+    def __init__(self, title, status="Paused", running=False):
+        self.title = title
+        self.status = status
+        self.running = running
+
+    def is_active(self):
+        return self.running
+
+
+@pytest.fixture
+def disk(tmp_path):
+    space = {'bytes': 10 * GB}
+    manager = DiskSpaceManager(min_free=GB, disk_usage=lambda path: Usage(space['bytes']))
+    return manager, space, str(tmp_path)
+
+
+def test_low_space_pause_resumes_after_worker_stops(disk):
+    manager, space, directory = disk
+    job = Job("low", status="Downloading", running=True)
+    # The watcher parks the running job and asks for a dispatch before its worker has stopped
+    job.status = "Pausing..."
+    manager.wait_for_space(job, {directory: 2 * GB})
+    assert manager.resumable() == []
+    assert job in manager.waiting
+
+    # The worker stops; space is still short
+    job.running = False
+    job.status = "Paused"
+    space['bytes'] = 2 * GB
+    assert manager.resumable() == []
+    assert job in manager.waiting
+
+    space['bytes'] = 4 * GB
+    assert manager.resumable() == [job]
+    assert job not in manager.waiting
+
+
+@pytest.mark.parametrize('choice, format_info, expected', [
+    # MP3 encode: source, intermediate and output exist at once
+    ("audio", {'filesize': 10 * MB}, {'out': 30 * MB}),
+    # Passthrough: source plus the remuxed copy
+    ("audio", {'filesize': 10 * MB, 'audio_passthrough': True}, {'out': 20 * MB}),
+    ("audio", {}, {'out': 3 * UNKNOWN_AUDIO_BYTES}),
+    # Video-only stream: both streams in the cache, merged file in the output folder
+    ("video", {'filesize_approx': 100 * MB, 'vcodec': 'avc1', 'acodec': 'none'},
+     {'cache': 115 * MB, 'out': 115 * MB}),
+    ("video", {'vcodec': 'avc1', 'acodec': 'none'},
+     {'cache': UNKNOWN_VIDEO_BYTES + int(UNKNOWN_VIDEO_BYTES * AUDIO_SHARE),
+      'out': UNKNOWN_VIDEO_BYTES + int(UNKNOWN_VIDEO_BYTES * AUDIO_SHARE)}),
+    # Combined format: download plus the cover/subtitle remux copy
+    ("video", {'filesize': 50 * MB, 'vcodec': 'avc1', 'acodec': 'mp4a'}, {'out': 100 * MB}),
+    ("video", {'format_id': 'bv*+ba/b', 'is_format_selector': True}, {'out': 2 * UNKNOWN_VIDEO_BYTES}),
+])
+def test_estimate_job_bytes(choice, format_info, expected):
+    needs = estimate_job_bytes(choice, format_info, 'out', 'cache')
+    assert needs == pytest.approx(expected, rel=0.01)
+
+
+def test_resumable_oldest_first_and_only_what_fits(disk):
+    manager, space, directory = disk
+    jobs = [Job(f"job {n}") for n in range(3)]
+    manager.wait_for_space(jobs[0], {directory: 6 * GB})
+    manager.wait_for_space(jobs[1], {directory: 20 * GB})
+    manager.wait_for_space(jobs[2], {directory: 1 * GB})
+    assert manager.resumable() == [jobs[0], jobs[2]]
+    assert list(manager.waiting) == [jobs[1]]
+
+
+def test_resumable_counts_reservations_and_headroom(disk):
+    manager, space, directory = disk
+    running = Job("running", status="Downloading", running=True)
+    manager.reserve(running, {directory: 5 * GB})
+    waiter = Job("waiter")
+    manager.wait_for_space(waiter, {directory: 5 * GB})
+    # 10 GB free - 5 GB reserved - 1 GB headroom
+    assert manager.resumable() == []
+    manager.release(running)
+    assert manager.resumable() == [waiter]
+
+
+def test_resumable_drops_jobs_resumed_or_canceled_by_hand(disk):
+    manager, space, directory = disk
+    resumed, canceled = Job("resumed", status="Queued"), Job("canceled", status="Canceled")
+    manager.wait_for_space(resumed, {directory: 100 * GB})
+    manager.wait_for_space(canceled, {directory: 100 * GB})
+    assert manager.resumable() == []
+    assert manager.waiting == {}
+
+
+def test_resumable_when_any_alternative_fits(disk):
+    manager, space, directory = disk
+    job = Job("two roots")
+    manager.wait_for_space(job, {directory: 50 * GB}, {directory: 2 * GB})
+    assert manager.resumable() == [job]
+
+
+def test_reserve_raises_when_short(disk):
+    manager, space, directory = disk
+    with pytest.raises(InsufficientSpace):
+        manager.reserve(Job("big"), {directory: 9.5 * GB})
+    manager.reserve(Job("fits"), {directory: 8 * GB})
+    with pytest.raises(InsufficientSpace):
+        manager.reserve(Job("second"), {directory: 2 * GB})
@@ -0,0 +1,140 @@
+import datetime
+
+import pytest
+
+import download_windows
+from download_windows import BandwidthLimiter, DownloadCalendar, DownloadWindow
+
+
+def at(day, hour, minute=0):
+    # 2024-01-01 is a Monday
+    return datetime.datetime(2024, 1, 1 + ("mon", "tue", "wed", "thu", "fri", "sat", "sun").index(day), hour, minute)
+
+
+@pytest.mark.parametrize('now, inside', [
+    (at("mon", 9), True),
+    (at("mon", 8, 59), False),
+    (at("mon", 17), False),
+    (at("sat", 12), False),
+])
+def test_daytime_window(now, inside):
+    assert DownloadWindow(["mon", "tue", "wed", "thu", "fri"], "09:00", "17:00").contains(now) == inside
+
+
+@pytest.mark.parametrize('now, inside', [
+    (at("fri", 23), True),
+    # Friday night's window runs into Saturday morning, but none starts on Saturday
+    (at("sat", 3), True),
+    (at("sat", 7), False),
+    (at("sat", 23), False),
+    # Sunday has no window of its own, and Saturday's didn't exist to run over
+    (at("sun", 3), False),
+    (at("mon", 2), False),
+    (at("mon", 22), True),
+])
+def test_overnight_window_belongs_to_its_start_day(now, inside):
+    assert DownloadWindow(["mon", "tue", "wed", "thu", "fri"], "22:00", "07:00").contains(now) == inside
+
+
+def test_overnight_window_wraps_from_sunday_to_monday():
+    window = DownloadWindow(["sun"], "20:00", "06:00")
+    assert window.contains(at("mon", 5, 59))
+    assert not window.contains(at("mon", 6))
+
+
+@pytest.mark.parametrize('now', [at("sat", 0), at("sat", 12), at("sat", 23, 59)])
+def test_window_ending_at_midnight_covers_the_whole_day(now):
+    assert DownloadWindow(["sat"], "00:00", "24:00").contains(now)
+
+
+def test_full_day_window_doesnt_leak_into_next_day():
+    assert not DownloadWindow(["sat"], "00:00", "24:00").contains(at("sun", 0))
+
+
+@pytest.mark.parametrize('record', [
+    {'days': ["someday"]},
+    {'start': "25:00"},
+    {'start': "noon"},
+    {'max_bytes_per_second': 0},
+])
+def test_invalid_windows(record):
+    with pytest.raises(ValueError):
+        DownloadCalendar({"bulk": [record]})
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(download_windows.time, 'monotonic', clock)
+    return clock
+
+
+def test_limiter_allows_one_second_burst_then_delays(clock):
+    limiter = BandwidthLimiter()
+    limiter.set_rate(1000)
+    assert limiter.delay(1000) == 0.0
+    assert limiter.delay(500) == pytest.approx(0.5)
+
+
+def test_limiter_refill_is_capped_at_one_second(clock):
+    limiter = BandwidthLimiter()
+    limiter.set_rate(1000)
+    limiter.delay(1000)
+    # A long idle spell refills one second's worth, not ten
+    clock.now += 10
+    assert limiter.delay(1000) == 0.0
+    assert limiter.delay(1000) == pytest.approx(1.0)
+
+
+def test_limiter_without_rate_never_delays(clock):
+    limiter = BandwidthLimiter()
+    assert limiter.delay(10 ** 9) == 0.0
+    limiter.set_rate(1000)
+    limiter.set_rate(None)
+    assert limiter.delay(10 ** 9) == 0.0
+
+
+def test_calendar_update_reports_transitions_and_caps():
+    calendar = DownloadCalendar({"bulk": [{"days": ["sat"], "start": "00:00", "end": "24:00",
+                                           "max_bytes_per_second": 5000}]})
+    # Classes start out open, so the first closed check is a change
+    assert calendar.update(at("fri", 12)) == {"bulk": False}
+    assert calendar.update(at("fri", 13)) == {}
+    assert not calendar.is_open("bulk", at("fri", 13))
+    assert calendar.update(at("sat", 0)) == {"bulk": True}
+    assert calendar.limiters["bulk"].rate == 5000
+    assert calendar.update(at("sun", 0)) == {"bulk": False}
+    assert calendar.limiters["bulk"].rate is None
+
+
+def test_classes_without_windows_are_always_open():
+    calendar = DownloadCalendar({"bulk": [{"days": ["sat"]}]})
+    assert calendar.is_open("normal", at("mon", 12))
+    assert calendar.update(at("mon", 12)) == {"bulk": False}
+
+
+def test_throttle_sleeps_for_the_cap(clock, monkeypatch):
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(download_windows.time, 'sleep', sleep)
+    calendar = DownloadCalendar({"bulk": [{"max_bytes_per_second": 1000}]})
+    calendar.update(at("mon", 12))
+    calendar.throttle("bulk", 1000, lambda: False)
+    assert slept == []
+    calendar.throttle("bulk", 1000, lambda: False)
+    assert sum(slept) == pytest.approx(1.0)
+    slept.clear()
+    calendar.throttle("bulk", 1000, lambda: True)
+    assert slept == []
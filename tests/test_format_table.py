@@ -0,0 +1,155 @@
+import json
+
+import pytest
+
+from disk_space import estimate_job_bytes, format_size
+from format_table import FormatTable, codec_family, compact_format_info, resolution_label
+
+MB = 1024 * 1024
+
+
+def fmt(format_id, height=None, vcodec='avc1.64001f', acodec='none', ext='mp4', size=None, **extra):
+    f = dict(format_id=format_id, height=height, vcodec=vcodec, acodec=acodec, ext=ext, **extra)
+    if size is not None:
+        f['filesize'] = size
+    return f
+
+
+FORMATS = [
+    fmt('18', 360, acodec='mp4a.40.2', size=20 * MB, width=640, fps=30, abr=96),
+    fmt('22', 720, acodec='mp4a.40.2', size=60 * MB, width=1280, fps=30, abr=192),
+    fmt('137', 1080, size=150 * MB, width=1920, fps=30),
+    fmt('248', 1080, vcodec='vp9', ext='webm', size=120 * MB, width=1920, fps=30),
+    fmt('313', 2160, vcodec='vp9', ext='webm', width=3840, fps=60),
+    fmt('140', vcodec='none', acodec='mp4a.40.2', ext='m4a', size=4 * MB, abr=128),
+    fmt('251', vcodec='none', acodec='opus', ext='webm', size=5 * MB, abr=160),
+    fmt('599', vcodec='none', acodec='mp4a.40.5', ext='m4a', abr=30),
+]
+
+
+def ids(rows):
+    return [row.format['format_id'] for row in rows]
+
+
+@pytest.mark.parametrize("height, label", [
+    (None, ""), (100, ""), (144, "144p"), (360, "360p"), (719, "480p"), (1080, "1080p"),
+    (1440, "2K"), (2160, "4K"), (4320, "8K"), (20000, "32K"),
+])
+def test_resolution_label(height, label):
+    assert resolution_label(height) == label
+
+
+@pytest.mark.parametrize("codec, family", [
+    ('avc1.64001f', 'avc1'), ('vp9', 'vp9'), ('none', None), (None, None), ('', None),
+])
+def test_codec_family(codec, family):
+    assert codec_family(codec) == family
+
+
+def test_views_put_combined_before_video_only_and_sort_audio_by_bitrate():
+    table = FormatTable(FORMATS)
+    assert ids(table.view('video')) == ['18', '22', '248', '137', '313']
+    # Combined formats are listed under audio too, best bitrate first
+    assert ids(table.view('audio')) == ['22', '251', '140', '18', '599']
+    assert table.view('other') == []
+
+
+def test_codecs_and_containers_per_view():
+    table = FormatTable(FORMATS)
+    assert table.codecs('video') == ['avc1', 'vp9']
+    assert table.codecs('audio') == ['mp4a', 'opus']
+    assert table.containers('video') == ['mp4', 'webm']
+    assert table.containers('audio') == ['m4a', 'mp4', 'webm']
+
+
+@pytest.mark.parametrize("filters, expected", [
+    (dict(codec='vp9'), ['248', '313']),
+    (dict(container='mp4'), ['18', '22', '137']),
+    (dict(codec='avc1', container='webm'), []),
+    (dict(max_height=720), ['18', '22']),
+    # Unknown sizes can't be ruled out, so 313 stays
+    (dict(max_size=100 * MB), ['18', '22', '313']),
+    (dict(codec='vp9', max_height=1080), ['248']),
+])
+def test_video_filters(filters, expected):
+    assert ids(FormatTable(FORMATS).view('video', **filters)) == expected
+
+
+def test_max_height_does_not_filter_audio():
+    table = FormatTable(FORMATS)
+    assert ids(table.view('audio', max_height=144)) == ids(table.view('audio'))
+    assert ids(table.view('audio', codec='mp4a', max_size=10 * MB)) == ['140', '599']
+
+
+def test_views_are_cached_per_filter():
+    table = FormatTable(FORMATS)
+    assert table.view('video', codec='vp9') is table.view('video', codec='vp9')
+    assert table.view('video', codec='vp9') is not table.view('video', codec='avc1')
+
+
+def test_row_labels():
+    rows = {(row.kind, row.format['format_id']): row for row in FormatTable(FORMATS).rows}
+    assert rows[('combined', '22')].label == "720p (1280x720) | 60.00 MB | 30fps | Audio: 192k"
+    assert rows[('video_only', '313')].label == "4K (3840x2160) | Unknown | 60fps (Video Only)"
+    assert rows[('audio', '140')].label == "128kbps | 4.00 MB"
+
+
+def test_empty_and_sizeless_formats():
+    assert FormatTable(None).view('video') == []
+    row, = FormatTable([fmt('1', 480, filesize_approx=3 * MB)]).rows
+    assert row.size == 3 * MB
+    assert row.sort_key == (480, 3 * MB)
+
+
+# Every format field read after a job is queued: by download_worker, final_extensions,
+# estimate_job_bytes and remaining_bytes (through format_size)
+WORKER_KEYS = ('format_id', 'ext', 'vcodec', 'acodec', 'is_format_selector', 'is_best_audio_option',
+               'audio_passthrough')
+
+QUEUED_FORMATS = [
+    dict(fmt('22', 720, acodec='mp4a.40.2', size=60 * MB, width=1280, fps=30),
+         url='https://media.example.com/22?sig=abc', http_headers={'User-Agent': 'x'}, fragments=[{'url': 'f1'}]),
+    fmt('137', 1080, filesize_approx=150.7 * MB, tbr=4400, protocol='https'),
+    fmt('140', vcodec='none', acodec='mp4a.40.2', ext='m4a', size=4 * MB, abr=128),
+    fmt('313', 2160, vcodec='vp9', ext='webm'),
+    {"format_id": "bestaudio/best", "is_best_audio_option": True},
+    {"format_id": "bestaudio/best", "is_best_audio_option": True, "audio_passthrough": True},
+    {"format_id": "bv*[height<=720][ext=mp4]+ba[ext=m4a]/b[height<=720]", "ext": "mp4", "height": 720,
+     "is_format_selector": True},
+    {"format_id": "bv*[ext=mp4]+ba[ext=m4a]/b", "ext": "mp4", "height": None, "is_format_selector": True},
+]
+
+
+@pytest.mark.parametrize("format_info", QUEUED_FORMATS, ids=lambda f: f['format_id'])
+def test_compact_format_info_keeps_what_the_worker_reads(format_info):
+    compact = compact_format_info(format_info)
+    for key in WORKER_KEYS:
+        assert compact.get(key) == format_info.get(key)
+    # The worker's stream-kind checks compare against 'none', so dropped keys must read the same
+    assert (compact.get('vcodec') != 'none') == (format_info.get('vcodec') != 'none')
+    assert (compact.get('acodec') == 'none') == (format_info.get('acodec') == 'none')
+    assert format_size(compact) == (int(format_size(format_info)) if format_size(format_info) else None)
+
+
+@pytest.mark.parametrize("choice", ['video', 'audio'])
+@pytest.mark.parametrize("format_info", QUEUED_FORMATS, ids=lambda f: f['format_id'])
+def test_compact_format_info_keeps_disk_estimates(format_info, choice):
+    estimate = estimate_job_bytes(choice, format_info, 'out', 'cache')
+    compact_estimate = estimate_job_bytes(choice, compact_format_info(format_info), 'out', 'cache')
+    assert compact_estimate.keys() == estimate.keys()
+    for directory, size in estimate.items():
+        # filesize_approx is a float; the compact copy rounds it down to whole bytes
+        assert compact_estimate[directory] == pytest.approx(size, abs=4)
+
+
+@pytest.mark.parametrize("format_info", QUEUED_FORMATS, ids=lambda f: f['format_id'])
+def test_compact_format_info_survives_save_and_reload(format_info):
+    compact = compact_format_info(format_info)
+    # Saved queues are read back through DownloadJob, which compacts again
+    assert compact_format_info(json.loads(json.dumps(compact))) == compact
+
+
+def test_compact_format_info_drops_transport_fields():
+    compact = compact_format_info(QUEUED_FORMATS[0])
+    assert set(compact) == {'format_id', 'ext', 'vcodec', 'acodec', 'height', 'filesize'}
+    assert compact['filesize'] == 60 * MB
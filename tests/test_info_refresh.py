@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+
+yt_dlp = pytest.importorskip("yt_dlp")
+
+import info_refresh
+from info_refresh import InfoRefresher, stream_expiry
+
+EXPIRES = int(time.time()) + 6 * 3600
+
+
+def extractor_result():
+    # What an extractor hands back before format selection
+    formats = [
+        {'format_id': f"{height}p", 'url': f"https://media.example.com/{height}.mp4?expire={EXPIRES}",
+         'ext': 'mp4', 'height': height, 'vcodec': 'avc1', 'acodec': 'mp4a'}
+        for height in (360, 720, 1080)
+    ]
+    return {'id': 'abc123', 'title': 'Clip', 'formats': formats, 'extractor': 'fake', 'extractor_key': 'Fake',
+            'webpage_url': 'https://example.com/watch/abc123', 'webpage_url_basename': 'abc123'}
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def extract_info(self, url, **kwargs):
+        self.calls.append(kwargs)
+        return extractor_result()
+
+
+class FakeSessions:
+    def __init__(self):
+        self.ydl = FakeSession()
+
+    @contextmanager
+    def session(self, opts, url):
+        yield self.ydl
+
+
+class Job:
+    url = 'https://example.com/watch/abc123'
+    title = 'Clip'
+    status = 'Queued'
+
+    def is_active(self):
+        return False
+
+
+@pytest.fixture
+def refresher(monkeypatch):
+    sessions = FakeSessions()
+    monkeypatch.setattr(info_refresh, 'SESSIONS', sessions)
+    refresher = InfoRefresher(host_interval=0)
+    refresher.sessions = sessions
+    yield refresher
+    refresher.shutdown()
+
+
+def test_refresh_keeps_info_unprocessed(refresher):
+    job = Job()
+    refresher._extract(job)
+    assert refresher.sessions.ydl.calls == [{'download': False, 'process': False}]
+    info = refresher.get(job)
+    assert 'requested_formats' not in info and 'format_id' not in info
+    assert stream_expiry(info) == EXPIRES
+
+
+@pytest.mark.parametrize('selector, format_id', [('best', '1080p'), ('worst', '360p'), ('best[height<=720]', '720p')])
+def test_refreshed_info_follows_worker_format(refresher, selector, format_id):
+    job = Job()
+    refresher._extract(job)
+    # A first consumer with another selector must not leave its choice in the cached info
+    with yt_dlp.YoutubeDL({'quiet': True, 'format': 'worst' if selector == 'best' else 'best'}) as other:
+        other.process_ie_result(refresher.get(job), download=False)
+    with yt_dlp.YoutubeDL({'quiet': True, 'format': selector}) as ydl:
+        info = ydl.process_ie_result(refresher.get(job), download=False)
+    assert info['format_id'] == format_id
+    assert info['url'].startswith(f"https://media.example.com/{format_id[:-1]}.mp4")
@@ -0,0 +1,81 @@
+import io
+import errno
+import subprocess
+
+import pytest
+
+from retries import EXPIRED, FATAL, FFMPEG, THROTTLED, TRANSIENT, UNAVAILABLE, classify_error
+
+
+def download_error(message, cause=None):
+    from yt_dlp.utils import DownloadError
+    return DownloadError(message, (type(cause), cause, None) if cause else None)
+
+
+def http_error(status, reason):
+    from yt_dlp.networking import Response
+    from yt_dlp.networking.exceptions import HTTPError
+    return HTTPError(Response(io.BytesIO(), "https://media.example.com/v.mp4", {}, status=status, reason=reason))
+
+
+def ytdlp_error(name, *args):
+    import yt_dlp.networking.exceptions
+    import yt_dlp.postprocessor.ffmpeg
+    import yt_dlp.utils
+    for module in (yt_dlp.utils, yt_dlp.networking.exceptions, yt_dlp.postprocessor.ffmpeg):
+        if hasattr(module, name):
+            return getattr(module, name)(*args)
+    raise AttributeError(name)
+
+
+@pytest.mark.parametrize('error, expected', [
+    (Exception("ERROR: Conversion failed!"), FFMPEG),
+    (Exception("ERROR: Postprocessing: Invalid data found when processing input"), FFMPEG),
+    (Exception("ERROR: Postprocessing: ffmpeg not found. Please install or provide the path"), FATAL),
+    (Exception("ERROR: fragment 1 not found, unable to continue"), TRANSIENT),
+    (Exception("ERROR: unable to download video data: <urlopen error timed out>"), TRANSIENT),
+    (Exception("ERROR: [youtube] abc: HTTP Error 403: Forbidden"), EXPIRED),
+    (Exception("ERROR: [generic] Forbidden: this content is for subscribers only"), FATAL),
+    (Exception("ERROR: [youtube] abc: Video unavailable. This video is private"), UNAVAILABLE),
+    (Exception("ERROR: [youtube] abc: Sign in to confirm your age"), UNAVAILABLE),
+    (Exception("ERROR: HTTP Error 429: Too Many Requests"), THROTTLED),
+    (ConnectionResetError(errno.ECONNRESET, "Connection reset by peer"), TRANSIENT),
+    (OSError(errno.ETIMEDOUT, "Operation timed out"), TRANSIENT),
+    (subprocess.CalledProcessError(1, ["ffmpeg"], stderr=b"Error while decoding stream"), FFMPEG),
+    (ValueError("unexpected"), FATAL),
+])
+def test_classify_by_text(error, expected):
+    assert classify_error(error) == expected
+
+
+@pytest.mark.parametrize('make, expected', [
+    (lambda: download_error("ERROR: Postprocessing: Conversion failed!",
+                            ytdlp_error('FFmpegPostProcessorError', "Conversion failed!")), FFMPEG),
+    (lambda: download_error("ERROR: Postprocessing: Conversion failed!",
+                            ytdlp_error('PostProcessingError', "Conversion failed!")), FFMPEG),
+    (lambda: download_error("ERROR: Postprocessing: ffmpeg not found",
+                            ytdlp_error('FFmpegPostProcessorError', "ffmpeg not found. Please install")), FATAL),
+    (lambda: download_error("ERROR: fragment 1 not found, unable to continue"), TRANSIENT),
+    (lambda: download_error("ERROR: unable to download video data: HTTP Error 403: Forbidden",
+                            http_error(403, "Forbidden")), EXPIRED),
+    (lambda: download_error("ERROR: [youtube] abc: The uploader has not made this video available in your country",
+                            ytdlp_error('GeoRestrictedError', "Forbidden")), UNAVAILABLE),
+    (lambda: download_error("ERROR: [vimeo] 123: This video is only available for registered users. Login required",
+                            http_error(403, "Forbidden")), UNAVAILABLE),
+    (lambda: download_error("ERROR: unable to download video data: HTTP Error 410: Gone", http_error(410, "Gone")),
+     EXPIRED),
+    (lambda: download_error("ERROR: HTTP Error 429", http_error(429, "Too Many Requests")), THROTTLED),
+    (lambda: download_error("ERROR: HTTP Error 503", http_error(503, "Service Unavailable")), TRANSIENT),
+    (lambda: download_error("ERROR: HTTP Error 404", http_error(404, "Not Found")), UNAVAILABLE),
+    (lambda: download_error("ERROR: 1024 bytes read, 4096 more expected",
+                            ytdlp_error('IncompleteRead', 1024, 4096)), TRANSIENT),
+    (lambda: download_error("ERROR: Downloaded 10 bytes, expected 20 bytes",
+                            ytdlp_error('ContentTooShortError', 10, 20)), TRANSIENT),
+    (lambda: download_error("ERROR: [youtube] abc: Requested format is not available",
+                            ytdlp_error('UnavailableVideoError')), UNAVAILABLE),
+    (lambda: download_error("ERROR: certificate verify failed",
+                            ytdlp_error('CertificateVerifyError', "certificate verify failed")), FATAL),
+])
+def test_classify_ytdlp_errors(make, expected):
+    pytest.importorskip("yt_dlp")
+    assert classify_error(make()) == expected
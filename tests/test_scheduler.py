@@ -0,0 +1,163 @@
+import time
+
+import pytest
+
+from scheduler import Scheduler
+
+MB = 1024 * 1024
+
+
+class Job:
+    def __init__(self, title, priority="normal", status="Queued", auto_start=True, size=10 * MB, progress=0.0):
+        self.title = title
+        self.priority = priority
+        self.status = status
+        self.auto_start = auto_start
+        self.preempted = False
+        self.retry_at = 0.0
+        self.choice = "video"
+        self.format_info = {'filesize': size}
+        self.total_bytes = 0
+        self.downloaded_bytes = 0
+        self.progress = progress
+        self.stopped = False
+
+    def stop_requested(self):
+        return self.stopped
+
+    def request_stop(self):
+        self.stopped = True
+
+    def __repr__(self):
+        return self.title
+
+
+def titles(jobs):
+    return [job.title for job in jobs]
+
+
+@pytest.mark.parametrize('job, runnable', [
+    (Job("queued"), True),
+    (Job("manual", auto_start=False), False),
+    (Job("paused by user", status="Paused"), False),
+    (Job("done", status="Completed"), False),
+    (Job("error", status="Error"), False),
+])
+def test_is_runnable(job, runnable):
+    assert Scheduler(2).is_runnable(job) == runnable
+
+
+def test_retry_runnable_once_due():
+    job = Job("retry", status="Retrying")
+    job.retry_at = time.monotonic() + 60
+    assert not Scheduler(2).is_runnable(job)
+    job.retry_at = time.monotonic() - 1
+    assert Scheduler(2).is_runnable(job)
+
+
+def test_next_jobs_by_priority_then_queue_order():
+    jobs = [Job("bulk 1", "bulk"), Job("normal 1"), Job("bulk 2", "bulk"), Job("interactive", "interactive"),
+            Job("normal 2")]
+    assert titles(Scheduler(3).next_jobs(jobs, [])) == ["interactive", "normal 1", "normal 2"]
+
+
+def test_next_jobs_fills_free_slots_only():
+    jobs = [Job(f"job {n}") for n in range(5)]
+    scheduler = Scheduler(3)
+    assert titles(scheduler.next_jobs(jobs, [Job("running")])) == ["job 0", "job 1"]
+    assert scheduler.next_jobs(jobs, [Job("a"), Job("b"), Job("c")]) == []
+
+
+def test_closed_class_waits():
+    jobs = [Job("bulk", "bulk"), Job("normal")]
+    scheduler = Scheduler(2, is_open=lambda priority: priority != "bulk")
+    assert titles(scheduler.next_jobs(jobs, [])) == ["normal"]
+
+
+def test_victims_only_for_interactive_when_full():
+    running = [Job("bulk a", "bulk", "Downloading", progress=50), Job("bulk b", "bulk", "Downloading", progress=10)]
+    scheduler = Scheduler(2)
+    assert scheduler.victims(Job("normal"), running) == []
+    assert scheduler.victims(Job("interactive", "interactive"), running[:1]) == []
+    # The least progressed bulk job loses the least
+    assert titles(scheduler.victims(Job("interactive", "interactive"), running)) == ["bulk b"]
+
+
+def test_saturated_link_preempts_even_with_a_free_slot():
+    running = [Job("bulk a", "bulk", "Downloading", progress=50), Job("bulk b", "bulk", "Downloading", progress=10)]
+    scheduler = Scheduler(4)
+    assert scheduler.victims(Job("interactive", "interactive"), running) == []
+    assert titles(scheduler.victims(Job("interactive", "interactive"), running, saturated=True)) == ["bulk b"]
+    assert scheduler.victims(Job("normal"), running, saturated=True) == []
+
+
+def test_saturated_link_holds_bulk_jobs_next_to_interactive_ones():
+    jobs = [Job("bulk", "bulk"), Job("normal")]
+    scheduler = Scheduler(4)
+    interactive = [Job("interactive", "interactive", "Downloading")]
+    assert titles(scheduler.next_jobs(jobs, interactive, saturated=True)) == ["normal"]
+    assert titles(scheduler.next_jobs(jobs, interactive)) == ["normal", "bulk"]
+    assert titles(scheduler.next_jobs(jobs, [Job("other", "normal", "Downloading")], saturated=True)) == ["normal", "bulk"]
+
+
+def test_victims_skip_non_bulk_processing_and_stopping_jobs():
+    stopping = Job("bulk stopping", "bulk", "Downloading")
+    stopping.stopped = True
+    running = [Job("normal", "normal", "Downloading"), Job("bulk merging", "bulk", "Processing"), stopping]
+    assert Scheduler(3).victims(Job("interactive", "interactive"), running) == []
+
+
+def test_preempted_job_resumes_before_later_bulk_work():
+    victim = Job("victim", "bulk", "Downloading", auto_start=False)
+    scheduler = Scheduler(1)
+    scheduler.preempt(victim, Job("interactive", "interactive"))
+    assert victim.stopped and victim.preempted and victim.auto_start
+    assert scheduler.preemptions == 1
+    victim.status = "Paused"
+    later = Job("later bulk", "bulk")
+    assert titles(scheduler.next_jobs([victim, later], [])) == ["victim"]
+
+
+def test_upcoming_follows_start_order():
+    jobs = [Job("bulk", "bulk"), Job("normal"), Job("manual", auto_start=False), Job("interactive", "interactive")]
+    assert titles(Scheduler(1).upcoming(jobs, 2)) == ["interactive", "normal"]
+
+
+def test_fifo_keeps_queue_order_within_class():
+    jobs = [Job("big", size=900 * MB), Job("small", size=1 * MB), Job("medium", size=50 * MB)]
+    assert titles(Scheduler(3, policy="fifo").next_jobs(jobs, [])) == ["big", "small", "medium"]
+
+
+def test_shortest_orders_by_remaining_bytes_within_class():
+    big = Job("big", size=900 * MB)
+    half_done = Job("half done", size=200 * MB)
+    half_done.total_bytes, half_done.downloaded_bytes = 200 * MB, 150 * MB
+    jobs = [big, Job("medium", size=100 * MB), half_done, Job("bulk tiny", "bulk", size=1 * MB)]
+    assert titles(Scheduler(4, policy="shortest").next_jobs(jobs, [])) == ["half done", "medium", "big", "bulk tiny"]
+
+
+def test_unknown_size_counts_as_large():
+    unknown = Job("unknown")
+    unknown.format_info = {}
+    jobs = [unknown, Job("known", size=500 * MB)]
+    assert titles(Scheduler(2, policy="shortest").next_jobs(jobs, [])) == ["known", "unknown"]
+
+
+def test_mixed_keeps_a_slot_for_small_jobs():
+    jobs = [Job("large 1", size=900 * MB), Job("large 2", size=900 * MB), Job("large 3", size=900 * MB),
+            Job("small 1", size=5 * MB), Job("small 2", size=5 * MB)]
+    scheduler = Scheduler(3, policy="mixed", small_slots=1, small_bytes=100 * MB)
+    assert titles(scheduler.next_jobs(jobs, [])) == ["large 1", "large 2", "small 1"]
+
+
+def test_mixed_counts_running_large_jobs():
+    running = [Job("running large", size=900 * MB)]
+    jobs = [Job("large", size=900 * MB), Job("small", size=5 * MB)]
+    scheduler = Scheduler(2, policy="mixed", small_slots=1, small_bytes=100 * MB)
+    assert titles(scheduler.next_jobs(jobs, running)) == ["small"]
+
+
+def test_mixed_lets_small_jobs_use_large_slots():
+    jobs = [Job(f"small {n}", size=5 * MB) for n in range(3)]
+    scheduler = Scheduler(3, policy="mixed", small_slots=1, small_bytes=100 * MB)
+    assert titles(scheduler.next_jobs(jobs, [])) == ["small 0", "small 1", "small 2"]
@@ -0,0 +1,90 @@
+import os
+from collections import namedtuple
+
+import pytest
+
+from disk_space import DiskSpaceManager, InsufficientSpace
+from storage import OutputRoot, StoragePolicy
+
+Usage = namedtuple('Usage', 'free')
+GB = 1024 ** 3
+
+
+class Job:
+    def __init__(self, title, out_dir, status="Paused"):
+        self.title = title
+        self.out_dir = out_dir
+        self.storage_root = None
+        self.status = status
+
+    def is_active(self):
+        return False
+
+
+@pytest.fixture
+def roots(tmp_path):
+    paths = [str(tmp_path / name) for name in ("a", "b", "c")]
+    for path in paths:
+        os.makedirs(path)
+    free = dict.fromkeys(paths, 10 * GB)
+    manager = DiskSpaceManager(min_free=0, disk_usage=lambda path: Usage(free[path]))
+    # Every root on a disk of its own
+    manager.device_of = lambda path: (path, path)
+    return manager, free, paths
+
+
+def needs(size):
+    return lambda out_dir: {out_dir: size}
+
+
+def test_admit_picks_root_with_most_weighted_room(roots):
+    manager, free, (a, b, c) = roots
+    free[b] = 20 * GB
+    policy = StoragePolicy(manager, [OutputRoot(a), OutputRoot(b), OutputRoot(c, weight=0)])
+    job = Job("job", a)
+    policy.admit(job, needs(GB))
+    assert job.out_dir == b and job.storage_root == b
+
+
+def test_admit_spreads_concurrent_jobs(roots):
+    manager, free, (a, b, c) = roots
+    policy = StoragePolicy(manager, [OutputRoot(a), OutputRoot(b)])
+    first, second = Job("first", a), Job("second", a)
+    policy.admit(first, needs(GB))
+    policy.admit(second, needs(GB))
+    assert {first.out_dir, second.out_dir} == {a, b}
+
+
+def test_unmanaged_folder_is_left_alone(roots, tmp_path):
+    manager, free, (a, b, c) = roots
+    other = str(tmp_path)
+    free[other] = 10 * GB
+    policy = StoragePolicy(manager, [OutputRoot(a)])
+    job = Job("job", other)
+    policy.admit(job, needs(GB))
+    assert job.out_dir == other and job.storage_root is None
+    assert policy.placements(job, needs(GB)) == [{other: GB}]
+
+
+def test_placements_cover_every_root_until_placed(roots):
+    manager, free, (a, b, c) = roots
+    policy = StoragePolicy(manager, [OutputRoot(a), OutputRoot(b), OutputRoot(c, weight=0)])
+    job = Job("job", a)
+    assert policy.placements(job, needs(GB)) == [{a: GB}, {b: GB}]
+    job.storage_root = a
+    assert policy.placements(job, needs(GB)) == [{a: GB}]
+
+
+def test_unplaced_job_resumes_when_any_root_has_room(roots):
+    manager, free, (a, b, c) = roots
+    free[a] = free[b] = 0
+    policy = StoragePolicy(manager, [OutputRoot(a), OutputRoot(b)])
+    job = Job("job", a)
+    with pytest.raises(InsufficientSpace):
+        policy.admit(job, needs(GB))
+    manager.wait_for_space(job, *policy.placements(job, needs(GB)))
+    assert manager.resumable() == []
+    free[b] = 10 * GB
+    assert manager.resumable() == [job]
+    policy.admit(job, needs(GB))
+    assert job.out_dir == b
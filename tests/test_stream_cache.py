@@ -0,0 +1,126 @@
+import os
+import time
+import threading
+
+import pytest
+
+from stream_cache import CacheWaitCancelled, StreamCache
+
+
+def producer(size, calls=None, gate=None):
+    def produce(work_dir):
+        if calls is not None:
+            calls.append(work_dir)
+        if gate is not None:
+            gate.wait(5)
+        path = os.path.join(work_dir, "stream.mp4")
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        return path
+    return produce
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StreamCache(str(tmp_path / "cache"), max_bytes=250)
+
+
+def test_hit_reuses_the_file(cache):
+    calls = []
+    first = cache.fetch("vid", "137", producer(100, calls))
+    second = cache.fetch("vid", "137", producer(100, calls))
+    assert first == second and len(calls) == 1
+    assert cache.stats()['entries'] == 1
+
+
+def test_format_is_part_of_the_key(cache):
+    calls = []
+    cache.fetch("vid", "bestaudio/best:aac:320", producer(10, calls))
+    cache.fetch("vid", "bestaudio/best:opus:160", producer(10, calls))
+    assert len(calls) == 2
+
+
+def test_evicts_least_recently_used_unpinned_first(cache):
+    a = cache.fetch("a", "f", producer(100))
+    b = cache.fetch("b", "f", producer(100))
+    cache.release(a)
+    cache.release(b)
+    # Touch "a" so "b" is the least recently used
+    cache.release(cache.fetch("a", "f", producer(100)))
+    c = cache.fetch("c", "f", producer(100))
+    assert os.path.exists(a) and os.path.exists(c)
+    assert not os.path.exists(b)
+    assert cache.stats()['bytes'] == 200
+
+
+def test_pinned_entries_survive_until_released(cache):
+    a = cache.fetch("a", "f", producer(200))
+    b = cache.fetch("b", "f", producer(200))
+    # Over the cap, but both are in use
+    assert os.path.exists(a) and os.path.exists(b)
+    assert cache.stats()['bytes'] == 400
+    cache.release(a)
+    assert not os.path.exists(a)
+    assert cache.stats()['bytes'] == 200
+
+
+def test_concurrent_fetches_share_one_download(cache):
+    calls, gate = [], threading.Event()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.fetch("vid", "f", producer(50, calls, gate))))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert len(set(results)) == 1 and len(results) == 4
+
+
+def test_waiter_takes_over_after_failed_download(cache):
+    gate = threading.Event()
+
+    def failing(work_dir):
+        gate.wait(5)
+        raise OSError("connection reset")
+
+    errors = []
+
+    def first():
+        try:
+            cache.fetch("vid", "f", failing)
+        except OSError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    while not cache.stats()['in_flight']:
+        time.sleep(0.01)
+    waiter = threading.Thread(target=lambda: errors.append(cache.fetch("vid", "f", producer(10))))
+    waiter.start()
+    gate.set()
+    thread.join(5)
+    waiter.join(5)
+    assert isinstance(errors[0], OSError) and os.path.exists(errors[1])
+
+
+def test_waiter_can_be_cancelled(cache):
+    gate, cancel = threading.Event(), threading.Event()
+    thread = threading.Thread(target=cache.fetch, args=("vid", "f", producer(10, gate=gate)))
+    thread.start()
+    while not cache.stats()['in_flight']:
+        time.sleep(0.01)
+    cancel.set()
+    with pytest.raises(CacheWaitCancelled):
+        cache.fetch("vid", "f", producer(10), cancel_event=cancel)
+    gate.set()
+    thread.join(5)
+
+
+def test_index_survives_restart(cache):
+    path = cache.fetch("vid", "f", producer(100))
+    calls = []
+    reopened = StreamCache(cache.cache_dir, max_bytes=250)
+    assert reopened.fetch("vid", "f", producer(100, calls)) == path
+    assert calls == []
@@ -0,0 +1,89 @@
+import pytest
+
+yt_dlp = pytest.importorskip("yt_dlp")
+
+from subtitles import SubtitleFetcher, subtitle_langs
+from ytdl_sessions import SessionPool
+
+VTT = "WEBVTT\r\n\r\n00:00.000 --> 00:01.000\r\nHello\r\n"
+
+
+def video_info():
+    return {
+        'id': 'abc123', 'title': 'Clip', 'extractor': 'fake', 'extractor_key': 'Fake',
+        'webpage_url': 'https://example.com/watch/abc123',
+        'formats': [{'format_id': '720p', 'url': 'https://media.example.com/720.mp4', 'ext': 'mp4',
+                     'vcodec': 'avc1', 'acodec': 'mp4a'}],
+        'subtitles': {
+            'en': [{'ext': 'srt', 'data': "1\n00:00:00,000 --> 00:00:01,000\nHello\n"}, {'ext': 'vtt', 'data': VTT},
+                   {'ext': 'json3', 'data': "{}"}],
+            'de': [{'ext': 'vtt', 'url': 'rtmp://media.example.com/de', 'protocol': 'rtmp'}],
+        },
+        'automatic_captions': {
+            'fr': [{'ext': 'ttml', 'data': "<tt/>"}],
+            'en': [{'ext': 'vtt', 'data': "auto"}],
+        },
+    }
+
+
+def download(ydl, fetcher):
+    fetcher.attach(ydl)
+    return ydl.process_ie_result(video_info(), download=True)
+
+
+@pytest.mark.parametrize("sub_lang, langs", [
+    ("None", []), (None, []), ("en", ["en"]), ("en, de,", ["en", "de"]),
+])
+def test_subtitle_langs(sub_lang, langs):
+    assert subtitle_langs(sub_lang) == langs
+
+
+def test_pick_prefers_subtitles_then_format_order():
+    info = video_info()
+    assert SubtitleFetcher.pick(info, 'en')['data'] == VTT
+    # Only automatic captions, in a format outside the list: 'best' takes the last one
+    assert SubtitleFetcher.pick(info, 'fr')['ext'] == 'ttml'
+    assert SubtitleFetcher.pick(info, 'es') is None
+
+
+def test_fetches_after_the_download(tmp_path):
+    fetcher = SubtitleFetcher(['en', 'de', 'fr', 'es'])
+    outtmpl = {'default': str(tmp_path / "%(title)s.%(ext)s"), 'subtitle': str(tmp_path / "subs" / "%(title)s.%(ext)s")}
+    (tmp_path / "subs").mkdir()
+    with yt_dlp.YoutubeDL({'quiet': True, 'skip_download': True, 'outtmpl': outtmpl}) as ydl:
+        download(ydl, fetcher)
+
+    assert fetcher.written() == {'en': str(tmp_path / "subs" / "Clip.en.vtt"),
+                                 'fr': str(tmp_path / "subs" / "Clip.fr.ttml")}
+    assert (tmp_path / "subs" / "Clip.en.vtt").read_bytes() == VTT.encode()
+    # A track that can't be fetched is skipped without failing the download
+    assert set(fetcher.failed) == {'de'}
+
+
+def test_does_not_run_when_the_download_fails(tmp_path):
+    fetcher = SubtitleFetcher(['en'])
+    with yt_dlp.YoutubeDL({'quiet': True, 'skip_download': True, 'format': 'missing',
+                           'outtmpl': str(tmp_path / "%(title)s.%(ext)s")}) as ydl:
+        with pytest.raises(yt_dlp.utils.YoutubeDLError):
+            download(ydl, fetcher)
+    assert fetcher.written() == {}
+
+
+def test_attach_without_languages_adds_nothing():
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        SubtitleFetcher([]).attach(ydl)
+        assert ydl._pps['after_video'] == []
+
+
+def test_pooled_session_drops_attached_fetcher(tmp_path):
+    pool = SessionPool(metrics=None)
+    opts = {'quiet': True, 'skip_download': True, 'outtmpl': str(tmp_path / "%(title)s.%(ext)s")}
+    fetcher = SubtitleFetcher(['en'])
+    with pool.session(opts, 'https://example.com/watch/abc123') as ydl:
+        download(ydl, fetcher)
+    assert set(fetcher.written()) == {'en'}
+
+    with pool.session(opts, 'https://example.com/watch/abc123') as reused:
+        assert reused is ydl
+        assert reused._pps['after_video'] == []
+    pool.close_all()
@@ -0,0 +1,119 @@
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+
+from stream_cache import CacheWaitCancelled
+from ytdl_sessions import SESSIONS
+
+logger = logging.getLogger(__name__)
+
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+
+def thumbnail_url_of(info):
+    """Best thumbnail URL from an info dict (processed or ``process=False``), or None."""
+    if not info:
+        return None
+    if info.get('thumbnail'):
+        return info['thumbnail']
+    thumbnails = [t for t in info.get('thumbnails') or () if t.get('url')]
+    if not thumbnails:
+        return None
+    # yt-dlp lists thumbnails worst to best; preference/size only break ties in unsorted lists
+    best = max(enumerate(thumbnails), key=lambda it: (it[1].get('preference') or 0,
+                                                      (it[1].get('width') or 0) * (it[1].get('height') or 0), it[0]))
+    return best[1]['url']
+
+
+def to_jpeg(data, ffmpeg_path='ffmpeg', creationflags=0):
+    """Returns ``data`` as JPEG, converting other image formats through an ffmpeg pipe."""
+    if data.startswith(JPEG_MAGIC):
+        return data
+    result = subprocess.run([ffmpeg_path, '-v', 'error', '-f', 'image2pipe', '-i', 'pipe:0',
+                             '-frames:v', '1', '-c:v', 'mjpeg', '-q:v', '2', '-f', 'image2pipe', 'pipe:1'],
+                            input=data, capture_output=True, timeout=60, creationflags=creationflags)
+    if result.returncode != 0 or not result.stdout.startswith(JPEG_MAGIC):
+        raise RuntimeError(f"ffmpeg could not convert thumbnail: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ThumbnailCache:
+    """In-memory JPEG cover images keyed by video id.
+
+    Thumbnails are downloaded from the URL already known from the info dict
+    through the pooled YoutubeDL session for the page (so cookies and headers
+    match), converted to JPEG in memory, and kept least-recently-used up to
+    ``max_bytes``. Concurrent requests for the same video share one download.
+    """
+
+    def __init__(self, max_bytes, ffmpeg_path='ffmpeg', creationflags=0):
+        self.max_bytes = max_bytes
+        self.ffmpeg_path = ffmpeg_path
+        self.creationflags = creationflags
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _download(self, url, page_url):
+        with SESSIONS.session({'quiet': True, 'no_warnings': True}, page_url or url) as ydl:
+            with ydl.urlopen(url) as response:
+                return response.read()
+
+    def get(self, video_id, url, page_url=None, cancel_event=None):
+        """Returns the JPEG bytes for ``video_id``, downloading ``url`` at most once.
+
+        Raises ``CacheWaitCancelled`` when ``cancel_event`` is set while another
+        caller's download of the same image is still running.
+        """
+        while True:
+            with self._lock:
+                data = self._entries.get(video_id)
+                if data is not None:
+                    self._entries.move_to_end(video_id)
+                    self.hits += 1
+                    return data
+                inflight = self._inflight.get(video_id)
+                if inflight is None:
+                    inflight = self._inflight[video_id] = _InFlight()
+                    self.misses += 1
+                    break
+            while not inflight.done.wait(timeout=0.2):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CacheWaitCancelled(f"Stopped waiting for thumbnail {video_id}")
+            # Loop again: either the image is cached now, or that download failed and we take over
+
+        try:
+            if not url:
+                raise ValueError(f"No thumbnail URL known for {video_id}")
+            data = to_jpeg(self._download(url, page_url), self.ffmpeg_path, self.creationflags)
+            with self._lock:
+                self._entries[video_id] = data
+                self._total_bytes += len(data)
+                while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total_bytes -= len(evicted)
+            logger.info(f"Thumbnail cache stored {video_id} ({len(data) / 1024:.1f} KB)")
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(video_id, None)
+            inflight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,131 @@
+import json
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ('job_key', 'title', 'phase', 'attempt', 'start', 'end', 'bytes', 'status')
+
+    def __init__(self, job_key, title, phase, attempt, start):
+        self.job_key = job_key
+        self.title = title
+        self.phase = phase
+        self.attempt = attempt
+        self.start = start
+        self.end = None
+        self.bytes = None
+        self.status = None
+
+    def to_dict(self):
+        return {
+            'job': self.job_key,
+            'title': self.title,
+            'phase': self.phase,
+            'attempt': self.attempt,
+            'start': self.start,
+            'end': self.end,
+            'duration': (self.end - self.start) if self.end is not None else None,
+            'bytes': self.bytes,
+            'status': self.status,
+        }
+
+
+class TraceRecorder:
+    """Structured per-phase spans (start, end, bytes, exit status) for every job.
+
+    Phases are opened with ``begin`` and closed with ``end``. ``end_job`` closes
+    anything still open when a worker exits early (error, pause), stamping it with
+    the job's final status. Traces for the most recent ``max_jobs`` jobs are kept
+    and can be exported as JSONL or Chrome trace-event JSON (chrome://tracing,
+    Perfetto), where every job gets its own lane so serialized phases stand out.
+    """
+
+    def __init__(self, max_jobs=2000, on_span_end=None):
+        self.max_jobs = max_jobs
+        self.on_span_end = on_span_end
+        self._traces = OrderedDict()  # job key -> {'attempt': n, 'spans': [Span]}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(job):
+        return job.tree_item_id or f"job-{id(job)}"
+
+    def begin_job(self, job):
+        key = self._key(job)
+        with self._lock:
+            trace = self._traces.pop(key, None) or {'attempt': 0, 'spans': []}
+            trace['attempt'] += 1
+            self._traces[key] = trace
+            while len(self._traces) > self.max_jobs:
+                self._traces.popitem(last=False)
+
+    def begin(self, job, phase):
+        key = self._key(job)
+        with self._lock:
+            trace = self._traces.get(key)
+            if trace is None:
+                trace = self._traces[key] = {'attempt': 1, 'spans': []}
+            span = Span(key, job.title, phase, trace['attempt'], time.time())
+            trace['spans'].append(span)
+        return span
+
+    def end(self, span, status="ok", bytes=None):
+        if span is None or span.end is not None:
+            return
+        span.end = time.time()
+        span.status = status
+        if bytes is not None:
+            span.bytes = bytes
+        if self.on_span_end:
+            self.on_span_end(span)
+
+    def end_job(self, job, status):
+        with self._lock:
+            trace = self._traces.get(self._key(job))
+            spans = list(trace['spans']) if trace else []
+        for span in spans:
+            if span.end is None:
+                self.end(span, status=status)
+
+    def spans(self):
+        with self._lock:
+            return [span for trace in self._traces.values() for span in trace['spans']]
+
+    def export_jsonl(self, path):
+        spans = self.spans()
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict()) + "\n")
+        logger.info(f"Exported {len(spans)} trace spans to {path}")
+        return len(spans)
+
+    def export_chrome_trace(self, path):
+        spans = self.spans()
+        origin = min((s.start for s in spans), default=0)
+        events = []
+        lanes = {}
+        for span in spans:
+            if span.job_key not in lanes:
+                lanes[span.job_key] = len(lanes) + 1
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': lanes[span.job_key],
+                               'args': {'name': span.title}})
+            end = span.end if span.end is not None else time.time()
+            events.append({
+                'name': span.phase,
+                'cat': 'job',
+                'ph': 'X',
+                'pid': os.getpid(),
+                'tid': lanes[span.job_key],
+                'ts': (span.start - origin) * 1e6,
+                'dur': (end - span.start) * 1e6,
+                'args': {'bytes': span.bytes, 'status': span.status or 'running', 'attempt': span.attempt},
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        logger.info(f"Exported {len(spans)} trace spans for {len(lanes)} jobs to {path}")
+        return len(spans)
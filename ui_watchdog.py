@@ -0,0 +1,82 @@
+import sys
+import time
+import logging
+import threading
+import traceback
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class StallWatchdog:
+    """Measures how late event-loop callbacks run and catches stalls as they happen.
+
+    The watched loop calls ``beat(source, due)`` whenever a scheduled callback
+    runs, where ``due`` is the ``perf_counter`` time it was meant to run. The
+    delay goes into a histogram (``metrics.ui_delay``). A monitor thread notices
+    when no beat arrives for ``stall_threshold`` seconds and logs the watched
+    thread's stack while it is still blocked, which points at the offending code.
+    """
+
+    def __init__(self, metrics=None, stall_threshold=0.25, thread_ident=None, max_samples=10000, max_stalls=50):
+        self.metrics = metrics
+        self.stall_threshold = stall_threshold
+        self.thread_ident = thread_ident or threading.main_thread().ident
+        self.delays = deque(maxlen=max_samples)
+        self.stalls = deque(maxlen=max_stalls)  # {'started', 'duration', 'stack'}
+        self._last_beat = time.perf_counter()
+        self._current_stall = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def beat(self, source, due):
+        now = time.perf_counter()
+        delay = max(0.0, now - due)
+        self.delays.append(delay)
+        if self.metrics:
+            self.metrics.ui_delay.observe(delay, source=source)
+        with self._lock:
+            self._last_beat = now
+            stall, self._current_stall = self._current_stall, None
+        if stall:
+            stall['duration'] = now - stall['started']
+            logger.warning(f"UI thread stall ended after {stall['duration']:.2f}s")
+
+    def wrap(self, delay_ms, func, source="after"):
+        """Wrap an ``after()`` callback so its scheduling delay is recorded."""
+        due = time.perf_counter() + delay_ms / 1000.0
+
+        def callback(*args):
+            self.beat(source, due)
+            return func(*args)
+        return callback
+
+    def start(self):
+        self._stop.clear()
+        self._last_beat = time.perf_counter()
+        self._monitor = threading.Thread(target=self._run, name="ui-watchdog", daemon=True)
+        self._monitor.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._monitor:
+            self._monitor.join(timeout=1)
+
+    def _run(self):
+        check_interval = self.stall_threshold / 4
+        while not self._stop.wait(check_interval):
+            with self._lock:
+                started = self._last_beat
+                if self._current_stall or time.perf_counter() - started < self.stall_threshold:
+                    continue
+                stall = self._current_stall = {'started': started, 'duration': None, 'stack': self._stack()}
+            self.stalls.append(stall)
+            if self.metrics:
+                self.metrics.ui_stalls.inc()
+            logger.warning(f"UI thread blocked for over {self.stall_threshold:.2f}s, stack:\n{stall['stack']}")
+
+    def _stack(self):
+        frame = sys._current_frames().get(self.thread_ident)
+        return "".join(traceback.format_stack(frame)) if frame else "<thread not running>"
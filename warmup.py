@@ -0,0 +1,87 @@
+import time
+import logging
+import threading
+import importlib
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access.
+
+    Lets ``yt_dlp`` (and its extractor registry) load on a background thread
+    after the window is up, while code keeps writing ``yt_dlp.YoutubeDL``.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+        self.import_seconds = None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    self.import_seconds = time.perf_counter() - started
+                    self._module = module
+                    logger.info(f"Imported {self._name} in {self.import_seconds:.2f}s")
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+yt_dlp = LazyModule("yt_dlp")
+
+
+def probe_ffmpeg(ffmpeg_path, creationflags=0):
+    try:
+        result = subprocess.run([ffmpeg_path, '-version'], capture_output=True, text=True, timeout=15,
+                                creationflags=creationflags)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"ffmpeg probe failed for '{ffmpeg_path}': {e}")
+        return None
+    return result.stdout.split('\n', 1)[0].strip() if result.returncode == 0 else None
+
+
+def warm_up(ffmpeg_path, creationflags=0):
+    """Pays yt-dlp's one-time costs ahead of the first fetch.
+
+    Imports yt_dlp, compiles every extractor's URL pattern (what the first
+    ``extract_info`` would do while looking for a suitable extractor) and
+    probes ffmpeg both directly and through yt-dlp's post-processor, whose
+    version check is cached for the process. Returns per-step timings.
+    """
+    timings = {}
+    started = time.perf_counter()
+    module = yt_dlp.load()
+    timings['import_seconds'] = time.perf_counter() - started
+
+    step = time.perf_counter()
+    extractors = 0
+    for ie in module.extractor.gen_extractor_classes():
+        ie.suitable("https://example.invalid/")
+        extractors += 1
+    timings['extractors'] = extractors
+    timings['extractor_seconds'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    timings['ffmpeg_version'] = probe_ffmpeg(ffmpeg_path, creationflags)
+    try:
+        from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+        with module.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+            timings['ytdlp_ffmpeg_available'] = FFmpegPostProcessor(ydl).available
+    except Exception as e:
+        logger.warning(f"yt-dlp ffmpeg probe failed: {e}")
+        timings['ytdlp_ffmpeg_available'] = False
+    timings['ffmpeg_seconds'] = time.perf_counter() - step
+    timings['total_seconds'] = time.perf_counter() - started
+    return timings
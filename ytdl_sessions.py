@@ -0,0 +1,190 @@
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from metrics import METRICS, host_of
+from warmup import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# Options that change from call to call; everything else makes up a session's profile
+DYNAMIC_OPTIONS = ('outtmpl', 'format', 'progress_hooks', 'postprocessor_hooks', 'logger', 'match_filter',
+                   'concurrent_fragment_downloads')
+
+
+class YtdlSession:
+    """A YoutubeDL instance that outlives one call.
+
+    Per-call options are rebound on every lease: hooks go through trampolines
+    registered once at construction, the logger, match filter and fragment
+    thread count are swapped in ``params``, and the output template and format
+    selector are rebuilt the way ``YoutubeDL.__init__`` builds them. Per-run
+    state (download counters, seen playlist URLs, printed messages, the
+    download archive) starts over as in a new instance, and post-processors
+    a caller attached are dropped on release. The instance keeps its
+    cookie jar, HTTP request director (connection pools) and extractor
+    instances between leases.
+    """
+
+    def __init__(self, key, static_opts):
+        self.key = key
+        self.created = time.monotonic()
+        self.uses = 0
+        self.progress_hooks = []
+        self.postprocessor_hooks = []
+        self.ydl = yt_dlp.YoutubeDL({**static_opts,
+                                     'progress_hooks': [self._on_progress],
+                                     'postprocessor_hooks': [self._on_postprocess]})
+        self._pps = {when: list(pps) for when, pps in self.ydl._pps.items()}
+
+    def _on_progress(self, d):
+        for hook in self.progress_hooks:
+            hook(d)
+
+    def _on_postprocess(self, d):
+        for hook in self.postprocessor_hooks:
+            hook(d)
+
+    def bind(self, opts):
+        params = self.ydl.params
+        self.progress_hooks = list(opts.get('progress_hooks') or ())
+        self.postprocessor_hooks = list(opts.get('postprocessor_hooks') or ())
+        params['logger'] = opts.get('logger')
+        params['match_filter'] = opts.get('match_filter')
+        params['concurrent_fragment_downloads'] = opts.get('concurrent_fragment_downloads') or 1
+        outtmpl = opts.get('outtmpl')
+        params['outtmpl'] = dict(outtmpl) if isinstance(outtmpl, dict) else {'default': outtmpl} if outtmpl else {}
+        self.ydl._parse_outtmpl()
+        for template in params['outtmpl'].values():
+            error = self.ydl.validate_outtmpl(template)
+            if error:
+                raise error
+        fmt = params['format'] = opts.get('format')
+        self.ydl.format_selector = fmt if fmt in (None, '-') or callable(fmt) else self.ydl.build_format_selector(fmt)
+        self._reset_run_state()
+        self.uses += 1
+        return self.ydl
+
+    def _reset_run_state(self):
+        ydl = self.ydl
+        ydl._download_retcode = 0
+        ydl._num_downloads = 0
+        ydl._num_videos = 0
+        ydl._playlist_level = 0
+        ydl._playlist_urls = set()
+        ydl._printed_messages = set()
+        archive = ydl.params.get('download_archive')
+        if yt_dlp.utils.is_path_like(archive):
+            # Other sessions may have recorded downloads in the file since this one last read it
+            ydl.archive = set()
+            try:
+                with yt_dlp.utils.locked_file(archive, 'r', encoding='utf-8') as f:
+                    ydl.archive.update(line.strip() for line in f)
+            except FileNotFoundError:
+                pass
+
+    def unbind(self):
+        self.progress_hooks = []
+        self.postprocessor_hooks = []
+        self.ydl.params['logger'] = None
+        self.ydl.params['match_filter'] = None
+        self.ydl._pps = {when: list(pps) for when, pps in self._pps.items()}
+
+    def close(self):
+        try:
+            self.ydl.close()
+        except Exception as e:
+            logger.debug(f"Error closing YoutubeDL session: {e}")
+
+
+class SessionPool:
+    """Keeps warm YoutubeDL sessions per (host, option profile) and leases them out.
+
+    A session is used by one caller at a time. Sessions that raised, are older
+    than ``max_age`` seconds or have served ``max_uses`` leases are closed
+    instead of being returned, so expired cookies, stale extractor state or a
+    broken connection pool never outlive one failure.
+    """
+
+    def __init__(self, max_idle_per_key=4, max_age=600, max_uses=100, metrics=METRICS):
+        self.max_idle_per_key = max_idle_per_key
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.metrics = metrics
+        self.enabled = True
+        self._idle = {}  # key -> [YtdlSession]
+        self._lock = threading.Lock()
+        self.stats = {'created': 0, 'reused': 0, 'recycled_error': 0, 'recycled_stale': 0, 'evicted': 0}
+
+    @staticmethod
+    def profile_key(opts, url):
+        static = {k: v for k, v in opts.items() if k not in DYNAMIC_OPTIONS}
+        return host_of(url) if url else "", json.dumps(static, sort_keys=True, default=repr)
+
+    def _count(self, event):
+        with self._lock:
+            self.stats[event] += 1
+        if self.metrics:
+            self.metrics.ytdl_sessions.inc(event=event)
+
+    def _is_stale(self, session):
+        return time.monotonic() - session.created > self.max_age or session.uses >= self.max_uses
+
+    def _acquire(self, key, opts):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                session = idle.pop() if idle else None
+            if session is None:
+                break
+            if not self._is_stale(session):
+                self._count('reused')
+                return session
+            session.close()
+            self._count('recycled_stale')
+        static = {k: v for k, v in opts.items() if k not in DYNAMIC_OPTIONS}
+        session = YtdlSession(key, static)
+        self._count('created')
+        return session
+
+    def _release(self, session):
+        session.unbind()
+        if self._is_stale(session):
+            session.close()
+            self._count('recycled_stale')
+            return
+        with self._lock:
+            idle = self._idle.setdefault(session.key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append(session)
+                return
+        session.close()
+        self._count('evicted')
+
+    @contextmanager
+    def session(self, opts, url=None):
+        """``with pool.session(opts, url) as ydl:`` in place of ``with yt_dlp.YoutubeDL(opts) as ydl:``."""
+        if not self.enabled:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                yield ydl
+            return
+        session = self._acquire(self.profile_key(opts, url), opts)
+        try:
+            yield session.bind(opts)
+        except BaseException:
+            session.close()
+            self._count('recycled_error')
+            raise
+        self._release(session)
+
+    def close_all(self):
+        with self._lock:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+        for session in sessions:
+            session.close()
+
+
+SESSIONS = SessionPool()